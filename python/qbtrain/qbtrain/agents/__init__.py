@@ -1,16 +1,20 @@
 from .base_agent import AIAgent
-from .sql_agent import SQLAgent
+from .sql_agent import SQLAgent, SQLPlanCache
 from .response_generator_agent import ResponseGeneratorAgent
 from .source_extraction_agent import SourceExtractionAgent, SourceExtractionResult
-from .code_execution_agent import CodeExecutionAgent, CodeExecutionPrompts, scan_denylist
+from .code_execution_agent import CodeExecutionAgent, CodeExecutionPrompts
+from .code_screening import ScreenVerdict, scan_denylist, screen_code
 
 __all__ = [
     "AIAgent",
     "SQLAgent",
+    "SQLPlanCache",
     "ResponseGeneratorAgent",
     "SourceExtractionAgent",
     "SourceExtractionResult",
     "CodeExecutionAgent",
     "CodeExecutionPrompts",
     "scan_denylist",
+    "screen_code",
+    "ScreenVerdict",
 ]
\ No newline at end of file
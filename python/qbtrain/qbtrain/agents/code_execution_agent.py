@@ -1,12 +1,8 @@
 # qbtrain/agents/code_execution_agent.py
 from __future__ import annotations
 
-import re
 import subprocess
-import sys
-import tempfile
 import time
-from pathlib import Path
 from typing import (
     Any,
     Dict,
@@ -20,6 +16,8 @@ from pydantic import BaseModel, Field
 
 from ..ai.llm import LLMClient
 from ..exceptions.exceptions import DenylistViolationError
+from .code_screening import ScreenVerdict, scan_denylist, screen_code  # noqa: F401 (scan_denylist re-exported)
+from .sandbox_pool import SandboxLimits, run_python, stream_python
 from ..tracers import AgentTracer, Tracer
 from ..utils.streamingutils import stream_message_events
 from ..utils.traceutils import (
@@ -53,63 +51,13 @@ class GeneratedCodeResponse(BaseModel):
         extra = "forbid"
 
 
-# ---------------------------------------------------------------------------
-# Denylist scanner — runs OUTSIDE the LLM, pure string analysis
-# ---------------------------------------------------------------------------
-
-def scan_denylist(code: str, denylist: Set[str]) -> List[str]:
-    """
-    Scan generated Python source for denied libraries / commands.
-
-    Checks:
-      - import statements  (import X, from X import …)
-      - subprocess / os.system / os.popen string arguments
-      - shlex-style command tokens
-
-    Returns a list of matched denylist entries found in *code*.
-    """
-    if not denylist:
-        return []
-
-    violations: List[str] = []
-    lower_deny = {d.lower() for d in denylist}
-
-    # --- import scanning ---
-    import_pattern = re.compile(
-        r"^\s*(?:import|from)\s+([\w.]+)", re.MULTILINE
-    )
-    for m in import_pattern.finditer(code):
-        module_chain = m.group(1).lower()
-        parts = module_chain.split(".")
-        for i in range(len(parts)):
-            prefix = ".".join(parts[: i + 1])
-            if prefix in lower_deny:
-                violations.append(m.group(1))
-
-    # --- shell command scanning ---
-    string_pattern = re.compile(r"""(?:"|'|"{3}|'{3})(.*?)(?:"|'|"{3}|'{3})""", re.DOTALL)
-    for m in string_pattern.finditer(code):
-        content = m.group(1).lower()
-        tokens = re.split(r"[\s;|&]+", content)
-        for token in tokens:
-            token_clean = token.strip().split("/")[-1]
-            if token_clean in lower_deny:
-                violations.append(token_clean)
-
-    # --- generic token scan for anything remaining ---
-    word_pattern = re.compile(r"\b([\w.]+)\b")
-    for m in word_pattern.finditer(code):
-        word = m.group(1).lower()
-        if word in lower_deny and word not in [v.lower() for v in violations]:
-            violations.append(m.group(1))
-
-    return list(dict.fromkeys(violations))  # dedupe, preserve order
-
-
 # ---------------------------------------------------------------------------
 # Agent
 # ---------------------------------------------------------------------------
 
+# Name generated scripts run under (``__file__`` and tracebacks); nothing is written there.
+_SCRIPT_NAME = "generated_script.py"
+
 class CodeExecutionAgent:
     """
     Takes a natural-language query, generates a Python script via an LLM,
@@ -117,14 +65,23 @@ class CodeExecutionAgent:
 
     **All guardrails are external.** The agent itself does NOT restrict what
     the LLM can generate. The *only* gate is the denylist — a set of library
-    names and shell commands that are scanned for *after* generation and
-    *before* execution.  If any denied token is found, execution is blocked
-    with a ``DenylistViolationError`` and no code is run.
+    names and shell commands that are screened for *after* generation and
+    *before* execution, in one AST pass (``screen_code``).  If any denied
+    token is found, execution is blocked with a ``DenylistViolationError``
+    and no code is run; code that does not parse is reported with the
+    interpreter's SyntaxError message without launching a sandbox.
 
     Events emitted (same contract as SQLAgent):
       - ``{"type": "action",  "content": "…"}``   — status updates
       - ``{"type": "message", "content": "…"}``   — streamed result text
       - ``{"type": "trace",   "content": {…}}``   — observability traces
+      - ``{"type": "output",  "stream": "stdout" | "stderr", "content": "…"}``
+        — script output while it runs (stream=True only)
+
+    Scripts run under ``limits`` (CPU seconds, address space, open files,
+    file size, captured output bytes); default ``SandboxLimits.from_env()``.
+    They are piped to the sandbox rather than written to disk, and run in
+    ``workdir`` (e.g. a ``SandboxSession.path`` holding uploaded data).
     """
 
     def __init__(
@@ -135,6 +92,8 @@ class CodeExecutionAgent:
         execution_timeout: int = 30,
         tracer: Optional[Tracer] = None,
         stream: bool = False,
+        limits: Optional[SandboxLimits] = None,
+        workdir: Optional[str] = None,
     ):
         if prompts is None:
             raise ValueError("prompts must not be None.")
@@ -142,6 +101,8 @@ class CodeExecutionAgent:
         self.llm_client = llm_client
         self.denylist: Set[str] = set(denylist) if denylist else set()
         self.execution_timeout = execution_timeout
+        self.limits = limits if limits is not None else SandboxLimits.from_env()
+        self.workdir = workdir
         self.tracer: Optional[Tracer] = tracer if tracer else AgentTracer()
         self._trace_state: TraceState = TraceState()
         self.stream = stream
@@ -227,51 +188,57 @@ class CodeExecutionAgent:
         )
         return code
 
-    def _enforce_denylist(self, code: str) -> None:
-        violations = scan_denylist(code, self.denylist)
-        if violations:
+    def _screen_code(self, code: str) -> ScreenVerdict:
+        verdict = screen_code(code, self.denylist, filename=_SCRIPT_NAME)
+        self._safe_trace(
+            __type__="agent",
+            operation="Code Screening",
+            allowed=verdict.allowed,
+            imports=verdict.imports,
+            builtins=verdict.builtins,
+            file_access=verdict.file_access,
+            network_access=verdict.network_access,
+            syntax_error=verdict.syntax_error,
+        )
+        if verdict.violations:
             self._safe_trace(
                 __type__="error",
                 operation="Denylist Violation",
-                violations=violations,
+                violations=verdict.violations,
+                reason=verdict.reason,
             )
             raise DenylistViolationError(
-                f"Blocked: generated code contains denied tokens: {violations}"
+                f"generated code contains denied tokens: {verdict.violations} ({verdict.reason})"
             )
+        return verdict
 
-    def _execute_code(self, code: str) -> Dict[str, Any]:
-        with tempfile.NamedTemporaryFile(
-            mode="w",
-            suffix=".py",
-            delete=False,
-            encoding="utf-8",
-        ) as f:
-            f.write(code)
-            script_path = f.name
-
+    def _execute_code(self, code: str) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+        """Run *code*; yields ``output`` events while it runs when streaming, returns the result."""
         try:
-            result = subprocess.run(
-                [sys.executable, script_path],
-                capture_output=True,
-                text=True,
-                timeout=self.execution_timeout,
-            )
+            if self.stream:
+                result = None
+                for kind, value in stream_python(_SCRIPT_NAME, cwd=self.workdir, source=code,
+                                                 timeout=self.execution_timeout, limits=self.limits):
+                    if kind == "exit":
+                        result = value
+                    else:
+                        yield {"type": "output", "stream": kind, "content": value}
+            else:
+                result = run_python(_SCRIPT_NAME, cwd=self.workdir, source=code,
+                                    timeout=self.execution_timeout, limits=self.limits)
             return {
                 "stdout": result.stdout,
                 "stderr": result.stderr,
                 "returncode": result.returncode,
+                "truncated": result.truncated,
             }
-        except subprocess.TimeoutExpired:
+        except subprocess.TimeoutExpired as exc:
             return {
-                "stdout": "",
+                "stdout": exc.output or "",
                 "stderr": f"Execution timed out after {self.execution_timeout}s",
                 "returncode": -1,
+                "truncated": False,
             }
-        finally:
-            try:
-                Path(script_path).unlink(missing_ok=True)
-            except Exception:
-                pass
 
     def _act_generate_and_execute(
         self, user_query: str, *, start_total: float
@@ -286,11 +253,11 @@ class CodeExecutionAgent:
             if self.stream:
                 yield from self._drain_stream_traces()
 
-            # --- Step 2: enforce denylist (external gate) ---
+            # --- Step 2: screen against the denylist (external gate) ---
             if self.stream:
-                yield {"type": "action", "content": "Scanning denylist"}
+                yield {"type": "action", "content": "Screening generated code"}
 
-            self._enforce_denylist(code)
+            verdict = self._screen_code(code)
 
             if self.stream:
                 yield from self._drain_stream_traces()
@@ -299,7 +266,11 @@ class CodeExecutionAgent:
             if self.stream:
                 yield {"type": "action", "content": "Executing script"}
 
-            exec_result = self._execute_code(code)
+            if verdict.syntax_error:
+                # Would fail at compile time; no sandbox needed to report it
+                exec_result = {"stdout": "", "stderr": verdict.syntax_error + "\n", "returncode": 1, "truncated": False}
+            else:
+                exec_result = yield from self._execute_code(code)
 
             self._safe_trace(
                 __type__="agent",
@@ -307,6 +278,7 @@ class CodeExecutionAgent:
                 returncode=exec_result["returncode"],
                 stdout_len=len(exec_result["stdout"]),
                 stderr_len=len(exec_result["stderr"]),
+                truncated=exec_result["truncated"],
             )
 
             if self.stream:
@@ -324,11 +296,11 @@ class CodeExecutionAgent:
             if ev:
                 yield ev
 
-        except DenylistViolationError:
+        except DenylistViolationError as e:
             yield from self._emit_result_message(
                 code="",
                 stdout="",
-                stderr="Execution blocked: generated code contains denied libraries or commands.",
+                stderr=f"Execution blocked: {e}",
                 returncode=-1,
             )
             if self.stream:
@@ -0,0 +1,238 @@
+# qbtrain/agents/code_screening.py
+from __future__ import annotations
+
+import ast
+import re
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Builtins worth reporting when called: dynamic code, introspection, I/O.
+_NOTABLE_BUILTINS = frozenset({
+    "eval", "exec", "compile", "__import__", "open", "input", "breakpoint",
+    "getattr", "setattr", "delattr", "globals", "locals", "vars",
+})
+# Calls that read, write or remove files (after import aliases are resolved).
+_FILE_CALLS = frozenset({
+    "open", "io.open", "os.open", "os.remove", "os.unlink", "os.rename", "os.replace",
+    "os.rmdir", "os.removedirs", "os.mkdir", "os.makedirs", "os.chmod", "os.chown",
+    "shutil.rmtree", "shutil.copy", "shutil.copy2", "shutil.copyfile", "shutil.copytree", "shutil.move",
+})
+# pathlib-style methods, matched on any receiver.
+_FILE_METHODS = frozenset({
+    "read_text", "read_bytes", "write_text", "write_bytes", "unlink", "rmdir", "touch", "chmod",
+})
+_NETWORK_MODULES = frozenset({
+    "socket", "ssl", "requests", "httpx", "aiohttp", "urllib", "http", "ftplib", "smtplib",
+    "poplib", "imaplib", "telnetlib", "paramiko", "websocket", "websockets",
+})
+_DYNAMIC_IMPORTS = frozenset({"__import__", "importlib.import_module"})
+# Shell-style command strings: split on whitespace and separators, keep the basename.
+_COMMAND_SPLIT_RE = re.compile(r"[\s;|&]+")
+
+
+@dataclass
+class ScreenVerdict:
+    """
+    What one pass over a generated script found. ``allowed`` is False when it
+    does not parse or touches the denylist; ``reason`` says why, per line,
+    for error messages and retry prompts.
+    """
+
+    allowed: bool = True
+    violations: List[str] = field(default_factory=list)   # denied entries, as written in the code
+    reasons: List[str] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+    calls: List[str] = field(default_factory=list)        # dotted, import aliases resolved
+    builtins: List[str] = field(default_factory=list)
+    file_access: List[str] = field(default_factory=list)
+    network_access: List[str] = field(default_factory=list)
+    syntax_error: Optional[str] = None                    # formatted like the interpreter's message
+
+    @property
+    def reason(self) -> str:
+        return self.syntax_error or "; ".join(self.reasons)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _add(items: List[str], value: str) -> None:
+    if value not in items:
+        items.append(value)
+
+
+class _Screener:
+    """
+    Collects imports, calls, builtins, file/network access and denylist hits
+    in one traversal. Handlers are looked up by node type and return whether
+    to descend into the node's children; most nodes have no handler.
+    """
+
+    def __init__(self, denylist: Set[str]):
+        self.deny = denylist
+        self.verdict = ScreenVerdict()
+        self.aliases: Dict[str, str] = {}
+        self.matched: Set[str] = set()     # denylist entries already reported
+        self.handlers = {
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom,
+            ast.Call: self.visit_Call,
+            ast.Attribute: self.visit_Attribute,
+            ast.Name: self.visit_Name,
+            ast.Constant: self.visit_Constant,
+        }
+
+    def run(self, tree: ast.AST) -> ScreenVerdict:
+        # Depth-first in source order, so imports are seen before the names they bind.
+        # Children are pushed inline (reversed) rather than via ast.iter_child_nodes,
+        # and Load/Store context nodes are skipped; this halves the walk.
+        handlers = self.handlers
+        node_type, context_type = ast.AST, ast.expr_context
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            handler = handlers.get(type(node))
+            if handler is not None and not handler(node):
+                continue
+            for name in reversed(node._fields):
+                value = getattr(node, name, None)
+                if type(value) is list:
+                    for item in reversed(value):
+                        if isinstance(item, node_type):
+                            stack.append(item)
+                elif isinstance(value, node_type) and not isinstance(value, context_type):
+                    stack.append(value)
+        self.verdict.allowed = not self.verdict.violations
+        return self.verdict
+
+    # ---- denylist ----
+    def _deny(self, node: ast.AST, text: str, candidates: Iterable[str], what: str) -> None:
+        if not self.deny:
+            return
+        for candidate in candidates:
+            entry = candidate.lower()
+            if entry in self.deny:
+                if entry not in self.matched:
+                    self.matched.add(entry)
+                    self.verdict.violations.append(text)
+                self.verdict.reasons.append(f"line {getattr(node, 'lineno', '?')}: {what} '{text}'")
+                return
+
+    @staticmethod
+    def _prefixes(dotted: str) -> List[str]:
+        parts = dotted.split(".")
+        return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+    # ---- names ----
+    def _dotted(self, node: ast.AST) -> Optional[str]:
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+
+    def _resolve(self, dotted: str) -> str:
+        head, _, rest = dotted.partition(".")
+        head = self.aliases.get(head, head)
+        return f"{head}.{rest}" if rest else head
+
+    def _record_module(self, node: ast.AST, module: str, what: str) -> None:
+        _add(self.verdict.imports, module)
+        if module.split(".")[0] in _NETWORK_MODULES:
+            _add(self.verdict.network_access, module)
+        self._deny(node, module, self._prefixes(module), what)
+
+    # ---- visitors ----
+    def visit_Import(self, node: ast.Import) -> bool:
+        for alias in node.names:
+            self.aliases[alias.asname or alias.name.split(".")[0]] = alias.name if alias.asname else alias.name.split(".")[0]
+            self._record_module(node, alias.name, "imports denied module")
+        return False
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> bool:
+        if node.level or not node.module:
+            return False
+        self._record_module(node, node.module, "imports denied module")
+        for alias in node.names:
+            full = f"{node.module}.{alias.name}"
+            self.aliases[alias.asname or alias.name] = full
+            self._deny(node, full, [full], "imports denied name")
+        return False
+
+    def visit_Call(self, node: ast.Call) -> bool:
+        func = node.func
+        dotted = self._dotted(func)
+        if dotted is not None:
+            name = self._resolve(dotted)
+            _add(self.verdict.calls, name)
+            if isinstance(func, ast.Name) and func.id in _NOTABLE_BUILTINS and func.id not in self.aliases:
+                _add(self.verdict.builtins, func.id)
+            if name in _FILE_CALLS:
+                _add(self.verdict.file_access, name)
+            if name.split(".")[0] in _NETWORK_MODULES:
+                _add(self.verdict.network_access, name)
+            if name in _DYNAMIC_IMPORTS and node.args:
+                arg = node.args[0]
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    self._record_module(node, arg.value, "imports denied module")
+        if isinstance(func, ast.Attribute) and func.attr in _FILE_METHODS:
+            _add(self.verdict.file_access, dotted and self._resolve(dotted) or f"*.{func.attr}")
+        return True
+
+    def visit_Attribute(self, node: ast.Attribute) -> bool:
+        dotted = self._dotted(node)
+        if dotted is None:
+            return True
+        if self.deny:
+            self._deny(node, dotted, [dotted, *self._prefixes(self._resolve(dotted))], "uses denied name")
+        return False  # the whole chain is checked; do not revisit its parts
+
+    def visit_Name(self, node: ast.Name) -> bool:
+        if self.deny:
+            self._deny(node, node.id, [node.id, *self._prefixes(self._resolve(node.id))], "uses denied name")
+        return False
+
+    def visit_Constant(self, node: ast.Constant) -> bool:
+        if isinstance(node.value, str) and self.deny:
+            for token in _COMMAND_SPLIT_RE.split(node.value.lower()):
+                token = token.strip().split("/")[-1]
+                if token in self.deny:
+                    self._deny(node, token, [token], "string names denied command")
+        return False
+
+
+def screen_code(code: str, denylist: Optional[Iterable[str]] = None, filename: str = "<generated>") -> ScreenVerdict:
+    """
+    Statically screen generated Python in a single AST pass, before anything
+    is executed.
+
+    Collects imports (including ``__import__`` / ``importlib.import_module``
+    with a literal name), dotted calls with import aliases resolved, notable
+    builtins, and file and network access. Code is refused when it does not
+    parse, or when it touches a *denylist* entry (case-insensitive) through
+    an import or any prefix of one, a name or dotted name, or a command token
+    in a string literal. Mentions in comments are not matched.
+    """
+    deny = {d.lower() for d in denylist or ()}
+    try:
+        tree = ast.parse(code, filename=filename)
+    except (SyntaxError, ValueError) as exc:
+        message = "".join(traceback.format_exception_only(type(exc), exc)).rstrip()
+        return ScreenVerdict(allowed=False, syntax_error=message)
+
+    return _Screener(deny).run(tree)
+
+
+def scan_denylist(code: str, denylist: Set[str]) -> List[str]:
+    """
+    Denylist entries found in *code* (imports, names, command strings), as
+    written in the code. Unparseable code yields no matches; use
+    ``screen_code`` to tell it apart.
+    """
+    if not denylist:
+        return []
+    return screen_code(code, denylist).violations
@@ -0,0 +1,719 @@
+# qbtrain/agents/sandbox_pool.py
+from __future__ import annotations
+
+import atexit
+import codecs
+import json
+import logging
+import os
+import queue
+import selectors
+import shutil
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Libraries imported once by each zygote so forked scripts start with them loaded.
+_DEFAULT_PRELOAD = "numpy,pandas"
+_MAX_MSG = 65536
+
+
+class SandboxResult(NamedTuple):
+    stdout: str
+    stderr: str
+    returncode: int
+    truncated: bool = False   # stdout or stderr went past SandboxLimits.output_bytes
+
+
+# Called with ("stdout" | "stderr", text) as the script writes.
+OutputCallback = Callable[[str, str], None]
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    try:
+        return int(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def _env_limit(name: str, default: Optional[int]) -> Optional[int]:
+    """A limit from the environment; 0 or a negative value means unlimited."""
+    value = _env_int(name, default if default is not None else 0)
+    return value if value > 0 else None
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    """
+    Per-execution resource limits. The rlimits are set in the child before
+    the script runs (None leaves one as inherited); output_bytes caps what is
+    captured from each of stdout and stderr, the rest is read and dropped.
+
+    Exceeding cpu_seconds kills the script with SIGXCPU, memory_mb surfaces
+    as MemoryError, open_files and file_size_mb as OSError.
+    """
+
+    cpu_seconds: Optional[int] = 20
+    memory_mb: Optional[int] = 2048
+    open_files: Optional[int] = 256
+    file_size_mb: Optional[int] = 64
+    output_bytes: Optional[int] = 1_000_000
+
+    @classmethod
+    def from_env(cls) -> "SandboxLimits":
+        """SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_OPEN_FILES, SANDBOX_FILE_SIZE_MB, SANDBOX_OUTPUT_BYTES."""
+        return cls(
+            cpu_seconds=_env_limit("SANDBOX_CPU_SECONDS", cls.cpu_seconds),
+            memory_mb=_env_limit("SANDBOX_MEMORY_MB", cls.memory_mb),
+            open_files=_env_limit("SANDBOX_OPEN_FILES", cls.open_files),
+            file_size_mb=_env_limit("SANDBOX_FILE_SIZE_MB", cls.file_size_mb),
+            output_bytes=_env_limit("SANDBOX_OUTPUT_BYTES", cls.output_bytes),
+        )
+
+    def rlimits(self) -> List[Tuple[str, int, int]]:
+        """(resource name, soft, hard) triples for setrlimit."""
+        out: List[Tuple[str, int, int]] = []
+        if self.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL a second later if it is caught.
+            out.append(("RLIMIT_CPU", self.cpu_seconds, self.cpu_seconds + 1))
+        if self.memory_mb:
+            out.append(("RLIMIT_AS", self.memory_mb << 20, self.memory_mb << 20))
+        if self.open_files:
+            out.append(("RLIMIT_NOFILE", self.open_files, self.open_files))
+        if self.file_size_mb:
+            out.append(("RLIMIT_FSIZE", self.file_size_mb << 20, self.file_size_mb << 20))
+        return out
+
+
+def _apply_rlimits(rlimits) -> None:
+    """setrlimit each (name, soft, hard), never above the inherited hard limit."""
+    import resource
+
+    for name, soft, hard in rlimits:
+        res = getattr(resource, name, None)
+        if res is None:
+            continue
+        _, current_hard = resource.getrlimit(res)
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        resource.setrlimit(res, (soft, hard))
+
+
+def fork_supported() -> bool:
+    return hasattr(os, "fork") and hasattr(socket, "send_fds") and hasattr(socket, "AF_UNIX")
+
+
+# ---------------------------------------------------------------------------
+# Zygote (runs in its own interpreter; stdlib only until the preload)
+# ---------------------------------------------------------------------------
+
+def _read_fd(fd: int) -> bytes:
+    chunks = []
+    while True:
+        data = os.read(fd, 65536)
+        if not data:
+            break
+        chunks.append(data)
+    os.close(fd)
+    return b"".join(chunks)
+
+
+def _write_fd(fd: int, data: bytes) -> None:
+    """Write *data* and close *fd*; a child that died early just stops reading."""
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    except BrokenPipeError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _run_script_in_child(script: str, cwd: str, out_fd: int, err_fd: int, rlimits=(),
+                         src_fd: Optional[int] = None) -> None:
+    """
+    Body of a forked child: behave like ``python <script>`` run in *cwd*,
+    reading the source from *src_fd* when given. Never returns.
+    """
+    code = 1
+    try:
+        source = _read_fd(src_fd) if src_fd is not None else None
+        os.setsid()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        for fd in (devnull, out_fd, err_fd):
+            os.close(fd)
+        os.chdir(cwd)
+
+        # Forked children share the zygote's RNG state; reseed what is loaded
+        # (a later first import seeds itself from the OS).
+        import random
+        random.seed()
+        if "numpy.random" in sys.modules:
+            sys.modules["numpy.random"].seed()
+
+        sys.argv = [script]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        _apply_rlimits(rlimits)
+        code = _exec_main(script, source)
+    except BaseException:  # setup failed before the script ran
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _exec_main(script: str, source: Optional[bytes] = None) -> int:
+    import atexit as _atexit
+    import builtins
+    import io
+    import linecache
+    import traceback
+    import types
+
+    try:
+        main = types.ModuleType("__main__")
+        main.__file__ = script
+        main.__cached__ = None
+        main.__builtins__ = builtins
+        sys.modules["__main__"] = main
+        if source is None:
+            with io.open_code(script) as f:
+                source = f.read()
+        else:
+            # In-memory script: let tracebacks show its lines as if it were on disk.
+            lines = source.decode("utf-8", errors="replace").splitlines(True)
+            linecache.cache[script] = (len(source), None, lines, script)
+        exec(compile(source, script, "exec"), main.__dict__)
+        code = 0
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except BaseException as exc:
+        # Drop this function's frame so the traceback reads like `python script.py`.
+        tb = exc.__traceback__
+        while tb is not None and os.path.abspath(tb.tb_frame.f_code.co_filename) != os.path.abspath(script):
+            tb = tb.tb_next
+        if tb is None and not isinstance(exc, SyntaxError):
+            tb = exc.__traceback__
+        # A script that does not compile has no frames: the interpreter prints just the error.
+        traceback.print_exception(type(exc), exc, tb)
+        code = 1
+    # Interpreter shutdown semantics: wait for non-daemon threads, then run atexit handlers.
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread() and not thread.daemon:
+            thread.join()
+    _atexit._run_exitfuncs()
+    return code & 0xFF
+
+
+def _zygote_main(sock_fd: int) -> None:
+    """Preload libraries, then fork one child per request received on *sock_fd*."""
+    import builtins, io, linecache, random, resource, traceback, types  # noqa: F401,E401 - used by every child
+    for name in filter(None, (m.strip() for m in os.getenv("SANDBOX_PRELOAD", _DEFAULT_PRELOAD).split(","))):
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    sock = socket.socket(fileno=sock_fd)
+    sock.send(b'{"ready": true}')
+    while True:
+        try:
+            msg, fds, _flags, _addr = socket.recv_fds(sock, _MAX_MSG, 3)
+        except OSError:
+            return
+        if not msg:
+            return
+        req = json.loads(msg)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            _run_script_in_child(req["script"], req["cwd"], fds[0], fds[1], req.get("rlimits", ()),
+                                 fds[2] if len(fds) > 2 else None)
+        for fd in fds:
+            os.close(fd)
+        sock.send(json.dumps({"pid": pid}).encode())
+        _, status = os.waitpid(pid, 0)
+        sock.send(json.dumps({"returncode": os.waitstatus_to_exitcode(status)}).encode())
+
+
+# ---------------------------------------------------------------------------
+# Pool (server side)
+# ---------------------------------------------------------------------------
+
+class _Zygote:
+    """One prewarmed interpreter; runs one script at a time."""
+
+    def __init__(self) -> None:
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock = parent
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--zygote", str(child.fileno())],
+            pass_fds=(child.fileno(),),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        child.close()
+        self.ready = threading.Event()
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready.is_set():
+            return
+        self.sock.settimeout(timeout)
+        try:
+            self._recv()
+        finally:
+            self.sock.settimeout(None)
+        self.ready.set()
+
+    def _recv(self) -> dict:
+        data = self.sock.recv(_MAX_MSG)
+        if not data:
+            raise EOFError("sandbox zygote exited")
+        return json.loads(data)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        finally:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+
+    def run(self, script: str, cwd: str, timeout: Optional[float], limits: SandboxLimits,
+            on_output: Optional[OutputCallback], source: Optional[bytes] = None) -> SandboxResult:
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        send = [out_w, err_w]
+        src_w = None
+        if source is not None:
+            src_r, src_w = os.pipe()
+            send.append(src_r)
+        try:
+            req = json.dumps({"script": script, "cwd": cwd, "rlimits": limits.rlimits()}).encode()
+            socket.send_fds(self.sock, [req], send)
+        except BaseException:
+            if src_w is not None:
+                os.close(src_w)
+            raise
+        finally:
+            for fd in send:
+                os.close(fd)
+        try:
+            pid = self._recv()["pid"]
+            if src_w is not None:
+                _write_fd(src_w, source)
+                src_w = None
+            out, err, timed_out = _drain(out_r, err_r, timeout, pid, limits.output_bytes, on_output)
+        finally:
+            if src_w is not None:
+                os.close(src_w)
+            os.close(out_r)
+            os.close(err_r)
+        returncode = self._recv()["returncode"]
+        return _result(script, timeout, limits, out, err, returncode, timed_out)
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _Capture:
+    """One output stream: keeps up to *cap* bytes and reports decoded text as it arrives."""
+
+    def __init__(self, name: str, cap: Optional[int], on_output: Optional[OutputCallback]):
+        self.name = name
+        self.cap = cap
+        self.on_output = on_output
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.truncated = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, data: bytes) -> None:
+        if self.cap is not None and self.size + len(data) > self.cap:
+            data = data[: self.cap - self.size]
+            self.truncated = True
+        if data:
+            self.chunks.append(data)
+            self.size += len(data)
+            self._emit(self._decoder.decode(data))
+
+    def finish(self) -> None:
+        self._emit(self._decoder.decode(b"", final=True))
+        if self.truncated:
+            self._emit(self.notice())
+
+    def notice(self) -> str:
+        return f"\n[{self.name} truncated after {self.cap} bytes]\n"
+
+    def _emit(self, text: str) -> None:
+        if text and self.on_output is not None:
+            self.on_output(self.name, text)
+
+    def text(self) -> str:
+        text = b"".join(self.chunks).decode(errors="replace")
+        return text + self.notice() if self.truncated else text
+
+
+def _drain(out_fd: int, err_fd: int, timeout: Optional[float], pid: int,
+           cap: Optional[int] = None, on_output: Optional[OutputCallback] = None):
+    """Read both pipes to EOF (like Popen.communicate); kill the child's group on timeout."""
+    captures = {out_fd: _Capture("stdout", cap, on_output), err_fd: _Capture("stderr", cap, on_output)}
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    timed_out = False
+    with selectors.DefaultSelector() as sel:
+        for fd in captures:
+            sel.register(fd, selectors.EVENT_READ)
+        while sel.get_map():
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = sel.select(wait)
+            if not events and deadline is not None and time.monotonic() >= deadline and not timed_out:
+                timed_out = True
+                _kill_group(pid)
+                deadline = None  # the pipes close once the group is gone
+                continue
+            for key, _ in events:
+                data = os.read(key.fd, 65536)
+                if data:
+                    captures[key.fd].feed(data)
+                else:
+                    sel.unregister(key.fd)
+    for capture in captures.values():
+        capture.finish()
+    return captures[out_fd], captures[err_fd], timed_out
+
+
+def _result(script: str, timeout: Optional[float], limits: SandboxLimits,
+            out: _Capture, err: _Capture, returncode: int, timed_out: bool) -> SandboxResult:
+    stdout, stderr = out.text(), err.text()
+    if timed_out:
+        raise subprocess.TimeoutExpired([sys.executable, script], timeout, output=stdout, stderr=stderr)
+    if limits.cpu_seconds and hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+        stderr += f"CPU time limit exceeded ({limits.cpu_seconds}s)\n"
+    return SandboxResult(stdout, stderr, returncode, out.truncated or err.truncated)
+
+
+class SandboxPool:
+    """
+    Prewarmed Python interpreters ("zygotes") that run scripts in forked
+    children, so an execution skips interpreter startup and the imports in
+    SANDBOX_PRELOAD (default numpy,pandas).
+
+    Each run forks a fresh child from a zygote, which never runs user code
+    itself, so nothing leaks between executions. The child runs the script
+    like ``python <script>`` in *cwd*: stdin is /dev/null, stdout and stderr
+    are captured separately, and the exit code and tracebacks match. On
+    timeout its whole process group is killed and ``subprocess.TimeoutExpired``
+    is raised, as with ``subprocess.run``. Each run is bounded by a
+    SandboxLimits, and output can be streamed through *on_output*.
+
+    - size: zygotes, i.e. concurrent executions (SANDBOX_POOL_SIZE, default 2; 0 disables the pool)
+    """
+
+    def __init__(self, size: int = 2, start_timeout_s: float = 60.0) -> None:
+        self.size = max(1, int(size))
+        self.start_timeout_s = start_timeout_s
+        self._idle: "queue.Queue[_Zygote]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._all: List[_Zygote] = []
+        self._closed = False
+        self._runs = 0
+        self._fallbacks = 0
+        self._restarts = 0
+        for _ in range(self.size):
+            self._add()
+
+    def _add(self) -> None:
+        zygote = _Zygote()
+        with self._lock:
+            self._all.append(zygote)
+        self._idle.put(zygote)
+
+    def _discard(self, zygote: _Zygote) -> None:
+        with self._lock:
+            if zygote in self._all:
+                self._all.remove(zygote)
+            self._restarts += 1
+        zygote.close()
+        if not self._closed:
+            self._add()
+
+    def run(
+        self,
+        script_path: str,
+        *,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+        limits: Optional[SandboxLimits] = None,
+        on_output: Optional[OutputCallback] = None,
+        source: Optional[Union[str, bytes]] = None,
+    ) -> SandboxResult:
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+        cwd = os.path.abspath(str(cwd)) if cwd is not None else os.getcwd()
+        script = os.path.abspath(os.path.join(cwd, str(script_path)))
+        source = source.encode("utf-8") if isinstance(source, str) else source
+        limits = limits if limits is not None else SandboxLimits.from_env()
+        zygote = self._idle.get()
+        healthy = True
+        try:
+            zygote.wait_ready(self.start_timeout_s)
+            result = zygote.run(script, cwd, timeout, limits, on_output, source)
+            with self._lock:
+                self._runs += 1
+            return result
+        except subprocess.TimeoutExpired:
+            with self._lock:
+                self._runs += 1
+            raise
+        except (OSError, EOFError, ValueError, KeyError) as exc:
+            healthy = False
+            logger.warning("Sandbox zygote failed (%s); running the script in a new interpreter", exc)
+            with self._lock:
+                self._fallbacks += 1
+            return _run_subprocess(script, cwd, timeout, limits, on_output, source)
+        finally:
+            if healthy and zygote.alive():
+                self._idle.put(zygote)
+            else:
+                self._discard(zygote)
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            zygotes, self._all = self._all, []
+        for zygote in zygotes:
+            zygote.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "alive": sum(z.alive() for z in self._all),
+                "idle": self._idle.qsize(),
+                "runs": self._runs,
+                "fallbacks": self._fallbacks,
+                "restarts": self._restarts,
+            }
+
+
+def _exec_stdin_main(script: str) -> None:
+    """``--exec`` mode of the fallback: run the source piped on stdin as *script*."""
+    source = sys.stdin.buffer.read()
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    code = _exec_main(script, source)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def _run_subprocess(script: str, cwd: str, timeout: Optional[float], limits: SandboxLimits,
+                    on_output: Optional[OutputCallback] = None, source: Optional[bytes] = None) -> SandboxResult:
+    """The same execution in a new interpreter, for hosts without the pool."""
+    rlimits = limits.rlimits()
+    if source is None:
+        cmd = [sys.executable, script]
+    else:
+        cmd = [sys.executable, os.path.abspath(__file__), "--exec", script]
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL if source is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=hasattr(os, "setsid"),
+        preexec_fn=(lambda: _apply_rlimits(rlimits)) if rlimits and os.name == "posix" else None,
+    )
+    try:
+        if source is not None:
+            _write_fd(os.dup(proc.stdin.fileno()), source)
+            proc.stdin.close()
+        out, err, timed_out = _drain(proc.stdout.fileno(), proc.stderr.fileno(), timeout, proc.pid,
+                                     limits.output_bytes, on_output)
+    finally:
+        proc.stdout.close()
+        proc.stderr.close()
+    return _result(script, timeout, limits, out, err, proc.wait(), timed_out)
+
+
+class SandboxSession:
+    """
+    Working directory shared by the executions of one session. Uploaded
+    files are written once, read-only, under ``data/``, so retries reuse
+    them instead of copying them again; scripts run with ``path`` as cwd and
+    can write their own outputs next to ``data/``.
+    """
+
+    def __init__(self, files: Optional[Mapping[str, bytes]] = None, *, root: Optional[str] = None,
+                 prefix: str = "session_") -> None:
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+        self.data_dir = self.path / "data"
+        self.data_dir.mkdir()
+        self.files: List[str] = []
+        for name, content in (files or {}).items():
+            target = self.data_dir / Path(name).name  # uploads cannot name paths outside data/
+            target.write_bytes(content)
+            target.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            self.files.append(f"data/{target.name}")
+        self.data_dir.chmod(stat.S_IRUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+
+    def close(self, *, keep_outputs: bool = False) -> None:
+        """Delete the uploads, and with them the whole directory unless *keep_outputs*."""
+        if self.data_dir.exists():
+            self.data_dir.chmod(stat.S_IRWXU)
+            for child in self.data_dir.iterdir():
+                child.chmod(stat.S_IRUSR | stat.S_IWUSR)
+        shutil.rmtree(self.data_dir if keep_outputs else self.path, ignore_errors=True)
+        if keep_outputs and self.path.exists() and not any(self.path.iterdir()):
+            self.path.rmdir()
+
+    def __enter__(self) -> "SandboxSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_POOL: Optional[SandboxPool] = None
+_POOL_CONFIGURED = False
+_POOL_LOCK = threading.Lock()
+
+
+def get_sandbox_pool() -> Optional[SandboxPool]:
+    """Process-wide pool (SANDBOX_POOL_SIZE, default 2); None when disabled or fork is unavailable."""
+    global _POOL, _POOL_CONFIGURED
+    with _POOL_LOCK:
+        if not _POOL_CONFIGURED:
+            size = _env_int("SANDBOX_POOL_SIZE", 2)
+            if size > 0 and fork_supported():
+                _POOL = SandboxPool(size)
+                atexit.register(_POOL.close)
+            _POOL_CONFIGURED = True
+        return _POOL
+
+
+def run_python(
+    script_path: str,
+    *,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    limits: Optional[SandboxLimits] = None,
+    on_output: Optional[OutputCallback] = None,
+    source: Optional[Union[str, bytes]] = None,
+) -> SandboxResult:
+    """
+    Run a Python script like ``subprocess.run([sys.executable, script_path],
+    capture_output=True, text=True, timeout=timeout, cwd=cwd)``, on a
+    prewarmed sandbox worker when the pool is available, under *limits*
+    (default ``SandboxLimits.from_env()``). *on_output* receives output as
+    it is written. Raises ``subprocess.TimeoutExpired`` on timeout.
+
+    With *source*, the script is piped to the sandbox instead of read from
+    disk; *script_path* (relative to *cwd*) then only names it in
+    ``__file__`` and tracebacks, and need not exist.
+    """
+    limits = limits if limits is not None else SandboxLimits.from_env()
+    pool = get_sandbox_pool()
+    if pool is None:
+        cwd = os.path.abspath(str(cwd)) if cwd is not None else os.getcwd()
+        source = source.encode("utf-8") if isinstance(source, str) else source
+        script = os.path.abspath(os.path.join(cwd, str(script_path)))
+        return _run_subprocess(script, cwd, timeout, limits, on_output, source)
+    return pool.run(script_path, cwd=cwd, timeout=timeout, limits=limits, on_output=on_output, source=source)
+
+
+def stream_python(
+    script_path: str,
+    *,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    limits: Optional[SandboxLimits] = None,
+    source: Optional[Union[str, bytes]] = None,
+) -> Iterator[Tuple[str, Union[str, SandboxResult]]]:
+    """
+    ``run_python`` as a generator: yields ``("stdout" | "stderr", text)``
+    while the script runs, then ``("exit", SandboxResult)``. Raises
+    ``subprocess.TimeoutExpired`` on timeout, after the partial output.
+    """
+    events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+
+    def _target() -> None:
+        try:
+            result = run_python(script_path, cwd=cwd, timeout=timeout, limits=limits, source=source,
+                                on_output=lambda name, text: events.put((name, text)))
+            events.put(("exit", result))
+        except BaseException as exc:
+            events.put(("error", exc))
+
+    threading.Thread(target=_target, name="sandbox-stream", daemon=True).start()
+    pending: Optional[Tuple[str, object]] = None
+    while True:
+        kind, value = pending if pending is not None else events.get()
+        pending = None
+        if kind == "error":
+            raise value
+        if kind in ("stdout", "stderr"):
+            # Merge what queued up meanwhile so unbuffered scripts do not yield a chunk per write.
+            parts = [value]
+            while pending is None:
+                try:
+                    nxt = events.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt[0] == kind:
+                    parts.append(nxt[1])
+                else:
+                    pending = nxt
+            value = "".join(parts)
+        yield kind, value
+        if kind == "exit":
+            return
+
+
+if __name__ == "__main__" and len(sys.argv) == 3:
+    if sys.argv[1] == "--zygote":
+        _zygote_main(int(sys.argv[2]))
+    elif sys.argv[1] == "--exec":
+        _exec_stdin_main(sys.argv[2])
@@ -0,0 +1,221 @@
+# qbtrain/agents/scrape_cache.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key for *url*: lower-case scheme and host, default port and
+    fragment dropped, empty path as "/". The query string is kept verbatim.
+    """
+    parts = urlsplit(url.strip() if "//" in url else f"https://{url.strip()}")
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class CachedPage(NamedTuple):
+    content: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl_s: float) -> bool:
+        return time.time() - self.fetched_at < ttl_s
+
+    def can_revalidate(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class ScrapeCache:
+    """
+    On-disk (SQLite) cache of extracted page text keyed by :func:`normalize_url`.
+
+    Entries younger than ``ttl_s`` are served as is. Older entries that
+    carry an ETag / Last-Modified validator can be revalidated with a
+    conditional request (:func:`revalidate`) and refreshed via
+    :meth:`mark_revalidated` instead of re-rendering the page. Total stored
+    content is bounded by ``max_bytes``; least recently used entries are
+    evicted first.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 600.0) -> None:
+        self.db_path = db_path
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._revalidated = 0
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scrape_cache (
+              url           TEXT PRIMARY KEY,
+              content       TEXT NOT NULL,
+              etag          TEXT,
+              last_modified TEXT,
+              size          INTEGER NOT NULL,
+              fetched_at    REAL NOT NULL,
+              accessed_at   REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_cache_accessed ON scrape_cache(accessed_at)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, etag, last_modified, fetched_at FROM scrape_cache WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute("UPDATE scrape_cache SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            self._conn.commit()
+            page = CachedPage(row[0], row[1], row[2], float(row[3]))
+            if page.is_fresh(self.ttl_s):
+                self._hits += 1
+            else:
+                self._stale += 1
+            return page
+
+    def put(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        size = len(content.encode("utf-8", errors="replace"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scrape_cache(url, content, etag, last_modified, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), content, etag, last_modified, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def mark_revalidated(self, url: str) -> None:
+        """The origin confirmed the cached copy is current: restart its TTL."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scrape_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, normalize_url(url))
+            )
+            self._conn.commit()
+            self._revalidated += 1
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM scrape_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM scrape_cache ORDER BY accessed_at"):
+            victims.append((url,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM scrape_cache WHERE url = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM scrape_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scrape_cache").fetchone()
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "revalidated": self._revalidated,
+            }
+
+
+def revalidate(url: str, page: CachedPage, timeout_s: float = 10.0) -> bool:
+    """
+    Conditional GET with the cached validators. True when the origin answers
+    304 Not Modified (or returns the same ETag); False when the page changed
+    or the check failed, in which case the caller re-renders.
+    """
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; qbtrain-scraper)"}
+    if page.etag:
+        headers["If-None-Match"] = page.etag
+    if page.last_modified:
+        headers["If-Modified-Since"] = page.last_modified
+    request = urllib.request.Request(url if "//" in url else f"https://{url}", headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout_s) as resp:
+            etag = resp.headers.get("ETag")
+            return bool(page.etag) and etag == page.etag
+    except urllib.error.HTTPError as exc:
+        return exc.code == 304
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+_SCRAPE_CACHE: Optional[ScrapeCache] = None
+_SCRAPE_CACHE_CONFIGURED = False
+_SCRAPE_CACHE_LOCK = threading.Lock()
+
+
+def get_scrape_cache() -> Optional[ScrapeCache]:
+    """
+    Process-wide scrape cache used by :class:`SourceExtractionAgent`.
+    - size: SOURCE_SCRAPE_CACHE_MAX_MB (default 64; 0 disables)
+    - freshness: SOURCE_SCRAPE_CACHE_TTL_S (default 600)
+    - location: SOURCE_SCRAPE_CACHE_DB (default <tmp>/qbtrain_scrape_cache.db)
+    """
+    global _SCRAPE_CACHE, _SCRAPE_CACHE_CONFIGURED
+    with _SCRAPE_CACHE_LOCK:
+        if not _SCRAPE_CACHE_CONFIGURED:
+            try:
+                max_mb = float((os.getenv("SOURCE_SCRAPE_CACHE_MAX_MB") or "").strip() or 64)
+            except ValueError:
+                max_mb = 64.0
+            try:
+                ttl_s = float((os.getenv("SOURCE_SCRAPE_CACHE_TTL_S") or "").strip() or 600)
+            except ValueError:
+                ttl_s = 600.0
+            db_path = (os.getenv("SOURCE_SCRAPE_CACHE_DB") or "").strip() or os.path.join(
+                tempfile.gettempdir(), "qbtrain_scrape_cache.db"
+            )
+            _SCRAPE_CACHE = ScrapeCache(db_path, int(max_mb * 1024 * 1024), ttl_s) if max_mb > 0 else None
+            _SCRAPE_CACHE_CONFIGURED = True
+        return _SCRAPE_CACHE
+
+
+def set_scrape_cache(cache: Optional[ScrapeCache]) -> None:
+    """Replace the process-wide scrape cache; None disables caching."""
+    global _SCRAPE_CACHE, _SCRAPE_CACHE_CONFIGURED
+    with _SCRAPE_CACHE_LOCK:
+        _SCRAPE_CACHE = cache
+        _SCRAPE_CACHE_CONFIGURED = True
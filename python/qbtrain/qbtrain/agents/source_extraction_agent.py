@@ -1,13 +1,25 @@
 # qbtrain/agents/source_extraction_agent.py
 from __future__ import annotations
 
+import atexit
 import io
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
 
 from pydantic import BaseModel, Field
 
 from ..ai.llm import LLMClient
+from .scrape_cache import CachedPage, get_scrape_cache, revalidate
+from .source_selection import select_sources
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +47,8 @@ class LinkContent(BaseModel):
 class FileContent(BaseModel):
     file: str
     content: str
+    tokens: Optional[int] = Field(default=None, description="Token count of content (client tokenizer or approximation), set when a token budget applies")
+    truncated: bool = Field(default=False, description="Content was cut to fit the token budget")
 
 
 class SourceExtractionResult(BaseModel):
@@ -67,51 +81,228 @@ Extract all links the user wants to read from. Return JSON."""
 # Web scraping helpers (Playwright)
 # ---------------------------------------------------------------------------
 
-def _scrape_main_content(url: str, timeout_ms: int = 30_000) -> str:
+# Elements stripped before extracting text (nav, header, footer, sidebar, ads, ...)
+_NOISE_SELECTORS: List[str] = [
+    "nav", "header", "footer",
+    "[role='navigation']", "[role='banner']", "[role='contentinfo']",
+    ".sidebar", "#sidebar", ".nav", ".navbar",
+    ".footer", "#footer", ".header", "#header",
+    ".cookie-banner", ".ad", ".ads", ".advertisement",
+    ".popup", ".modal", "#cookie-consent",
+    "script", "style", "noscript", "iframe",
+]
+
+# One round trip: drop every noise element, then read <main>/<article>/[role=main]/<body>.
+_EXTRACT_MAIN_TEXT_JS = """
+(selectors) => {
+    document.querySelectorAll(selectors.join(",")).forEach(el => el.remove());
+    const main = document.querySelector("main")
+        || document.querySelector("article")
+        || document.querySelector("[role='main']")
+        || document.body;
+    return main ? main.innerText : "";
+}
+"""
+
+# Not needed for text extraction; aborted before they hit the network.
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+_STOP = object()
+
+_SKIPPED_CONTENT = "[skipped] blocked by URL filter"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            pass
+    return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = (os.getenv(name) or "").strip()
+    if raw:
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            pass
+    return default
+
+
+def _block_heavy_resources(route) -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+class RenderedPage(NamedTuple):
+    text: str
+    status: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    from_cache: bool = False
+
+
+class BrowserPool:
     """
-    Use Playwright (sync) to load *url*, then extract the main body text
-    as markdown.  Strips nav, header, footer, sidebar, and ad elements.
+    Long-lived headless Chromium processes shared by all scrapes.
+
+    Playwright's sync API is bound to the thread that started it, so each
+    browser is owned by a dedicated worker thread and scrapes are handed to
+    the workers through a queue. Every page gets a fresh browser context
+    (isolated cookies/storage), so reusing the process leaks nothing between
+    URLs. A browser is relaunched after ``pages_per_browser`` pages or when
+    it has disconnected (crash).
+
+    - size: SOURCE_SCRAPER_BROWSERS (default 4)
+    - recycle after: SOURCE_SCRAPER_PAGES_PER_BROWSER (default 50)
     """
-    from playwright.sync_api import sync_playwright  # lazy import
 
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        page = browser.new_page()
-        try:
-            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-
-            # Remove noisy elements before extracting text
-            selectors_to_remove = [
-                "nav", "header", "footer",
-                "[role='navigation']", "[role='banner']", "[role='contentinfo']",
-                ".sidebar", "#sidebar", ".nav", ".navbar",
-                ".footer", "#footer", ".header", "#header",
-                ".cookie-banner", ".ad", ".ads", ".advertisement",
-                ".popup", ".modal", "#cookie-consent",
-                "script", "style", "noscript", "iframe",
-            ]
-            for sel in selectors_to_remove:
-                page.evaluate(
-                    "(sel) => document.querySelectorAll(sel).forEach(el => el.remove())",
-                    sel,
+    def __init__(self, size: Optional[int] = None, pages_per_browser: Optional[int] = None):
+        self.size = size or _env_int("SOURCE_SCRAPER_BROWSERS", 4)
+        self.pages_per_browser = pages_per_browser or _env_int("SOURCE_SCRAPER_PAGES_PER_BROWSER", 50)
+        self._jobs: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._launches = 0
+        self._pages = 0
+        self._crashes = 0
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.size:
+                t = threading.Thread(
+                    target=self._worker_loop, name=f"scrape-browser-{len(self._threads)}", daemon=True
                 )
-
-            # Prefer <main> or <article>; fall back to <body>
-            main_el = (
-                page.query_selector("main")
-                or page.query_selector("article")
-                or page.query_selector("[role='main']")
-                or page.query_selector("body")
-            )
-            raw_text = main_el.inner_text() if main_el else ""
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, url: str, timeout_ms: int = 30_000) -> Future:
+        """Queue a scrape; the future resolves to a :class:`RenderedPage` (raw main-content text)."""
+        self._ensure_started()
+        future: Future = Future()
+        self._jobs.put((url, timeout_ms, future))
+        return future
+
+    def scrape(self, url: str, timeout_ms: int = 30_000) -> str:
+        return self.submit(url, timeout_ms).result().text
+
+    def close(self) -> None:
+        with self._lock:
+            threads = list(self._threads)
+            self._threads = []
+        for _ in threads:
+            self._jobs.put(_STOP)
+        for t in threads:
+            t.join(timeout=10)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "browsers": self.size,
+                "pages_per_browser": self.pages_per_browser,
+                "launches": self._launches,
+                "pages": self._pages,
+                "crashes": self._crashes,
+                "queued": self._jobs.qsize(),
+            }
+
+    def _worker_loop(self) -> None:
+        pw = None
+        browser = None
+        served = 0
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                url, timeout_ms, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if pw is None:
+                        from playwright.sync_api import sync_playwright  # lazy import
+
+                        pw = sync_playwright().start()
+                    if browser is not None and (served >= self.pages_per_browser or not browser.is_connected()):
+                        self._close_browser(browser)
+                        browser = None
+                    if browser is None:
+                        browser = pw.chromium.launch(headless=True)
+                        served = 0
+                        with self._lock:
+                            self._launches += 1
+                    served += 1
+                    rendered = self._scrape_page(browser, url, timeout_ms)
+                except Exception as exc:
+                    if browser is not None and not browser.is_connected():
+                        browser = None
+                        with self._lock:
+                            self._crashes += 1
+                    future.set_exception(exc)
+                else:
+                    with self._lock:
+                        self._pages += 1
+                    future.set_result(rendered)
         finally:
+            if browser is not None:
+                self._close_browser(browser)
+            if pw is not None:
+                try:
+                    pw.stop()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _close_browser(browser) -> None:
+        try:
             browser.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _scrape_page(browser, url: str, timeout_ms: int) -> RenderedPage:
+        context = browser.new_context()
+        try:
+            context.route("**/*", _block_heavy_resources)
+            page = context.new_page()
+            response = page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+            text = page.evaluate(_EXTRACT_MAIN_TEXT_JS, _NOISE_SELECTORS) or ""
+        finally:
+            context.close()
+        headers = response.headers if response is not None else {}
+        return RenderedPage(
+            text=text,
+            status=response.status if response is not None else 0,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+        )
+
+
+_BROWSER_POOL: Optional[BrowserPool] = None
+_BROWSER_POOL_LOCK = threading.Lock()
+
 
-    # Light cleanup: collapse excessive blank lines
-    lines = raw_text.splitlines()
+def get_browser_pool() -> BrowserPool:
+    """Process-wide :class:`BrowserPool`, closed at interpreter exit."""
+    global _BROWSER_POOL
+    with _BROWSER_POOL_LOCK:
+        if _BROWSER_POOL is None:
+            _BROWSER_POOL = BrowserPool()
+            atexit.register(_BROWSER_POOL.close)
+        return _BROWSER_POOL
+
+
+def _clean_text(raw_text: str) -> str:
+    """Light cleanup: strip lines and collapse excessive blank lines."""
     cleaned: list[str] = []
     blank_run = 0
-    for line in lines:
+    for line in raw_text.splitlines():
         stripped = line.strip()
         if not stripped:
             blank_run += 1
@@ -124,61 +315,274 @@ def _scrape_main_content(url: str, timeout_ms: int = 30_000) -> str:
     return "\n".join(cleaned).strip()
 
 
+def _scrape_main_content(url: str, timeout_ms: int = 30_000) -> str:
+    """
+    Load *url* in the shared :class:`BrowserPool` and extract the main body
+    text.  Strips nav, header, footer, sidebar, and ad elements.
+    """
+    return _clean_text(get_browser_pool().scrape(url, timeout_ms=timeout_ms))
+
+
 # ---------------------------------------------------------------------------
 # File processing helpers
 # ---------------------------------------------------------------------------
 
-def _process_file(filename: str, data: bytes) -> str:
+_WORD_RE = re.compile(r"\S+")
+
+# PDFs with at least this many pages may be split across SOURCE_PDF_WORKERS processes.
+_PDF_PARALLEL_MIN_PAGES = 32
+_PDF_PAGES_PER_TASK = 8
+
+
+def take_words(text: str, limit: int) -> Tuple[str, int, bool]:
     """
-    Extract text content from a file given its name and raw bytes.
-    Supports: .txt, .md, .pdf, .docx
+    First *limit* whitespace-separated words of *text* in one bounded scan.
+    Returns (text, word_count, truncated); truncated text is re-joined with
+    single spaces, untruncated text is returned unchanged.
     """
-    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if limit <= 0:
+        return "", 0, _WORD_RE.search(text) is not None
+    words = [m.group() for m in islice(_WORD_RE.finditer(text), limit + 1)]
+    if len(words) <= limit:
+        return text, len(words), False
+    return " ".join(words[:limit]), limit, True
+
+
+class FileText(NamedTuple):
+    content: str
+    tokens: int
+    truncated: bool
+    pages_read: int
+
+
+def _file_ext(filename: str) -> str:
+    return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+
+def _pdf_workers() -> int:
+    """Processes for large-PDF extraction: SOURCE_PDF_WORKERS (default 0 = extract inline)."""
+    raw = (os.getenv("SOURCE_PDF_WORKERS") or "").strip()
+    try:
+        return max(0, int(raw)) if raw else 0
+    except ValueError:
+        return 0
+
+
+def iter_file_pages(filename: str, data: bytes, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of *filename* incrementally: PDF pages, DOCX paragraphs,
+    or the whole decoded text for .txt/.md. Nothing past the last page the
+    caller consumes is extracted. Supports: .txt, .md, .pdf, .docx
+    """
+    ext = _file_ext(filename)
 
     if ext in ("txt", "md"):
-        return data.decode("utf-8", errors="replace")
+        yield data.decode("utf-8", errors="replace")
+        return
 
     if ext == "pdf":
-        return _extract_pdf_text(data)
+        yield from _iter_pdf_pages(data, _pdf_workers() if workers is None else workers)
+        return
 
     if ext == "docx":
-        return _extract_docx_text(data)
+        yield from _iter_docx_paragraphs(data)
+        return
 
     raise ValueError(f"Unsupported file type: .{ext} (file: {filename})")
 
 
-def _extract_pdf_text(data: bytes) -> str:
+def read_file_within_budget(
+    filename: str, data: bytes, max_tokens: Optional[int] = None, token_counter=None
+) -> FileText:
+    """
+    Extract *filename* page by page until *max_tokens* tokens are collected
+    (no limit when None). Extraction stops at the page that exhausts the
+    budget, so a large document costs roughly the pages actually used.
+    Tokens are whitespace-separated words unless a *token_counter* (see
+    qbtrain.ai.llm.TokenCounter) is given.
+    """
+    truncate = token_counter.truncate if token_counter is not None else take_words
+    pages: List[str] = []
+    used = 0
+    truncated = False
+    pages_read = 0
+    it = iter_file_pages(filename, data)
+    try:
+        for page in it:
+            pages_read += 1
+            if max_tokens is None:
+                pages.append(page)
+                continue
+            text, n, cut = truncate(page, max_tokens - used)
+            if n:
+                pages.append(text)
+            used += n
+            if cut or used >= max_tokens:
+                # A following page means there is more text than the budget allowed.
+                truncated = cut or next(it, None) is not None
+                break
+    finally:
+        it.close()
+    content = "\n\n".join(pages)
+    if max_tokens is not None:
+        tokens = used
+    else:
+        tokens = token_counter.count(content) if token_counter is not None else len(content.split())
+    return FileText(content, tokens, truncated, pages_read)
+
+
+def _process_file(filename: str, data: bytes) -> str:
+    """
+    Extract text content from a file given its name and raw bytes.
+    Supports: .txt, .md, .pdf, .docx
+    """
+    return read_file_within_budget(filename, data).content
+
+
+def _iter_pdf_pages(data: bytes, workers: int) -> Iterator[str]:
     import pymupdf  # PyMuPDF — fast, no Java dependency
 
-    pages: list[str] = []
     with pymupdf.open(stream=data, filetype="pdf") as doc:
-        for page in doc:
-            text = page.get_text()
-            if text and text.strip():
-                pages.append(text.strip())
-    return "\n\n".join(pages)
+        page_count = doc.page_count
+        if workers <= 1 or page_count < _PDF_PARALLEL_MIN_PAGES:
+            for page in doc:
+                text = page.get_text()
+                if text and text.strip():
+                    yield text.strip()
+            return
+
+    # Large PDF: page batches extracted in worker processes, yielded in page order.
+    # Only ~2 batches per worker run ahead of the consumer; the rest are cancelled on close.
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_pdf_worker_init, initargs=(data,))
+    try:
+        starts = iter(range(0, page_count, _PDF_PAGES_PER_TASK))
+        inflight: Deque[Future] = deque(
+            pool.submit(_pdf_worker_pages, start, min(page_count, start + _PDF_PAGES_PER_TASK))
+            for start in islice(starts, workers * 2)
+        )
+        while inflight:
+            texts = inflight.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                inflight.append(pool.submit(_pdf_worker_pages, start, min(page_count, start + _PDF_PAGES_PER_TASK)))
+            for text in texts:
+                if text and text.strip():
+                    yield text.strip()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 
+_PDF_WORKER_DOC = None
 
-def _extract_docx_text(data: bytes) -> str:
+
+def _pdf_worker_init(data: bytes) -> None:
+    global _PDF_WORKER_DOC
+    import pymupdf
+
+    _PDF_WORKER_DOC = pymupdf.open(stream=data, filetype="pdf")
+
+
+def _pdf_worker_pages(start: int, stop: int) -> List[str]:
+    return [_PDF_WORKER_DOC[i].get_text() for i in range(start, stop)]
+
+
+def _iter_docx_paragraphs(data: bytes) -> Iterator[str]:
     from docx import Document  # python-docx
 
     doc = Document(io.BytesIO(data))
-    paragraphs = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-    return "\n\n".join(paragraphs)
+    for p in doc.paragraphs:
+        if p.text and p.text.strip():
+            yield p.text
+
+
+class _BufferedTracer:
+    """Records ``trace`` calls made off the request thread; ``replay`` forwards them in order."""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    def trace(self, agent_name: str, __type__: str, **kwargs: Any) -> None:
+        self.calls.append((agent_name, __type__, kwargs))
+
+    def replay(self, tracer) -> None:
+        for agent_name, type_, kwargs in self.calls:
+            tracer.trace(agent_name, type_, **kwargs)
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Background threads for file parsing and scrape-cache revalidation."""
+    global _EXECUTOR
+    with _BROWSER_POOL_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="source-extraction")
+        return _EXECUTOR
+
+
+def _revalidate_or_render(pool: BrowserPool, url: str, cached: CachedPage, timeout_ms: int) -> RenderedPage:
+    """Serve a stale cache entry if the origin says it is unchanged, else render the page again."""
+    if revalidate(url, cached, timeout_s=min(10.0, timeout_ms / 1000)):
+        return RenderedPage(cached.content, 304, cached.etag, cached.last_modified, from_cache=True)
+    return pool.submit(url, timeout_ms).result()
 
 
 # ---------------------------------------------------------------------------
 # Agent
 # ---------------------------------------------------------------------------
 
+class _LatencyAverage:
+    """Exponentially weighted mean of recent latencies (thread-safe)."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, ms: float) -> None:
+        with self._lock:
+            self.value = ms if self.value is None else self.value + self.alpha * (ms - self.value)
+
+
+# Recent LLM link-extraction latency: the estimated saving when the rule path answers instead.
+_LLM_LINK_LATENCY = _LatencyAverage()
+
+
 class SourceExtractionAgent:
     """
     Takes a user query and an optional list of files, then:
-    1. Uses an LLM to extract only the links the user wants to read from.
-    2. Scrapes each link for its main body content via Playwright.
-    3. Processes each uploaded file (docx, txt, md, pdf) into text.
-
-    Returns ``SourceExtractionResult`` with ``files`` and ``links`` lists.
+    1. Selects the links the user wants to read from: literal http(s) URLs
+       by rule when the query is unambiguous (see :func:`select_sources`),
+       otherwise via the LLM. Disable the rule path with
+       ``link_fast_path=False`` / SOURCE_LINK_FAST_PATH=0.
+    2. Scrapes the links concurrently for their main body content via the
+       shared Playwright :class:`BrowserPool`.
+    3. Processes each uploaded file (docx, txt, md, pdf) into text, in a
+       background thread while steps 1-2 run.
+
+    Scraping limits (constructor args override the env defaults):
+    - max_concurrency: links in flight per call (SOURCE_SCRAPER_CONCURRENCY, default: pool size)
+    - per_host_limit: links in flight per host (SOURCE_SCRAPER_PER_HOST, default 2)
+    - scrape_deadline_s: overall budget for all links (SOURCE_SCRAPER_DEADLINE_S, default 60);
+      links still pending when it expires are reported as errors
+
+    ``url_filter`` (e.g. a compiled allowlist) is checked before scraping;
+    rejected links are never loaded and come back as ``[skipped]`` entries.
+
+    ``before_scrape`` is called once, right before the first page load (only
+    when there are links to scrape). It may block, e.g. on a speculative
+    injection classifier, and raises ``ExecutionCancelledError`` to abort
+    before any request leaves the server; link selection and file parsing
+    have already run by then.
+
+    With ``use_cache`` extracted text is kept in the shared scrape cache
+    (see :func:`get_scrape_cache`): fresh entries skip the browser, stale
+    ones are revalidated with a conditional request and only re-rendered
+    when the page changed. Each ``scrape_link`` trace carries ``cache``:
+    hit / revalidated / refreshed / miss / disabled.
+
+    Returns ``SourceExtractionResult`` with ``files`` and ``links`` lists, in input order.
     """
 
     def __init__(
@@ -186,9 +590,27 @@ class SourceExtractionAgent:
         *,
         llm_client: LLMClient,
         scrape_timeout_ms: int = 30_000,
+        max_concurrency: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+        scrape_deadline_s: Optional[float] = None,
+        url_filter: Optional[Callable[[str], bool]] = None,
+        use_cache: bool = True,
+        link_fast_path: Optional[bool] = None,
+        before_scrape: Optional[Callable[[], None]] = None,
     ):
         self.llm_client = llm_client
+        self.url_filter = url_filter
+        self.before_scrape = before_scrape
+        self.use_cache = use_cache
+        self.link_fast_path = (
+            link_fast_path if link_fast_path is not None else _env_int("SOURCE_LINK_FAST_PATH", 1) != 0
+        )
         self.scrape_timeout_ms = scrape_timeout_ms
+        self.max_concurrency = max_concurrency or _env_int("SOURCE_SCRAPER_CONCURRENCY", 0) or None
+        self.per_host_limit = per_host_limit or _env_int("SOURCE_SCRAPER_PER_HOST", 2)
+        self.scrape_deadline_s = (
+            scrape_deadline_s if scrape_deadline_s is not None else _env_float("SOURCE_SCRAPER_DEADLINE_S", 60.0)
+        )
 
     # ------ link extraction via LLM ------
 
@@ -208,13 +630,108 @@ class SourceExtractionAgent:
     # ------ web scraping ------
 
     def _scrape_links(self, links: List[ExtractedLink], tracer=None) -> List[LinkContent]:
+        """
+        Scrape *links* through the browser pool, keeping at most
+        ``max_concurrency`` in flight overall and ``per_host_limit`` per host.
+        Results and trace entries follow the input order.
+        """
+        pool = get_browser_pool()
+        cap = max(1, self.max_concurrency or pool.size)
+        deadline = time.monotonic() + self.scrape_deadline_s
+        hosts = [(urlsplit(link.url).hostname or "").lower() for link in links]
+        skipped = {
+            idx for idx, link in enumerate(links) if self.url_filter is not None and not self.url_filter(link.url)
+        }
+
+        waiting = [idx for idx in range(len(links)) if idx not in skipped]
+        running: Dict[Future, int] = {}
+        host_load: Dict[str, int] = {}
+        started: Dict[int, float] = {}
+        finished: Dict[int, float] = {}
+        outcomes: Dict[int, Tuple[str, Optional[BaseException]]] = {}
+
+        cache = get_scrape_cache() if self.use_cache else None
+        cache_status: Dict[int, str] = {idx: "disabled" if cache is None else "miss" for idx in waiting}
+        stale: Dict[int, CachedPage] = {}
+        if cache is not None:
+            for idx in list(waiting):
+                cached = cache.get(links[idx].url)
+                if cached is None:
+                    continue
+                if cached.is_fresh(cache.ttl_s):
+                    waiting.remove(idx)
+                    started[idx] = finished[idx] = time.monotonic()
+                    outcomes[idx] = (cached.content, None)
+                    cache_status[idx] = "hit"
+                    continue
+                cache_status[idx] = "refreshed"
+                if cached.can_revalidate():
+                    stale[idx] = cached
+
+        while waiting or running:
+            for idx in list(waiting):
+                if len(running) >= cap:
+                    break
+                if host_load.get(hosts[idx], 0) >= self.per_host_limit:
+                    continue
+                waiting.remove(idx)
+                host_load[hosts[idx]] = host_load.get(hosts[idx], 0) + 1
+                started[idx] = time.monotonic()
+                if idx in stale:
+                    future = _get_executor().submit(
+                        _revalidate_or_render, pool, links[idx].url, stale[idx], self.scrape_timeout_ms
+                    )
+                else:
+                    future = pool.submit(links[idx].url, timeout_ms=self.scrape_timeout_ms)
+                future.add_done_callback(lambda _f, i=idx: finished.setdefault(i, time.monotonic()))
+                running[future] = idx
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = running.pop(future)
+                host_load[hosts[idx]] -= 1
+                exc = future.exception()
+                if exc is not None:
+                    outcomes[idx] = ("", exc)
+                    continue
+                page = future.result()
+                if page.from_cache:
+                    outcomes[idx] = (page.text, None)
+                    cache.mark_revalidated(links[idx].url)
+                    cache_status[idx] = "revalidated"
+                    continue
+                content = _clean_text(page.text)
+                outcomes[idx] = (content, None)
+                if cache is not None and 200 <= page.status < 300:
+                    cache.put(links[idx].url, content, page.etag, page.last_modified)
+
+        for future, idx in running.items():
+            future.cancel()
+            outcomes[idx] = ("", TimeoutError(f"scrape deadline of {self.scrape_deadline_s:g}s exceeded"))
+        for idx in waiting:
+            outcomes[idx] = ("", TimeoutError(f"scrape deadline of {self.scrape_deadline_s:g}s exceeded before start"))
+
+        now = time.monotonic()
         results: List[LinkContent] = []
-        for link in links:
-            try:
-                import time
-                t0 = time.time()
-                content = _scrape_main_content(link.url, timeout_ms=self.scrape_timeout_ms)
-                latency = round((time.time() - t0) * 1000)
+        for idx, link in enumerate(links):
+            if idx in skipped:
+                results.append(LinkContent(link=link.url, content=_SKIPPED_CONTENT))
+                if tracer:
+                    tracer.trace(
+                        "SourceExtraction", "scrape",
+                        operation="scrape_link",
+                        link=link.url,
+                        reason=link.reason,
+                        latency_ms=0,
+                        status="skipped",
+                    )
+                continue
+            content, exc = outcomes[idx]
+            latency = round((finished.get(idx, now) - started.get(idx, now)) * 1000)
+            if exc is None:
                 results.append(LinkContent(link=link.url, content=content))
                 if tracer:
                     tracer.trace(
@@ -224,9 +741,10 @@ class SourceExtractionAgent:
                         reason=link.reason,
                         latency_ms=latency,
                         content_length=len(content),
+                        cache=cache_status[idx],
                         status="ok",
                     )
-            except Exception as exc:
+            else:
                 logger.warning("Failed to scrape %s: %s", link.url, exc)
                 results.append(LinkContent(link=link.url, content=f"[error] {exc}"))
                 if tracer:
@@ -235,7 +753,8 @@ class SourceExtractionAgent:
                         operation="scrape_link",
                         link=link.url,
                         reason=link.reason,
-                        latency_ms=round((time.time() - t0) * 1000),
+                        latency_ms=latency,
+                        cache=cache_status[idx],
                         status="error",
                         error=str(exc),
                     )
@@ -244,17 +763,51 @@ class SourceExtractionAgent:
     # ------ file processing ------
 
     @staticmethod
-    def _process_files(files_list: List[Tuple[str, bytes]], tracer=None) -> List[FileContent]:
+    def _process_files(
+        files_list: List[Tuple[str, bytes]],
+        tracer=None,
+        max_tokens_per_file: Optional[int] = None,
+        max_total_tokens: Optional[int] = None,
+        token_counter=None,
+    ) -> List[FileContent]:
+        """
+        Extract each file in order. With token budgets (counted by
+        *token_counter*, else whitespace-separated words) a file is only read
+        up to ``min(max_tokens_per_file, remaining total)``; once the total is
+        spent, later files are skipped unread.
+        """
         results: List[FileContent] = []
+        remaining = max_total_tokens
         for filename, data in files_list:
+            ext = _file_ext(filename) or "unknown"
+            if remaining is not None and remaining <= 0:
+                results.append(FileContent(file=filename, content="", tokens=0, truncated=True))
+                if tracer:
+                    tracer.trace(
+                        "SourceExtraction", "file",
+                        operation="process_file",
+                        filename=filename,
+                        file_type=ext,
+                        file_size=len(data),
+                        latency_ms=0,
+                        status="skipped",
+                    )
+                continue
+            budgets = [b for b in (max_tokens_per_file, remaining) if b is not None]
             try:
                 import time
                 t0 = time.time()
-                content = _process_file(filename, data)
+                extracted = read_file_within_budget(
+                    filename, data, min(budgets) if budgets else None, token_counter=token_counter
+                )
                 latency = round((time.time() - t0) * 1000)
-                results.append(FileContent(file=filename, content=content))
+                content = extracted.content
+                results.append(FileContent(
+                    file=filename, content=content, tokens=extracted.tokens, truncated=extracted.truncated,
+                ))
+                if remaining is not None:
+                    remaining -= extracted.tokens
                 if tracer:
-                    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "unknown"
                     tracer.trace(
                         "SourceExtraction", "file",
                         operation="process_file",
@@ -263,6 +816,9 @@ class SourceExtractionAgent:
                         file_size=len(data),
                         latency_ms=latency,
                         content_length=len(content),
+                        tokens=extracted.tokens,
+                        pages_read=extracted.pages_read,
+                        truncated=extracted.truncated,
                         status="ok",
                     )
             except Exception as exc:
@@ -287,6 +843,9 @@ class SourceExtractionAgent:
         query: str,
         files_list: Optional[List[Tuple[str, bytes]]] = None,
         tracer=None,
+        max_tokens_per_file: Optional[int] = None,
+        max_file_tokens: Optional[int] = None,
+        token_counter=None,
     ) -> SourceExtractionResult:
         """
         Parameters
@@ -297,6 +856,12 @@ class SourceExtractionAgent:
             Uploaded files to extract text from.
         tracer : optional
             Tracer instance for observability.
+        max_tokens_per_file, max_file_tokens : int, optional
+            Token budgets per file and across all files; extraction stops
+            reading a document once its budget is spent.
+        token_counter : optional
+            ``qbtrain.ai.llm.TokenCounter`` the budgets are measured in
+            (typically ``llm_client.token_counter()``); words when omitted.
 
         Returns
         -------
@@ -305,30 +870,75 @@ class SourceExtractionAgent:
         """
         import time
 
-        # 1. Extract links from the query via LLM
-        t0 = time.time()
-        extracted_links = self._extract_links(query, tracer=tracer)
-        if tracer:
-            tracer.trace(
-                "SourceExtraction", "llm",
-                operation="extract_links",
-                latency_ms=round((time.time() - t0) * 1000),
-                links_found=len(extracted_links),
-                links=[{"url": l.url, "reason": l.reason} for l in extracted_links],
+        # Files don't depend on the LLM or the scrapes: parse them in the background.
+        # Their trace entries are buffered and replayed here to keep the tracer single-threaded.
+        file_tracer = _BufferedTracer() if tracer else None
+        file_future = (
+            _get_executor().submit(
+                self._process_files, files_list, file_tracer,
+                max_tokens_per_file=max_tokens_per_file, max_total_tokens=max_file_tokens,
+                token_counter=token_counter,
             )
+            if files_list
+            else None
+        )
+
+        # 1. Select links: by rule when the query is unambiguous, else via the LLM
+        t0 = time.time()
+        if self.link_fast_path:
+            selection, reason = select_sources(query, [name for name, _ in files_list or []])
+        else:
+            selection, reason = None, "fast path disabled"
+        if selection is not None:
+            extracted_links = [ExtractedLink(url=url, reason="literal URL in query") for url in selection.urls]
+            if tracer:
+                saved = _LLM_LINK_LATENCY.value
+                tracer.trace(
+                    "SourceExtraction", "rules",
+                    operation="extract_links",
+                    path="rules",
+                    reason=reason,
+                    latency_ms=round((time.time() - t0) * 1000, 2),
+                    est_time_saved_ms=round(saved) if saved is not None else None,
+                    links_found=len(extracted_links),
+                    links=[{"url": l.url, "reason": l.reason} for l in extracted_links],
+                    files_referenced=selection.files,
+                )
+        else:
+            extracted_links = self._extract_links(query, tracer=tracer)
+            latency_ms = round((time.time() - t0) * 1000)
+            _LLM_LINK_LATENCY.update(latency_ms)
+            if tracer:
+                tracer.trace(
+                    "SourceExtraction", "llm",
+                    operation="extract_links",
+                    path="llm",
+                    reason=reason,
+                    latency_ms=latency_ms,
+                    links_found=len(extracted_links),
+                    links=[{"url": l.url, "reason": l.reason} for l in extracted_links],
+                )
 
-        # 2. Scrape each link
+        # 2. Scrape the links concurrently (page loads are side effects: gate them first)
+        if extracted_links and self.before_scrape:
+            self.before_scrape()
         link_contents = self._scrape_links(extracted_links, tracer=tracer) if extracted_links else []
 
-        # 3. Process uploaded files
-        file_contents = self._process_files(files_list, tracer=tracer) if files_list else []
+        # 3. Collect the uploaded files
+        file_contents = file_future.result() if file_future else []
+        if file_tracer is not None:
+            file_tracer.replay(tracer)
 
         # 4. Summary trace
         if tracer:
             successful_files = [fc.file for fc in file_contents if not fc.content.startswith("[error]")]
             failed_files = [fc.file for fc in file_contents if fc.content.startswith("[error]")]
-            successful_links = [lc.link for lc in link_contents if not lc.content.startswith("[error]")]
+            successful_links = [
+                lc.link for lc in link_contents
+                if not lc.content.startswith("[error]") and lc.content != _SKIPPED_CONTENT
+            ]
             failed_links = [lc.link for lc in link_contents if lc.content.startswith("[error]")]
+            skipped_links = [lc.link for lc in link_contents if lc.content == _SKIPPED_CONTENT]
             tracer.trace(
                 "SourceExtraction", "summary",
                 operation="extract_complete",
@@ -338,6 +948,7 @@ class SourceExtractionAgent:
                 links_scraped=len(link_contents),
                 links_success=successful_links,
                 links_failed=failed_links,
+                links_skipped=skipped_links,
             )
 
         return SourceExtractionResult(files=file_contents, links=link_contents)
@@ -0,0 +1,109 @@
+# qbtrain/agents/source_selection.py
+from __future__ import annotations
+
+import difflib
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Explicit http(s) links; trailing sentence punctuation is stripped afterwards.
+_URL_RE = re.compile(r"\bhttps?://[^\s<>\"'`\]]+", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+# Scheme-less host names ("example.com/page", "www.site.org") and file names ("report.pdf").
+_DOTTED_NAME_RE = re.compile(r"(?<![\w@/.-])(?:[\w-]+\.)+[a-z][a-z0-9]{1,9}\b(?:/\S*)?", re.IGNORECASE)
+# Phrases that make a literal URL something other than a source to read.
+_HEDGE_RE = re.compile(
+    r"\b(?:e\.g\.|i\.e\.|for example|for instance|such as|example|sample|placeholder|"
+    r"not|don't|do not|never|ignore|except|instead|avoid|without|unless|rather than)\b",
+    re.IGNORECASE,
+)
+_PLACEHOLDER_HOST_RE = re.compile(r"^(?:[\w-]+\.)*example\.(?:com|org|net)$|^(?:[\w-]+\.)*(?:test|invalid)$")
+_TRAILING_PUNCT = ".,;:!?'\""
+
+# Extensions that mark a dotted token as a file name rather than a host.
+_FILE_EXTENSIONS = frozenset({
+    "pdf", "docx", "doc", "txt", "md", "csv", "tsv", "xlsx", "xls", "pptx", "json", "xml", "yaml", "yml",
+    "png", "jpg", "jpeg", "gif", "py", "ipynb", "html", "htm", "log", "zip",
+})
+
+
+class SourceSelection(NamedTuple):
+    urls: List[str]
+    files: List[str]   # uploaded file names referenced in the query
+
+
+def _clean_url(url: str) -> str:
+    url = url.rstrip(_TRAILING_PUNCT)
+    # "(see https://x.org/a)" – drop a closing parenthesis that has no opening one in the URL.
+    while url.endswith(")") and url.count("(") < url.count(")"):
+        url = url[:-1].rstrip(_TRAILING_PUNCT)
+    return url
+
+
+def _name_key(name: str) -> str:
+    return re.sub(r"[\s_\-]+", " ", name.strip().lower())
+
+
+class FileNameIndex:
+    """
+    Case- and separator-insensitive lookup of uploaded file names, by full
+    name or by stem, with a close-match fallback for small typos.
+    """
+
+    def __init__(self, filenames: Iterable[str]):
+        self._by_key: Dict[str, str] = {}
+        for name in filenames:
+            key = _name_key(name)
+            self._by_key.setdefault(key, name)
+            stem = key.rsplit(".", 1)[0] if "." in key else key
+            self._by_key.setdefault(stem, name)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_key)
+
+    def match(self, token: str) -> Optional[str]:
+        key = _name_key(token)
+        hit = self._by_key.get(key)
+        if hit is None and self._by_key and "." in key:
+            close = difflib.get_close_matches(key, list(self._by_key), n=1, cutoff=0.85)
+            hit = self._by_key[close[0]] if close else None
+        return hit
+
+
+def select_sources(query: str, filenames: Iterable[str] = ()) -> Tuple[Optional[SourceSelection], str]:
+    """
+    Rule-based link selection for *query*. Returns ``(selection, reason)``;
+    selection is None when the query is ambiguous and the LLM should decide:
+    scheme-less host names, literal URLs next to hedging words ("for
+    example", "do not", ...) or placeholder hosts. Otherwise every literal
+    http(s) URL is selected (possibly none), and dotted tokens that name an
+    uploaded file (or carry a document extension) count as file references.
+    """
+    urls: List[str] = []
+    for m in _URL_RE.finditer(query):
+        url = _clean_url(m.group())
+        if url not in urls:
+            urls.append(url)
+
+    rest = _EMAIL_RE.sub(" ", _URL_RE.sub(" ", query))
+    index = FileNameIndex(filenames)
+    files: List[str] = []
+    for m in _DOTTED_NAME_RE.finditer(rest):
+        token = _clean_url(m.group())
+        name = index.match(token) if index else None
+        if name is not None:
+            if name not in files:
+                files.append(name)
+            continue
+        if "/" not in token and token.rsplit(".", 1)[-1].lower() in _FILE_EXTENSIONS:
+            continue
+        return None, f"scheme-less host: {token}"
+
+    if urls:
+        hedge = _HEDGE_RE.search(rest)
+        if hedge is not None:
+            return None, f"hedged mention: {hedge.group()!r}"
+        for url in urls:
+            host = re.sub(r"^https?://(?:[^/@]*@)?", "", url, flags=re.IGNORECASE).split("/", 1)[0]
+            if _PLACEHOLDER_HOST_RE.match(host.split(":", 1)[0].lower()):
+                return None, f"placeholder host: {host}"
+    return SourceSelection(urls, files), "literal URLs" if urls else "no links"
@@ -15,15 +15,18 @@ from typing import (
     Tuple,
 )
 
+import hashlib
 import json
+import threading
 import time
+from collections import OrderedDict
 
 from pydantic import BaseModel, RootModel, Field
 
 from qbtrain.tracers import AgentTracer, Tracer
 
 from ..ai.llm import LLMClient
-from ..exceptions.exceptions import PermissionError
+from ..exceptions.exceptions import ExecutionCancelledError, PermissionError
 from qbtrain.utils.authutils import Authorizer
 
 from ..utils.streamingutils import stream_message_events
@@ -36,6 +39,7 @@ from ..utils.sqlutils import (
     execute_sql,
     analyze_sql,
     extract_single_sql_statement,
+    get_schema_version,
 )
 from ..utils.jsonutils import to_json_str
 from ..utils.traceutils import (
@@ -136,6 +140,110 @@ class SQLGenResponseModel(BaseModel):
 EventType = Literal["action", "message", "trace"]
 
 
+def normalize_query_text(text: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation so near-identical questions share a key."""
+    s = re.sub(r"\s+", " ", str(text or "")).strip().casefold()
+    return s.rstrip(" .?!;")
+
+
+class SQLPlanCache:
+    """
+    Thread-safe LRU cache of validated plans and the SQL generated from them.
+
+    Entries expire after ``ttl_seconds`` and are dropped when the database
+    schema version they were recorded under no longer matches. Only plans whose
+    SQL executed successfully are stored; hits are still executed through
+    ``SQLAgent.execute_sql_with_permissions`` so authorization is never skipped.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = 3600.0, cache_writes: bool = False):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.cache_writes = cache_writes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_schema_version(self, schema_version: int) -> None:
+        # Caller holds the lock. Any DDL bumps the version, so every stored plan becomes suspect.
+        if self._schema_version != schema_version:
+            self._entries.clear()
+            self._schema_version = schema_version
+
+    @staticmethod
+    def make_key(
+        *,
+        user_query: str,
+        exc_method: str,
+        agent_permissions: Iterable[str],
+        user_permissions: Iterable[str],
+        schema_version: int,
+        model: Optional[str] = None,
+        prompts_fingerprint: str = "",
+    ) -> str:
+        raw = json.dumps(
+            [
+                normalize_query_text(user_query),
+                exc_method,
+                sorted(set(agent_permissions)),
+                sorted(set(user_permissions)),
+                int(schema_version),
+                model or "",
+                prompts_fingerprint,
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, *, schema_version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync_schema_version(schema_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and time.monotonic() - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, key: str, *, plan: Dict[str, Any], sql: str, schema_version: int) -> None:
+        with self._lock:
+            self._sync_schema_version(schema_version)
+            self._entries[key] = {
+                "plan": plan,
+                "sql": sql,
+                "schema_version": schema_version,
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one entry, or every entry when *key* is None (e.g. after a schema change)."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
 class SQLAgent:
     """
     SQLAgent: query -> planner -> SQL generator -> execute -> return response.
@@ -162,6 +270,8 @@ class SQLAgent:
         max_steps: int = 5,
         tracer: Optional[Tracer] = None,
         stream: bool = False,
+        plan_cache: Optional[SQLPlanCache] = None,
+        before_execute: Optional[Callable[[], None]] = None,
         **kwargs: Any,
     ):
         if prompts is None:
@@ -178,6 +288,10 @@ class SQLAgent:
         self.tracer: Optional[Tracer] = tracer if tracer else AgentTracer()
         self._trace_state: TraceState = TraceState()
         self.stream = stream
+        self.plan_cache = plan_cache
+        # Called right before any side effect (SQL execution, stored procedure call).
+        # It may block, and raises ExecutionCancelledError to abort the run.
+        self.before_execute = before_execute
         self._last_streamed_trace_item: Optional[Dict[str, Any]] = None
 
     def _safe_trace(self, __type__: str, **kwargs: Any) -> None:
@@ -205,7 +319,7 @@ class SQLAgent:
         self._last_streamed_trace_item = None
 
         if exc_method in ['full_access', 'in_prompt', 'granular', 'delegated']:
-            yield from self._act_plan_and_execute(user_query=user_query, start_total=start_total)
+            yield from self._act_plan_and_execute(user_query=user_query, start_total=start_total, exc_method=exc_method)
             return
 
         if exc_method == "stored_proc":
@@ -249,10 +363,105 @@ class SQLAgent:
         for evm in stream_message_events([raw], min_chars=20):
             yield evm
 
-    def _act_plan_and_execute(self, user_query: str, *, start_total: float) -> Generator[Dict[str, Any], None, None]:
+    def _plan_cache_key(self, user_query: str, exc_method: str) -> Tuple[Optional[str], int]:
+        if self.plan_cache is None:
+            return None, 0
+        try:
+            schema_version = get_schema_version(self.db_path)
+        except Exception:
+            return None, 0
+        fingerprint = hashlib.sha256(
+            (self.prompts.planner_system_prompt_template + "\0" + self.prompts.sql_gen_system_prompt_template).encode("utf-8")
+        ).hexdigest()
+        key = self.plan_cache.make_key(
+            user_query=user_query,
+            exc_method=exc_method,
+            agent_permissions=self.agent_permissions,
+            user_permissions=self.user_permissions,
+            schema_version=schema_version,
+            model=getattr(self.llm_client, "model", None),
+            prompts_fingerprint=fingerprint,
+        )
+        return key, schema_version
+
+    def _act_from_plan_cache(
+        self, key: str, schema_version: int, *, start_total: float
+    ) -> Generator[Dict[str, Any], None, bool]:
+        """Serve a cached plan+SQL. Returns False (after evicting) when the cached SQL no longer executes."""
+        entry = self.plan_cache.get(key, schema_version=schema_version) if self.plan_cache else None
+        self._safe_trace(
+            __type__="cache",
+            operation="Plan Cache",
+            status="hit" if entry else "miss",
+            **(self.plan_cache.stats() if self.plan_cache else {}),
+        )
+        if self.stream:
+            yield from self._drain_stream_traces()
+        if entry is None:
+            return False
+
+        sql = entry["sql"]
+        self._safe_trace(__type__="agent", operation="Planner Output", output=entry["plan"], cached=True)
+        self._safe_trace(__type__="agent", operation="SQL Gen Output", extracted_sql=sql, cached=True)
+        try:
+            if self.stream:
+                yield from self._drain_stream_traces()
+                yield {"type": "action", "content": "Executing cached query"}
+            if self.before_execute:
+                self.before_execute()
+            results = self.execute_sql_with_permissions(sql)
+        except ExecutionCancelledError:
+            raise
+        except PermissionError:
+            self._safe_trace(
+                __type__="error",
+                operation="Execute SQL",
+                message=f"SQL Agent does not have permission to execute the query.\n{sql}",
+            )
+            yield from self._emit_raw_result_message(
+                sql="",
+                results={
+                    "__error__": True,
+                    "type": "permission",
+                    "message": "I cannot answer that question as the SQL Agent does not have the required permissions",
+                },
+            )
+            if self.stream:
+                yield from self._drain_stream_traces()
+            ev = self._emit_final_trace(start_total)
+            if ev:
+                yield ev
+            return True
+        except Exception as e:
+            self.plan_cache.invalidate(key)
+            self._safe_trace(__type__="error", operation="Execute cached SQL", error=str(e))
+            if self.stream:
+                yield from self._drain_stream_traces()
+            return False
+
+        if self.stream:
+            yield from self._drain_stream_traces()
+            yield {"type": "action", "content": "Generating response"}
+        yield from self._emit_raw_result_message(sql=sql, results=results)
+        if self.stream:
+            yield from self._drain_stream_traces()
+        ev = self._emit_final_trace(start_total)
+        if ev:
+            yield ev
+        return True
+
+    def _act_plan_and_execute(
+        self, user_query: str, *, start_total: float, exc_method: str = "full_access"
+    ) -> Generator[Dict[str, Any], None, None]:
         previous_sql: Optional[str] = None
         previous_error: Optional[str] = None
 
+        cache_key, schema_version = self._plan_cache_key(user_query, exc_method)
+        if cache_key is not None:
+            served = yield from self._act_from_plan_cache(cache_key, schema_version, start_total=start_total)
+            if served:
+                return
+
         for attempt in range(self.max_steps):
             # Step 1: Plan
             try:
@@ -310,8 +519,15 @@ class SQLAgent:
                     yield {"type": "action", "content": f"Executing query (attempt {attempt + 1})"}
 
                 # Step 3: Execute
+                if self.before_execute:
+                    self.before_execute()
                 results = self.execute_sql_with_permissions(sql)
 
+                if cache_key is not None and self.plan_cache is not None:
+                    is_read = isinstance(results, dict) and "columns" in results
+                    if is_read or self.plan_cache.cache_writes:
+                        self.plan_cache.put(cache_key, plan=plan, sql=sql, schema_version=schema_version)
+
                 if self.stream:
                     yield from self._drain_stream_traces()
                     yield {"type": "action", "content": "Generating response"}
@@ -326,6 +542,9 @@ class SQLAgent:
                     yield ev
                 return
 
+            except ExecutionCancelledError:
+                raise
+
             except PermissionError:
                 self._safe_trace(
                     __type__="error",
@@ -441,6 +660,9 @@ class SQLAgent:
             if self.stream:
                 yield {"type": "action", "content": "Executing stored procedure"}
 
+            if self.before_execute:
+                self.before_execute()
+
             try:
                 raw_result = func(*coerced_args, **coerced_kwargs)
             except PermissionError as pe:
@@ -482,6 +704,8 @@ class SQLAgent:
             if ev:
                 yield ev
 
+        except ExecutionCancelledError:
+            raise
         except Exception as e:
             msg = f"Agent error: {e}"
             for evm in stream_message_events([msg], min_chars=20):
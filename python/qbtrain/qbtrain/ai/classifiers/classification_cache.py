@@ -0,0 +1,151 @@
+# qbtrain/ai/classifiers/classification_cache.py
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+Verdict = Tuple[bool, float]
+
+_WEIGHT_SUFFIXES = (".safetensors", ".bin", ".onnx", ".json")
+
+
+def model_revision(local_dir: Path) -> str:
+    """
+    Cheap fingerprint of an installed model: names, sizes and mtimes of its
+    weight/config files (top level and ONNX export dirs). A re-download or
+    re-export changes it, which retires every cached verdict for the model.
+    """
+    local_dir = Path(local_dir)
+    h = hashlib.sha256()
+    files = [p for p in local_dir.rglob("*") if p.is_file() and p.suffix in _WEIGHT_SUFFIXES]
+    for p in sorted(files):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        h.update(f"{p.relative_to(local_dir).as_posix()}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    Bounded LRU of classifier verdicts keyed by content hash, optionally
+    persisted to SQLite so verdicts survive restarts.
+
+    Keys come from :meth:`make_key` and include the model id, model revision
+    and backend, so a model update or backend switch never serves stale
+    verdicts. Whole texts (by their string) and individual token windows of
+    long texts (by their input ids) are cached under separate namespaces.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        db_path: Optional[str] = None,
+        max_persisted_entries: int = 100_000,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.max_persisted_entries = max(1, int(max_persisted_entries))
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS classification_cache (
+                  key          TEXT PRIMARY KEY,
+                  is_injection INTEGER NOT NULL,
+                  confidence   REAL NOT NULL,
+                  created_at   REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(kind: str, model_id: str, revision: str, backend: str, content: Union[str, bytes]) -> str:
+        if isinstance(content, str):
+            content = content.encode("utf-8", errors="surrogatepass")
+        digest = hashlib.sha256(content).hexdigest()
+        return f"{kind}:{model_id}@{revision}/{backend}:{digest}"
+
+    def get(self, key: str) -> Optional[Verdict]:
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return verdict
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT is_injection, confidence FROM classification_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    verdict = (bool(row[0]), float(row[1]))
+                    self._remember(key, verdict)
+                    self._hits += 1
+                    return verdict
+            self._misses += 1
+            return None
+
+    def put(self, key: str, verdict: Verdict) -> None:
+        verdict = (bool(verdict[0]), float(verdict[1]))
+        with self._lock:
+            self._remember(key, verdict)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classification_cache(key, is_injection, confidence, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, int(verdict[0]), verdict[1], time.time()),
+            )
+            self._writes += 1
+            if self._writes % 256 == 0:
+                self._prune_persisted()
+            self._conn.commit()
+
+    def _remember(self, key: str, verdict: Verdict) -> None:
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_persisted(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0]
+        excess = count - self.max_persisted_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM classification_cache WHERE key IN "
+                "(SELECT key FROM classification_cache ORDER BY created_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM classification_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persisted": self.db_path is not None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            }
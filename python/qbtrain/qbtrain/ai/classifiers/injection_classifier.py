@@ -2,9 +2,16 @@
 from __future__ import annotations
 
 import importlib
+import os
 import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .classification_cache import ClassificationCache, model_revision
+from .micro_batcher import MicroBatcher
 
 _LOCK = threading.Lock()
 _PIPELINES: Dict[str, Any] = {}
@@ -35,6 +42,43 @@ def _model_local_dir(model_id: str, models_dir: str) -> Path:
     return base / model_id.replace("/", "__")
 
 
+# "torch" (transformers fp32), "onnx" (ONNX Runtime fp32) or "onnx-int8" (dynamic int8).
+CLASSIFIER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_BACKEND_OVERRIDES: Dict[str, str] = {}
+_BACKEND_STATUS: Dict[str, Dict[str, Any]] = {}
+_REVISIONS: Dict[str, str] = {}
+_WORKERS: Dict[str, MicroBatcher] = {}
+
+
+def get_classifier_backend(model_id: str) -> str:
+    """
+    Backend for *model_id*: a per-model override from :func:`set_classifier_backend`,
+    else INJECTION_CLASSIFIER_BACKEND, else "torch".
+    """
+    if model_id in _BACKEND_OVERRIDES:
+        return _BACKEND_OVERRIDES[model_id]
+    raw = (os.getenv("INJECTION_CLASSIFIER_BACKEND") or "").strip().lower()
+    return raw if raw in CLASSIFIER_BACKENDS else "torch"
+
+
+def set_classifier_backend(model_id: str, backend: Optional[str]) -> None:
+    """Select the backend for one classifier (None restores the default). Loaded pipelines are dropped."""
+    if model_id not in INJECTION_CLASSIFIERS:
+        raise ValueError(f"Unknown classifier: {model_id}")
+    if backend is not None and backend not in CLASSIFIER_BACKENDS:
+        raise ValueError(f"Unknown classifier backend: {backend}")
+    with _LOCK:
+        if backend is None:
+            _BACKEND_OVERRIDES.pop(model_id, None)
+        else:
+            _BACKEND_OVERRIDES[model_id] = backend
+        for key in [k for k in _PIPELINES if k.endswith(f"::{model_id}")]:
+            del _PIPELINES[key]
+        for key in [k for k in _WORKERS if k.endswith(f"::{model_id}")]:
+            _WORKERS.pop(key).stop()
+
+
 def list_classifiers(models_dir: str = DEFAULT_MODELS_DIR) -> List[Dict[str, Any]]:
     result = []
     for model_id, meta in INJECTION_CLASSIFIERS.items():
@@ -43,29 +87,209 @@ def list_classifiers(models_dir: str = DEFAULT_MODELS_DIR) -> List[Dict[str, Any
             "model_id": model_id,
             "display_name": meta["display_name"],
             "installed": local_dir.exists() and any(local_dir.iterdir()) if local_dir.exists() else False,
+            "backend": get_classifier_backend(model_id),
+            "backend_status": _BACKEND_STATUS.get(f"{models_dir}::{model_id}"),
         })
     return result
 
 
+def _build_torch_pipeline(local_dir: Path):
+    tr = importlib.import_module("transformers")
+    return tr.pipeline("text-classification", model=str(local_dir), tokenizer=str(local_dir))
+
+
+def _build_onnx_pipeline(model_id: str, local_dir: Path, models_dir: str, backend: str):
+    """
+    ONNX Runtime pipeline for *backend*, validated once against PyTorch. Falls back
+    to the PyTorch pipeline when the export is outside tolerance or cannot be built.
+    """
+    from . import onnx_backend
+
+    quantize = backend == "onnx-int8"
+    status_key = f"{models_dir}::{model_id}"
+    try:
+        pipe = onnx_backend.load_onnx_pipeline(local_dir, quantize=quantize)
+        report = onnx_backend.validate_onnx_export(
+            local_dir, quantize, pipe, reference_factory=lambda: _build_torch_pipeline(local_dir)
+        )
+    except Exception as exc:
+        _BACKEND_STATUS[status_key] = {"requested": backend, "active": "torch", "error": str(exc)}
+        return _build_torch_pipeline(local_dir)
+
+    if not report.get("ok"):
+        _BACKEND_STATUS[status_key] = {"requested": backend, "active": "torch", "validation": report}
+        return _build_torch_pipeline(local_dir)
+    _BACKEND_STATUS[status_key] = {"requested": backend, "active": backend, "validation": report}
+    return pipe
+
+
 def _get_pipeline(model_id: str, models_dir: str):
-    key = f"{models_dir}::{model_id}"
+    backend = get_classifier_backend(model_id)
+    key = f"{models_dir}::{backend}::{model_id}"
     with _LOCK:
         if key in _PIPELINES:
             return _PIPELINES[key]
 
-    tr = importlib.import_module("transformers")
     local_dir = _model_local_dir(model_id, models_dir)
     if not local_dir.exists():
         raise ValueError(f"Classifier model not installed: {model_id}")
 
-    pipe = tr.pipeline("text-classification", model=str(local_dir), tokenizer=str(local_dir))
+    if backend == "torch":
+        pipe = _build_torch_pipeline(local_dir)
+    else:
+        pipe = _build_onnx_pipeline(model_id, local_dir, models_dir, backend)
+    revision = model_revision(local_dir)
 
     with _LOCK:
         _PIPELINES[key] = pipe
+        _REVISIONS[key] = revision
     return pipe
 
 
-def classify(model_id: str, text: str, models_dir: str = DEFAULT_MODELS_DIR) -> Tuple[bool, float]:
+def _get_worker(model_id: str, models_dir: str) -> MicroBatcher:
+    """
+    Per-model inference worker. Token windows from every concurrent caller
+    (crdlr, echoleak, imscaler, figstep, the classify endpoint) are queued
+    here and merged into shared forward passes; see :class:`MicroBatcher`.
+    """
+    backend = get_classifier_backend(model_id)
+    key = f"{models_dir}::{backend}::{model_id}"
+    with _LOCK:
+        worker = _WORKERS.get(key)
+    if worker is not None:
+        return worker
+
+    pipe = _get_pipeline(model_id, models_dir)
+    with _LOCK:
+        worker = _WORKERS.get(key)
+        if worker is None:
+            worker = MicroBatcher(
+                lambda windows: _run_windows(pipe, windows),
+                name=f"injection-classifier:{model_id}",
+            )
+            _WORKERS[key] = worker
+        return worker
+
+
+def inference_stats() -> Dict[str, Dict[str, Any]]:
+    """Batch-size and latency histograms of every running inference worker, keyed by model."""
+    with _LOCK:
+        workers = dict(_WORKERS)
+    return {key: worker.stats() for key, worker in workers.items()}
+
+
+def _cache_namespace(model_id: str, models_dir: str) -> Tuple[str, str]:
+    """(revision, active backend) of the loaded pipeline, used in cache keys."""
+    backend = get_classifier_backend(model_id)
+    key = f"{models_dir}::{backend}::{model_id}"
+    status = _BACKEND_STATUS.get(f"{models_dir}::{model_id}") or {}
+    active = status.get("active", backend) if backend != "torch" else backend
+    return _REVISIONS.get(key, ""), active
+
+
+_RESULT_CACHE: Optional[ClassificationCache] = None
+_RESULT_CACHE_CONFIGURED = False
+
+
+def get_classification_cache() -> Optional[ClassificationCache]:
+    """
+    Process-wide verdict cache used by :func:`classify` / :func:`classify_many`.
+    - size: INJECTION_CLASSIFIER_CACHE_SIZE (default 4096 entries; 0 disables)
+    - persistence: INJECTION_CLASSIFIER_CACHE_DB (SQLite path; unset = memory only)
+    """
+    global _RESULT_CACHE, _RESULT_CACHE_CONFIGURED
+    with _LOCK:
+        if not _RESULT_CACHE_CONFIGURED:
+            raw = (os.getenv("INJECTION_CLASSIFIER_CACHE_SIZE") or "").strip()
+            try:
+                size = int(raw) if raw else 4096
+            except ValueError:
+                size = 4096
+            db_path = (os.getenv("INJECTION_CLASSIFIER_CACHE_DB") or "").strip() or None
+            _RESULT_CACHE = ClassificationCache(max_entries=size, db_path=db_path) if size > 0 else None
+            _RESULT_CACHE_CONFIGURED = True
+        return _RESULT_CACHE
+
+
+def set_classification_cache(cache: Optional[ClassificationCache]) -> None:
+    """Replace the process-wide verdict cache; None disables caching."""
+    global _RESULT_CACHE, _RESULT_CACHE_CONFIGURED
+    with _LOCK:
+        _RESULT_CACHE = cache
+        _RESULT_CACHE_CONFIGURED = True
+
+
+# Reserve 2 tokens for [CLS] + [SEP]
+MAX_CHUNK_TOKENS = 510
+CHUNK_OVERLAP_TOKENS = 50
+DEFAULT_BATCH_SIZE = 8
+
+
+def _token_windows(tokenizer: Any, text: str) -> Tuple[int, Iterator[List[int]]]:
+    """
+    Tokenize *text* once and return (window count, lazy iterator of model-ready
+    input ids): overlapping windows of ``MAX_CHUNK_TOKENS`` with special tokens
+    added. Windows are sliced from the single token-id list on demand, so long
+    documents are never decoded back to text and re-tokenized per chunk, and
+    only the windows of the batch in flight are materialised.
+    """
+    token_ids = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )["input_ids"]
+    step = MAX_CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS
+    extra = max(0, len(token_ids) - MAX_CHUNK_TOKENS)
+    count = 1 + (extra + step - 1) // step
+
+    def _windows() -> Iterator[List[int]]:
+        for i in range(count):
+            start = i * step
+            yield tokenizer.build_inputs_with_special_tokens(token_ids[start : start + MAX_CHUNK_TOKENS])
+
+    return count, _windows()
+
+
+def _window_digest(input_ids: List[int]) -> bytes:
+    return array("q", input_ids).tobytes()
+
+
+def _run_windows(pipe: Any, windows: List[List[int]]) -> List[Tuple[str, float]]:
+    """
+    Top (label, score) per window, feeding the padded id batch straight to
+    ``pipe.model`` (PyTorch or ONNX Runtime) with its attention mask.
+    Scores follow the text-classification pipeline: softmax for single-label
+    heads, sigmoid for multi-label or single-logit heads.
+    """
+    torch = importlib.import_module("torch")
+    tokenizer, model = pipe.tokenizer, pipe.model
+    encoded = tokenizer.pad({"input_ids": windows}, padding=True, return_tensors="pt")
+    device = getattr(pipe, "device", None)
+    if device is not None:
+        encoded = {k: v.to(device) for k, v in encoded.items()}
+    with torch.inference_mode():
+        logits = model(**encoded).logits.float()
+
+    config = model.config
+    if config.problem_type == "multi_label_classification" or config.num_labels == 1:
+        scores = torch.sigmoid(logits)
+    else:
+        scores = torch.softmax(logits, dim=-1)
+    top_scores, top_ids = scores.max(dim=-1)
+    return [
+        (str(config.id2label[int(label_id)]), float(score))
+        for score, label_id in zip(top_scores.tolist(), top_ids.tolist())
+    ]
+
+
+def classify(
+    model_id: str,
+    text: str,
+    models_dir: str = DEFAULT_MODELS_DIR,
+    cache_info: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, float]:
     """
     Classify text for prompt injection, splitting into overlapping chunks
     so that payloads beyond the model's 512-token window are still detected.
@@ -73,51 +297,191 @@ def classify(model_id: str, text: str, models_dir: str = DEFAULT_MODELS_DIR) ->
     Returns (is_injection, confidence).  If *any* chunk is flagged as
     injection the whole text is considered an injection attempt.
     """
+    return classify_many(model_id, [text], models_dir=models_dir, cache_info=cache_info)[0]
+
+
+def classify_many(
+    model_id: str,
+    texts: List[str],
+    models_dir: str = DEFAULT_MODELS_DIR,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    early_exit: bool = True,
+    use_cache: bool = True,
+    cache_info: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[bool, float]]:
+    """
+    Classify several texts at once, returning one (is_injection, confidence)
+    per text in input order with the same any-chunk-positive semantics as
+    :func:`classify`.
+
+    Each text is tokenized once into overlapping token-id windows (see
+    :func:`_token_windows`) and submitted to the model's inference worker
+    ``batch_size`` windows at a time; the worker may merge them with windows
+    from concurrent callers into one forward pass. Windows are pulled round-robin across texts
+    (every text's first window, then every second window, ...) so that with
+    ``early_exit`` a text's remaining windows are never built once one of its
+    windows is flagged.
+
+    With ``use_cache`` verdicts are looked up by content hash first (whole
+    text, then each token window of long texts), so only unseen windows reach
+    the model. Pass a dict as ``cache_info`` to receive this call's hit counts.
+    """
     if model_id not in INJECTION_CLASSIFIERS:
         raise ValueError(f"Unknown classifier: {model_id}")
+    if not texts:
+        return []
 
     meta = INJECTION_CLASSIFIERS[model_id]
     positive_labels = {lbl.upper() for lbl in meta["labels_positive"]}
 
     pipe = _get_pipeline(model_id, models_dir)
-    tokenizer = pipe.tokenizer
+    worker = _get_worker(model_id, models_dir)
+    cache = get_classification_cache() if use_cache else None
+    revision, backend = _cache_namespace(model_id, models_dir)
 
-    # Tokenize (no special tokens) to measure real length
-    token_ids = tokenizer.encode(text, add_special_tokens=False)
+    def _key(kind: str, content: Union[str, bytes]) -> str:
+        return ClassificationCache.make_key(kind, model_id, revision, backend, content)
 
-    # Reserve 2 tokens for [CLS] + [SEP]
-    max_chunk = 510
-    overlap = 50
-    step = max_chunk - overlap
+    results: List[Optional[Tuple[bool, float]]] = [None] * len(texts)
+    text_hits = 0
+    if cache is not None:
+        for idx, text in enumerate(texts):
+            results[idx] = cache.get(_key("text", text))
+            text_hits += int(results[idx] is not None)
 
-    # Build text chunks
-    if len(token_ids) <= max_chunk:
-        chunks = [text]
-    else:
-        chunks = []
-        for start in range(0, len(token_ids), step):
-            chunk_ids = token_ids[start : start + max_chunk]
-            chunks.append(tokenizer.decode(chunk_ids, skip_special_tokens=True))
-            if start + max_chunk >= len(token_ids):
-                break
+    # verdicts[idx][depth]: per-window (is_injection, confidence), None until known
+    pending = [idx for idx in range(len(texts)) if results[idx] is None]
+    windows: Dict[int, Iterator[List[int]]] = {}
+    window_counts: Dict[int, int] = {}
+    for idx in pending:
+        window_counts[idx], windows[idx] = _token_windows(pipe.tokenizer, texts[idx])
+    verdicts: Dict[int, List[Optional[Tuple[bool, float]]]] = {idx: [] for idx in pending}
+
+    def _flagged(idx: int) -> bool:
+        return any(v is not None and v[0] for v in verdicts[idx])
+
+    batch_size = max(1, int(batch_size))
+    batch: List[Tuple[int, int, List[int]]] = []
+    chunk_lookups = chunk_hits = chunks_run = 0
+
+    def _flush() -> None:
+        nonlocal chunks_run
+        outputs = worker.run([window for _, _, window in batch])
+        chunks_run += len(batch)
+        for (idx, depth, window), (label, score) in zip(batch, outputs):
+            is_injection = label.upper() in positive_labels
+            confidence = score if is_injection else 1.0 - score
+            verdicts[idx][depth] = (is_injection, confidence)
+            if cache is not None and window_counts[idx] > 1:
+                cache.put(_key("chunk", _window_digest(window)), (is_injection, confidence))
+        batch.clear()
+
+    active = list(pending)
+    while active:
+        still_active = []
+        for idx in active:
+            if early_exit and _flagged(idx):
+                continue
+            window = next(windows[idx], None)
+            if window is None:
+                continue
+            still_active.append(idx)
+            depth = len(verdicts[idx])
+            verdicts[idx].append(None)
+            if cache is not None and window_counts[idx] > 1:
+                chunk_lookups += 1
+                verdicts[idx][depth] = cache.get(_key("chunk", _window_digest(window)))
+                if verdicts[idx][depth] is not None:
+                    chunk_hits += 1
+                    continue
+            batch.append((idx, depth, window))
+            if len(batch) >= batch_size:
+                _flush()
+        active = still_active
+    if batch:
+        _flush()
+
+    for idx, known in verdicts.items():
+        # Earliest flagged window wins, as in the sequential loop; otherwise the most confident clean window.
+        flagged = next((v for v in known if v is not None and v[0]), None)
+        if flagged is not None:
+            results[idx] = flagged
+        else:
+            results[idx] = (False, max((v[1] for v in known if v is not None), default=0.0))
+        complete = flagged is not None or len(known) == window_counts[idx]
+        if cache is not None and complete:
+            cache.put(_key("text", texts[idx]), results[idx])
+
+    if cache_info is not None:
+        cache_info.update({
+            "texts": len(texts),
+            "text_hits": text_hits,
+            "chunk_lookups": chunk_lookups,
+            "chunk_hits": chunk_hits,
+            "chunks_classified": chunks_run,
+            "hit_ratio": round(text_hits / len(texts), 4),
+            "chunk_hit_ratio": round(chunk_hits / chunk_lookups, 4) if chunk_lookups else None,
+            "cumulative_hit_ratio": cache.stats()["hit_ratio"] if cache is not None else None,
+        })
+
+    return [r if r is not None else (False, 0.0) for r in results]
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="injection-classifier")
+        return _EXECUTOR
+
+
+class SpeculativeClassification:
+    """
+    Run :func:`classify` in a background thread so the caller can overlap it
+    with other work (client construction, schema loading, planning) and only
+    block on the verdict right before committing side effects.
+
+    ``result()`` re-raises any error from :func:`classify`. ``timing()``
+    reports how long the classifier ran, how long the caller was blocked on
+    it, and the difference (latency hidden by the overlap).
+    """
 
-    # Classify each chunk; short-circuit on first injection
-    highest_confidence = 0.0
-    for chunk in chunks:
-        results = pipe(chunk, truncation=True, max_length=512)
-        if not results:
-            continue
+    def __init__(self, model_id: str, text: str, models_dir: str = DEFAULT_MODELS_DIR):
+        self.model_id = model_id
+        self.classify_ms: Optional[float] = None
+        self.blocked_ms: float = 0.0
+        self.cache_info: Dict[str, Any] = {}
+        self._future = _get_executor().submit(self._run, model_id, text, models_dir)
 
-        top = results[0]
-        label = str(top.get("label", "")).upper()
-        score = float(top.get("score", 0.0))
+    def _run(self, model_id: str, text: str, models_dir: str) -> Tuple[bool, float]:
+        t0 = time.monotonic()
+        try:
+            return classify(model_id, text, models_dir=models_dir, cache_info=self.cache_info)
+        finally:
+            self.classify_ms = (time.monotonic() - t0) * 1000
 
-        is_injection = label in positive_labels
-        confidence = score if is_injection else 1.0 - score
+    def done(self) -> bool:
+        return self._future.done()
 
-        if is_injection:
-            return True, confidence
+    def result(self) -> Tuple[bool, float]:
+        if not self._future.done():
+            t0 = time.monotonic()
+            try:
+                return self._future.result()
+            finally:
+                self.blocked_ms += (time.monotonic() - t0) * 1000
+        return self._future.result()
 
-        highest_confidence = max(highest_confidence, confidence)
+    def flagged(self) -> bool:
+        return self.result()[0]
 
-    return False, highest_confidence
+    def timing(self) -> Dict[str, int]:
+        classify_ms = self.classify_ms or 0.0
+        return {
+            "classifier_ms": round(classify_ms),
+            "blocked_ms": round(self.blocked_ms),
+            "overlap_saved_ms": round(max(0.0, classify_ms - self.blocked_ms)),
+        }
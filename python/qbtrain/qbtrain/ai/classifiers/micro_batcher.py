@@ -0,0 +1,219 @@
+# qbtrain/ai/classifiers/micro_batcher.py
+from __future__ import annotations
+
+import bisect
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+BATCH_SIZE_BUCKETS: Tuple[int, ...] = (1, 2, 4, 8, 16, 32, 64)
+LATENCY_MS_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = (os.getenv(name) or "").strip()
+    if raw:
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            pass
+    return default
+
+
+def default_max_wait_ms() -> float:
+    """How long a worker holds a batch open for more items: INJECTION_CLASSIFIER_BATCH_WAIT_MS (default 5)."""
+    return _env_number("INJECTION_CLASSIFIER_BATCH_WAIT_MS", 5.0)
+
+
+def default_max_batch() -> int:
+    """Largest forward pass a worker forms: INJECTION_CLASSIFIER_MAX_BATCH (default 32)."""
+    return max(1, int(_env_number("INJECTION_CLASSIFIER_MAX_BATCH", 32)))
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``snapshot()`` maps each upper bound (and "+Inf") to its count."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in self.buckets] + ["+Inf"]
+        return {
+            "count": self.n,
+            "mean": round(self.total / self.n, 3) if self.n else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _Item:
+    __slots__ = ("payload", "future", "enqueued")
+
+    def __init__(self, payload: Any) -> None:
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Single background worker that merges items submitted by concurrent callers
+    into one ``run_batch`` call.
+
+    The worker blocks for the first item, then keeps the batch open for up to
+    ``max_wait_ms`` or until ``max_batch`` items are queued, runs
+    ``run_batch(payloads)`` (which must return one output per payload, in
+    order) and resolves each caller's future. Only the worker thread touches
+    the model, so concurrent requests no longer contend for it.
+
+    After ``stop()`` the worker finishes its current batch and fails anything
+    still queued with "batcher stopped"; later ``submit`` calls (from callers
+    that fetched the batcher before it was replaced) run inline instead.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        name: str = "micro-batcher",
+    ) -> None:
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch if max_batch is not None else default_max_batch()))
+        self.max_wait_ms = max(0.0, float(max_wait_ms if max_wait_ms is not None else default_max_wait_ms()))
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._requests = 0
+        self._items = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._queue_wait_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._inference_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._latency_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, payloads: Sequence[Any]) -> List[Future]:
+        """Queue *payloads*; returns one future per payload. Runs inline once stopped."""
+        items = [_Item(p) for p in payloads]
+        with self._lock:
+            self._requests += 1
+            stopped = self._stopped
+            if not stopped:
+                # Under the lock, so nothing is queued behind _STOP
+                for item in items:
+                    self._queue.put(item)
+        if stopped:
+            try:
+                outputs = self.run_batch([item.payload for item in items])
+                if len(outputs) != len(items):
+                    raise RuntimeError(f"{self.name}: expected {len(items)} outputs, got {len(outputs)}")
+            except Exception as exc:
+                for item in items:
+                    item.future.set_exception(exc)
+            else:
+                for item, out in zip(items, outputs):
+                    item.future.set_result(out)
+        return [item.future for item in items]
+
+    def run(self, payloads: Sequence[Any], timeout: Optional[float] = None) -> List[Any]:
+        """Submit *payloads* and block until every output is ready (re-raises worker errors)."""
+        return [f.result(timeout=timeout) for f in self.submit(payloads)]
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+
+    def _drain(self) -> None:
+        """Fail every item still queued after _STOP, so no caller waits forever."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item.future.set_exception(RuntimeError(f"{self.name}: batcher stopped"))
+
+    def _collect(self) -> Tuple[List[_Item], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._run(batch)
+        self._drain()
+
+    def _run(self, batch: List[_Item]) -> None:
+        started = time.monotonic()
+        try:
+            outputs = self.run_batch([item.payload for item in batch])
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"{self.name}: expected {len(batch)} outputs, got {len(outputs)}")
+        except Exception as exc:
+            for item in batch:
+                item.future.set_exception(exc)
+            with self._lock:
+                self._errors += 1
+            return
+        done = time.monotonic()
+        for item, out in zip(batch, outputs):
+            item.future.set_result(out)
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes.observe(len(batch))
+            self._inference_ms.observe((done - started) * 1000)
+            for item in batch:
+                self._queue_wait_ms.observe((started - item.enqueued) * 1000)
+                self._latency_ms.observe((done - item.enqueued) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "items": self._items,
+                "batches": self._batches,
+                "errors": self._errors,
+                "batch_size": self._batch_sizes.snapshot(),
+                "queue_wait_ms": self._queue_wait_ms.snapshot(),
+                "inference_ms": self._inference_ms.snapshot(),
+                "latency_ms": self._latency_ms.snapshot(),
+            }
@@ -7,6 +7,7 @@ from .bedrock_client import BedrockClient
 from .huggingface_client import HuggingFaceClient
 from .ollama_client import OllamaClient
 from .registry import LLMClientRegistry
+from .token_counter import TokenCounter
 
 __all__ = [
     "LLMClient",
@@ -17,4 +18,5 @@ __all__ = [
     "HuggingFaceClient",
     "OllamaClient",
     "LLMClientRegistry",
+    "TokenCounter",
 ]
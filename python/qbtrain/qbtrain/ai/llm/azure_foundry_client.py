@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from qbtrain.tracers import Tracer
 
 from .base_llm_client import LLMClient, Message
+from .token_counter import TokenCounter, tiktoken_counter
 
 MessageList = Optional[List[Message]]
 
@@ -91,6 +92,13 @@ class AzureFoundryClient(LLMClient):
         msgs.append({"role": "user", "content": prompt})
         return msgs
 
+    def token_counter(self) -> TokenCounter:
+        """
+        tiktoken counts when the deployment is named after its model (e.g.
+        "gpt-4o"); other deployment names use o200k_base.
+        """
+        return tiktoken_counter(self.model or self.default_deployment) or super().token_counter()
+
     def _deployment_name(self) -> str:
         deployment = (self.model or self.default_deployment or "").strip()
         if not deployment:
@@ -12,6 +12,8 @@ from pydantic import BaseModel, ValidationError
 from qbtrain.tracers import Tracer
 from qbtrain.utils.jsonutils import extract_json_object, extract_first_json
 
+from .token_counter import TokenCounter, approx_token_counter
+
 Message = Dict[str, Any]
 
 
@@ -158,6 +160,15 @@ class LLMClient(ABC):
             out[name] = name.replace("_", " ").title()
         return out
 
+    # ---- token counting ----
+    def token_counter(self) -> TokenCounter:
+        """
+        Counter for budgeting prompt text in this client's tokens. Providers
+        with a locally available tokenizer override this; the default is a
+        cached per-provider approximation.
+        """
+        return approx_token_counter(self.client_id)
+
     # ---- metadata helpers ----
     @classmethod
     def init_parameters(cls) -> List[Dict[str, Any]]:
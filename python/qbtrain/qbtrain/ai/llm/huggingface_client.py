@@ -16,6 +16,7 @@ from pydantic import BaseModel
 from qbtrain.tracers import Tracer
 
 from .base_llm_client import LLMClient, Message
+from .token_counter import HFTokenizerCounter, TokenCounter
 
 MessageList = Optional[List[Message]]
 
@@ -58,6 +59,7 @@ class HuggingFaceClient(LLMClient):
     _QUEUE: Deque[DownloadTask] = deque()
     _CURRENT: Optional[DownloadTask] = None
     _WORKER: Optional[threading.Thread] = None
+    _TOKEN_COUNTERS: Dict[str, TokenCounter] = {}
 
     def __init__(
         self,
@@ -216,6 +218,27 @@ class HuggingFaceClient(LLMClient):
             return p2
         raise ValueError(f"Local model directory not found for '{model}' under {self.models_dir}")
 
+    def token_counter(self) -> TokenCounter:
+        """Counts with the local model's own tokenizer (loaded once per model directory)."""
+        if not self.model:
+            return super().token_counter()
+        pipe = getattr(self, "_pipelines", {}).get(self.model)
+        if pipe is not None:
+            return HFTokenizerCounter(pipe.tokenizer, self.model)
+        try:
+            local_dir = self._resolve_local_dir(self.model)
+        except ValueError:
+            return super().token_counter()
+        with self._LOCK:
+            counter = self._TOKEN_COUNTERS.get(str(local_dir))
+            if counter is None:
+                try:
+                    tok = _lazy_import_transformers().AutoTokenizer.from_pretrained(local_dir)
+                except Exception:
+                    return super().token_counter()
+                counter = self._TOKEN_COUNTERS[str(local_dir)] = HFTokenizerCounter(tok, self.model)
+        return counter
+
     @staticmethod
     def _is_vision_model(local_dir: Path) -> bool:
         """Detect if the model is a vision-language model (e.g. LLaVA) by checking config."""
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from qbtrain.tracers import Tracer
 
 from .base_llm_client import LLMClient, Message
+from .token_counter import TokenCounter, tiktoken_counter
 
 R = TypeVar("R")
 MessageList = Optional[List[Message]]
@@ -93,6 +94,10 @@ class OpenAIClient(LLMClient):
         items.append({"role": "user", "content": prompt})
         return items
 
+    def token_counter(self) -> TokenCounter:
+        """Exact tiktoken counts for the configured model when tiktoken is installed."""
+        return tiktoken_counter(self.model) or super().token_counter()
+
     def _usage_from_response(self, rsp: Any) -> Dict[str, Optional[int]]:
         u = getattr(rsp, "usage", None) or {}
         return {
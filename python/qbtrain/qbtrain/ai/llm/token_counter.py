@@ -0,0 +1,167 @@
+# qbtrain/ai/llm/token_counter.py
+from __future__ import annotations
+
+import importlib
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+
+class TokenCounter:
+    """
+    Counts and cuts text in a model's tokens, for packing prompts to a budget.
+
+    ``truncate`` returns ``(text, tokens, truncated)``: the longest prefix of
+    *text* that fits in *max_tokens*, its token count, and whether anything
+    was cut. Untruncated text is returned unchanged.
+    """
+
+    name: str = "base"
+    exact: bool = False
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def truncate(self, text: str, max_tokens: int) -> Tuple[str, int, bool]:
+        raise NotImplementedError
+
+
+# Word runs, or single non-space symbols; each word costs ceil(len / chars_per_token).
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class ApproxTokenCounter(TokenCounter):
+    """
+    Tokenizer-free estimate for providers whose tokenizer is not available
+    locally. Punctuation counts one token, words ceil(len / chars_per_token),
+    which errs high for common English words so budgets are not overshot.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, name: str = "approx"):
+        self.chars_per_token = float(chars_per_token)
+        self.name = name
+        # Cost by piece length, so counting is a table lookup per piece.
+        self._costs = [max(1, -int(-n // self.chars_per_token)) for n in range(64)]
+
+    def _cost(self, piece: str) -> int:
+        n = len(piece)
+        return self._costs[n] if n < 64 else -int(-n // self.chars_per_token)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return sum(map(self._cost, _PIECE_RE.findall(text)))
+
+    def truncate(self, text: str, max_tokens: int) -> Tuple[str, int, bool]:
+        if max_tokens <= 0:
+            return "", 0, _PIECE_RE.search(text) is not None
+        used = 0
+        end = 0
+        cost = self._cost
+        for m in _PIECE_RE.finditer(text):
+            c = cost(m.group())
+            if used + c > max_tokens:
+                return text[:end], used, True
+            used += c
+            end = m.end()
+        return text, used, False
+
+
+class _EncoderCounter(TokenCounter):
+    """Shared encode / cut / decode logic for real tokenizers."""
+
+    exact = True
+
+    def _encode(self, text: str):
+        raise NotImplementedError
+
+    def _decode(self, ids) -> str:
+        raise NotImplementedError
+
+    def count(self, text: str) -> int:
+        return len(self._encode(text)) if text else 0
+
+    def truncate(self, text: str, max_tokens: int) -> Tuple[str, int, bool]:
+        if not text:
+            return text, 0, False
+        ids = self._encode(text)
+        if len(ids) <= max_tokens:
+            return text, len(ids), False
+        if max_tokens <= 0:
+            return "", 0, True
+        # Re-encoding a decoded prefix can merge differently; shrink until it fits.
+        n = max_tokens
+        while n > 0:
+            prefix = self._decode(ids[:n]).rstrip("�")
+            used = self.count(prefix)
+            if used <= max_tokens:
+                return prefix, used, True
+            n -= used - max_tokens
+        return "", 0, True
+
+
+class TiktokenCounter(_EncoderCounter):
+    def __init__(self, encoding: Any):
+        self._enc = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def _encode(self, text: str):
+        return self._enc.encode(text, disallowed_special=())
+
+    def _decode(self, ids) -> str:
+        return self._enc.decode(ids)
+
+
+class HFTokenizerCounter(_EncoderCounter):
+    def __init__(self, tokenizer: Any, name: str = "hf"):
+        self._tok = tokenizer
+        self.name = f"hf:{name}"
+
+    def _encode(self, text: str):
+        return self._tok.encode(text, add_special_tokens=False)
+
+    def _decode(self, ids) -> str:
+        return self._tok.decode(ids, skip_special_tokens=True)
+
+
+# Rough characters per token of each provider's usual model families.
+_CHARS_PER_TOKEN: Dict[str, float] = {
+    "openai": 4.0,
+    "azure_foundry": 4.0,
+    "gcp_model_garden": 4.0,
+    "aws_bedrock": 3.5,
+    "ollama": 3.5,
+    "huggingface": 3.5,
+}
+
+
+@lru_cache(maxsize=None)
+def approx_token_counter(provider: str = "") -> ApproxTokenCounter:
+    """Cached approximate counter for *provider* (an LLMClient.client_id)."""
+    return ApproxTokenCounter(_CHARS_PER_TOKEN.get(provider, 3.5), name=f"approx:{provider or 'default'}")
+
+
+_TIKTOKEN_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def tiktoken_counter(model: Optional[str]) -> Optional[TiktokenCounter]:
+    """
+    Exact counter for an OpenAI model via tiktoken, or None when tiktoken is
+    not installed. Unknown model names fall back to the o200k_base encoding.
+    """
+    try:
+        tiktoken = importlib.import_module("tiktoken")
+    except ImportError:
+        return None
+    with _TIKTOKEN_LOCK:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model or "")
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Encoding files are fetched on first use; offline hosts fall back to the approximation.
+            return None
+    return TiktokenCounter(encoding)
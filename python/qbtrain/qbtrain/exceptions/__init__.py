@@ -4,4 +4,5 @@ from .exceptions import *
 __all__ = [
     "PermissionError",
     "DenylistViolationError",
+    "ExecutionCancelledError",
 ]
\ No newline at end of file
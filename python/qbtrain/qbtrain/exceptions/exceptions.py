@@ -11,6 +11,11 @@ class DenylistViolationError(Exception):
     pass
 
 
+class ExecutionCancelledError(Exception):
+    """Raised to abort an agent before it commits side effects (e.g. input flagged while it was planning)."""
+    pass
+
+
 class StudentModelTooLargeError(Exception):
     """Raised when a student model exceeds the maximum allowed parameter count."""
     pass
\ No newline at end of file
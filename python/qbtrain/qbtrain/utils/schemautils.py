@@ -0,0 +1,289 @@
+# qbtrain/utils/schemautils.py
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .sqlutils import _open_sqlite, get_schema_context, get_schema_version, quote_ident
+
+# An encoder maps a batch of texts to a batch of dense vectors.
+SchemaEncoder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "any", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "get", "give", "how", "i", "in", "is", "it", "list", "me", "many", "much", "of", "on", "or",
+    "please", "show", "the", "their", "them", "there", "to", "what", "which", "who", "with",
+    "all", "each", "per", "our", "my", "this", "that", "these", "those", "find",
+}
+
+
+def _stem(tok: str) -> str:
+    if len(tok) > 4 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 4 and tok.endswith(("ses", "xes", "ches", "shes")):
+        return tok[:-2]
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics (so ``sales_order`` -> ``sales order``), drop stopwords, stem."""
+    return [_stem(t) for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class SchemaTable:
+    name: str
+    kind: str
+    description: str = ""
+    columns: List[Tuple[str, str]] = field(default_factory=list)
+    joins: List[str] = field(default_factory=list)
+
+    def document(self) -> str:
+        # Names are repeated so an exact table/column mention outweighs incidental doc text.
+        parts = [self.name, self.name, self.name, self.description]
+        for col, desc in self.columns:
+            parts.append(col)
+            parts.append(desc)
+        parts.extend(self.joins)
+        return "\n".join(p for p in parts if p)
+
+
+@dataclass
+class SchemaCatalog:
+    tables: Dict[str, SchemaTable]
+    edges: Dict[str, Set[str]]
+    version: int
+
+
+def load_schema_catalog(db_uri: str) -> SchemaCatalog:
+    """Read tables, views (skipping internal ``__*`` objects), ``__doc_*`` descriptions and join hints into a catalog."""
+    conn = _open_sqlite(db_uri, mode="ro")
+    try:
+        cur = conn.cursor()
+
+        def _has_table(name: str) -> bool:
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1", (name,))
+            return cur.fetchone() is not None
+
+        cur.execute(
+            """
+            SELECT name, type
+            FROM sqlite_master
+            WHERE type IN ('table', 'view')
+              AND name NOT LIKE 'sqlite_%'
+              AND substr(name, 1, 2) != '__'
+            """
+        )
+        tables: Dict[str, SchemaTable] = {
+            str(r["name"]): SchemaTable(name=str(r["name"]), kind=str(r["type"])) for r in (cur.fetchall() or [])
+        }
+
+        table_docs: Dict[str, str] = {}
+        col_docs: Dict[Tuple[str, str], str] = {}
+        joins: List[Tuple[str, str, str, str, str]] = []
+        try:
+            if _has_table("__doc_table"):
+                cur.execute("SELECT table_name, description FROM __doc_table")
+                for tn, desc in (cur.fetchall() or []):
+                    if tn and desc:
+                        table_docs[str(tn)] = str(desc)
+            if _has_table("__doc_column"):
+                cur.execute("SELECT table_name, column_name, description FROM __doc_column")
+                for tn, cn, desc in (cur.fetchall() or []):
+                    if tn and cn and desc:
+                        col_docs[(str(tn), str(cn))] = str(desc)
+            if _has_table("__doc_join"):
+                cur.execute("SELECT left_table, left_column, right_table, right_column, relationship FROM __doc_join")
+                for lt, lc, rt, rc, rel in (cur.fetchall() or []):
+                    joins.append((str(lt), str(lc), str(rt), str(rc), str(rel or "")))
+        except sqlite3.Error:
+            table_docs, col_docs, joins = {}, {}, []
+
+        for name, t in tables.items():
+            t.description = table_docs.get(name, "")
+            cur.execute(f"PRAGMA table_info({quote_ident(name)})")
+            for c in (cur.fetchall() or []):
+                col = str(c["name"])
+                t.columns.append((col, col_docs.get((name, col), "")))
+            if not joins and t.kind == "table":
+                cur.execute(f"PRAGMA foreign_key_list({quote_ident(name)})")
+                for fk in (cur.fetchall() or []):
+                    joins.append((name, str(fk["from"]), str(fk["table"]), str(fk["to"]), ""))
+
+        edges: Dict[str, Set[str]] = {name: set() for name in tables}
+        for lt, lc, rt, rc, rel in joins:
+            if lt not in tables or rt not in tables:
+                continue
+            hint = f"{lt}.{lc} -> {rt}.{rc} {rel}".strip()
+            tables[lt].joins.append(hint)
+            tables[rt].joins.append(hint)
+            edges[lt].add(rt)
+            edges[rt].add(lt)
+
+        row = conn.execute("PRAGMA schema_version").fetchone()
+        version = int(row[0]) if row else 0
+        return SchemaCatalog(tables=tables, edges=edges, version=version)
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class BM25Index:
+    """Minimal Okapi BM25 over pre-tokenized documents."""
+
+    def __init__(self, docs: Dict[str, List[str]], *, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._tf: Dict[str, Counter] = {key: Counter(toks) for key, toks in docs.items()}
+        self._len: Dict[str, int] = {key: len(toks) for key, toks in docs.items()}
+        n = max(1, len(docs))
+        self._avg_len = (sum(self._len.values()) / n) or 1.0
+        df: Counter = Counter()
+        for tf in self._tf.values():
+            df.update(tf.keys())
+        self._idf: Dict[str, float] = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query_tokens: Iterable[str]) -> Dict[str, float]:
+        q = [t for t in set(query_tokens) if t in self._idf]
+        out: Dict[str, float] = {}
+        for key, tf in self._tf.items():
+            norm = self.k1 * (1 - self.b + self.b * self._len[key] / self._avg_len)
+            s = 0.0
+            for t in q:
+                f = tf.get(t, 0)
+                if f:
+                    s += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            out[key] = s
+        return out
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+@dataclass
+class SchemaSelection:
+    """Result of :meth:`SchemaRetriever.select`. ``tables`` is None when the full schema should be used."""
+
+    tables: Optional[List[str]]
+    matched: List[str]
+    scores: Dict[str, float]
+    confident: bool
+
+
+class SchemaRetriever:
+    """
+    Select the tables relevant to a natural-language request, plus their join closure.
+
+    Each table is indexed as one document built from its name, column names,
+    ``__doc_*`` descriptions and join hints. Queries are scored with BM25 and,
+    when an ``encoder`` is supplied, blended with the cosine similarity of
+    dense embeddings. When the best score is below ``min_score`` (or nothing
+    matches) the selection falls back to the full schema.
+    """
+
+    def __init__(
+        self,
+        db_uri: str,
+        *,
+        encoder: Optional[SchemaEncoder] = None,
+        min_score: float = 1.0,
+        relative_cutoff: float = 0.35,
+        max_tables: int = 6,
+        embedding_weight: float = 0.5,
+    ) -> None:
+        self.db_uri = db_uri
+        self.encoder = encoder
+        self.min_score = float(min_score)
+        self.relative_cutoff = float(relative_cutoff)
+        self.max_tables = max(1, int(max_tables))
+        self.embedding_weight = float(embedding_weight)
+        self.catalog = load_schema_catalog(db_uri)
+        docs = {name: t.document() for name, t in self.catalog.tables.items()}
+        self._index = BM25Index({name: tokenize(d) for name, d in docs.items()})
+        self._names = list(docs.keys())
+        self._embeddings: Dict[str, Sequence[float]] = {}
+        if encoder is not None and docs:
+            vecs = encoder([docs[n] for n in self._names])
+            self._embeddings = dict(zip(self._names, vecs))
+
+    @property
+    def version(self) -> int:
+        return self.catalog.version
+
+    def is_stale(self) -> bool:
+        try:
+            return get_schema_version(self.db_uri) != self.catalog.version
+        except Exception:
+            return True
+
+    def score(self, query: str) -> Dict[str, float]:
+        tokens = tokenize(query)
+        scores = self._index.scores(tokens)
+        # Direct table-name mentions ("vehicles", "sales order") always count.
+        token_set = set(tokens)
+        for name in self._names:
+            name_toks = tokenize(name.replace("_", " "))
+            if name_toks and all(t in token_set for t in name_toks):
+                scores[name] = scores.get(name, 0.0) + self.min_score
+        if self._embeddings and self.encoder is not None:
+            qv = self.encoder([query])[0]
+            top = max(scores.values(), default=0.0) or 1.0
+            for name, v in self._embeddings.items():
+                sim = max(0.0, _cosine(qv, v))
+                scores[name] = (1 - self.embedding_weight) * scores.get(name, 0.0) + self.embedding_weight * sim * top
+        return scores
+
+    def join_closure(self, tables: Iterable[str]) -> List[str]:
+        """Add the tables on the shortest join path between every pair of selected tables."""
+        selected = [t for t in tables if t in self.catalog.edges]
+        out: Set[str] = set(selected)
+        for i, src in enumerate(selected):
+            for dst in selected[i + 1 :]:
+                out.update(self._shortest_path(src, dst))
+        return sorted(out)
+
+    def _shortest_path(self, src: str, dst: str) -> List[str]:
+        prev: Dict[str, Optional[str]] = {src: None}
+        queue = deque([src])
+        while queue:
+            cur = queue.popleft()
+            if cur == dst:
+                path: List[str] = []
+                node: Optional[str] = cur
+                while node is not None:
+                    path.append(node)
+                    node = prev[node]
+                return path
+            for nxt in sorted(self.catalog.edges.get(cur, ())):
+                if nxt not in prev:
+                    prev[nxt] = cur
+                    queue.append(nxt)
+        return []
+
+    def select(self, query: str) -> SchemaSelection:
+        scores = self.score(query)
+        ranked = sorted(((s, n) for n, s in scores.items() if s > 0), reverse=True)
+        if not ranked or ranked[0][0] < self.min_score:
+            return SchemaSelection(tables=None, matched=[], scores=scores, confident=False)
+        cutoff = ranked[0][0] * self.relative_cutoff
+        matched = [n for s, n in ranked if s >= cutoff][: self.max_tables]
+        return SchemaSelection(tables=self.join_closure(matched), matched=matched, scores=scores, confident=True)
+
+    def schema_context(self, query: str) -> Tuple[str, SchemaSelection]:
+        """Return the (possibly pruned) schema context for *query* and the selection behind it."""
+        selection = self.select(query)
+        return get_schema_context(self.db_uri, tables=selection.tables), selection
@@ -4,7 +4,7 @@ from __future__ import annotations
 import re
 import sqlite3
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Set, Tuple
+from typing import Any, Dict, Iterable, List, Literal, Set, Tuple
 from urllib.parse import quote, urlparse
 
 from sqlglot import ErrorLevel, exp, parse_one
@@ -232,7 +232,27 @@ def quote_ident(name: str) -> str:
     return '"' + name.replace('"', '""') + '"'
 
 
-def get_schema_context(db_uri: str) -> str:
+def get_schema_version(db_uri: str) -> int:
+    """Return SQLite's ``PRAGMA schema_version``; it changes on every DDL statement."""
+    conn = _open_sqlite(db_uri, mode="ro")
+    try:
+        row = conn.execute("PRAGMA schema_version").fetchone()
+        return int(row[0]) if row else 0
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_schema_context(db_uri: str, tables: Iterable[str] | None = None) -> str:
+    """
+    Render the schema (tables, views, column docs, join hints) as LLM context.
+
+    When *tables* is given, only those tables/views and the joins between them
+    are rendered; names that do not exist in the database are ignored.
+    """
+    only: Set[str] | None = {str(t).lower() for t in tables} if tables is not None else None
     conn = _open_sqlite(db_uri, mode="ro")
     try:
         cur = conn.cursor()
@@ -272,14 +292,14 @@ def get_schema_context(db_uri: str) -> str:
             col_docs = {}
             join_hints = []
 
-        # ---- Fetch schema objects (excluding sqlite_* and __doc_*) ----
+        # ---- Fetch schema objects (excluding sqlite_* and internal __* tables such as __doc_*, __fts_*) ----
         cur.execute(
             """
             SELECT name, type
             FROM sqlite_master
             WHERE type IN ('table', 'view')
               AND name NOT LIKE 'sqlite_%'
-              AND name NOT LIKE '__doc_%'
+              AND substr(name, 1, 2) != '__'
             ORDER BY type, name
             """
         )
@@ -289,6 +309,9 @@ def get_schema_context(db_uri: str) -> str:
 
         tables = [r["name"] for r in objs if r["type"] == "table"]
         views = [r["name"] for r in objs if r["type"] == "view"]
+        if only is not None:
+            tables = [t for t in tables if t.lower() in only]
+            views = [v for v in views if v.lower() in only]
 
         # Prefer domain-meaningful order (helps an LLM "think like the schema designer")
         preferred = [
@@ -337,11 +360,20 @@ def get_schema_context(db_uri: str) -> str:
             except sqlite3.Error:
                 join_hints = []
 
+        if only is not None:
+            join_hints = [
+                j for j in join_hints
+                if str(j["left_table"]).lower() in only and str(j["right_table"]).lower() in only
+            ]
+
         # ---- Render structured context (LLM-oriented) ----
         lines: List[str] = []
         lines.append("-- dialect: sqlite")
         lines.append("")
-        lines.append("List of all tables and column information")
+        if only is None:
+            lines.append("List of all tables and column information")
+        else:
+            lines.append("List of tables relevant to this request and column information")
 
         for table_name in tables:
             lines.append(f"- {table_name}")
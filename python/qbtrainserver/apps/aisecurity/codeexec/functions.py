@@ -3,14 +3,23 @@ Business logic for code execution app
 
 Uses qbtrain LLM client infrastructure for provider-agnostic LLM integration.
 """
+import csv
+import hashlib
+import io
 import json
+import math
+import os
 import subprocess
-import sys
+import threading
 import time
 import re
+from collections import Counter, OrderedDict
+from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Dict, Optional, Any
+from typing import Tuple, Dict, Optional, Any, Iterator, List
 
+from qbtrain.agents.code_screening import ScreenVerdict, screen_code
+from qbtrain.agents.sandbox_pool import SandboxLimits, SandboxSession, run_python, stream_python
 from qbtrain.ai.llm import LLMClientRegistry
 from qbtrain.tracers.agent_tracer import AgentTracer
 
@@ -46,11 +55,15 @@ class OutputEvaluationError(CodeExecError):
 
 # ======================== Helpers ========================
 
-def make_script_dir() -> Path:
-    """Create and return the scripts directory"""
-    script_dir = Path(__file__).parent / "tmp" / "scripts"
-    script_dir.mkdir(parents=True, exist_ok=True)
-    return script_dir
+SESSIONS_DIR = Path(__file__).parent / "tmp" / "sessions"
+
+
+def make_session(files: Optional[Dict[str, bytes]] = None) -> SandboxSession:
+    """
+    Create the working directory for one query. Uploaded files are written
+    once, read-only, under data/ and shared by every iteration's script.
+    """
+    return SandboxSession(files, root=str(SESSIONS_DIR), prefix="query_")
 
 
 def _estimate_tokens(text: str) -> int:
@@ -144,6 +157,419 @@ def _call_llm(prompt: str, system_prompt: Optional[str],
         raise CodeExecError(f"LLM call failed: {e}")
 
 
+# ======================== Dataset profiles ========================
+
+PROFILES_DIR = Path(__file__).parent / "tmp" / "profiles"
+TABULAR_TYPES = {"csv", "tsv", "xlsx", "xls"}
+
+_PROFILE_HEAD_ROWS = 5
+_PROFILE_DISTINCT_CAP = 1000          # stop counting distinct values past this
+_PROFILE_TEXT_CHARS = 2500            # cap on the prompt text of one profile
+_NULL_TOKENS = {"", "na", "n/a", "nan", "null", "none", "-"}
+_BOOL_TOKENS = {"true", "false", "yes", "no"}
+_INT_RE = re.compile(r"^[+-]?\d+$")
+
+_PROFILE_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+try:
+    _PROFILE_CACHE_SIZE = max(1, int((os.getenv("CODEEXEC_PROFILE_CACHE_SIZE") or "").strip() or 64))
+except ValueError:
+    _PROFILE_CACHE_SIZE = 64
+_PROFILE_JOBS: Dict[str, threading.Event] = {}
+_PROFILE_LOCK = threading.Lock()
+
+
+class _ColumnProfile:
+    """Streaming per-column type inference and statistics."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.non_null = 0
+        self.nulls = 0
+        self.kinds = {"int", "float", "bool", "datetime"}
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.values: Optional[Counter] = Counter()
+
+    def add(self, raw: str) -> None:
+        value = raw.strip()
+        if value.lower() in _NULL_TOKENS:
+            self.nulls += 1
+            return
+        self.non_null += 1
+        if self.values is not None:
+            self.values[value] += 1
+            if len(self.values) > _PROFILE_DISTINCT_CAP:
+                self.values = None
+        kinds = self.kinds
+        if not kinds:
+            return
+        if "int" in kinds and not _INT_RE.match(value):
+            kinds.discard("int")
+        if "float" in kinds:
+            try:
+                number = float(value)
+            except ValueError:
+                kinds.discard("float")
+            else:
+                if math.isfinite(number):
+                    # Welford's running mean / variance
+                    self.n += 1
+                    delta = number - self.mean
+                    self.mean += delta / self.n
+                    self.m2 += delta * (number - self.mean)
+                    self.min = number if self.min is None else min(self.min, number)
+                    self.max = number if self.max is None else max(self.max, number)
+        if "bool" in kinds and value.lower() not in _BOOL_TOKENS:
+            kinds.discard("bool")
+        if "datetime" in kinds:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                kinds.discard("datetime")
+
+    def to_dict(self) -> Dict[str, Any]:
+        dtype = next((k for k in ("int", "float", "bool", "datetime") if k in self.kinds), "string")
+        if self.non_null == 0:
+            dtype = "empty"
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "dtype": dtype,
+            "non_null": self.non_null,
+            "nulls": self.nulls,
+            "unique": len(self.values) if self.values is not None else f">{_PROFILE_DISTINCT_CAP}",
+        }
+        if dtype in ("int", "float") and self.n:
+            std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+            out.update(min=self.min, max=self.max, mean=round(self.mean, 4), std=round(std, 4))
+        elif self.values:
+            out["top"] = self.values.most_common(3)
+        return out
+
+
+def _tabular_rows(filename: str, content: bytes) -> Tuple[Iterator[List[str]], Dict[str, Any]]:
+    """Rows (header first) of a CSV/TSV/Excel upload as lists of strings, plus format details."""
+    ext = filename.rsplit(".", 1)[-1].lower()
+    if ext in ("xlsx", "xls"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ValueError("Excel profiling needs pandas (and openpyxl) installed")
+        frame = pd.read_excel(io.BytesIO(content), sheet_name=0, dtype=str)
+        rows = ([str(c) for c in frame.columns],)
+        body = (["" if v is None or v != v else str(v) for v in row] for row in frame.itertuples(index=False))
+        return iter([*rows, *body]), {"format": ext, "sheet": 0}
+
+    text = content.decode("utf-8-sig", errors="replace")
+    delimiter = "\t" if ext == "tsv" else ","
+    try:
+        delimiter = csv.Sniffer().sniff(text[:65536], delimiters=",;\t|").delimiter
+    except csv.Error:
+        pass
+    return csv.reader(io.StringIO(text), delimiter=delimiter), {"format": ext, "delimiter": delimiter}
+
+
+def profile_dataset(filename: str, content: bytes) -> Dict[str, Any]:
+    """
+    Profile a tabular upload in one streaming pass: row count, per-column
+    dtype, null / distinct counts, numeric min/max/mean/std or top values,
+    and the first rows.
+    """
+    t0 = time.time()
+    profile: Dict[str, Any] = {"file": Path(filename).name, "bytes": len(content)}
+    try:
+        rows, details = _tabular_rows(filename, content)
+        profile.update(details)
+        header = next(rows, [])
+        columns = [_ColumnProfile(name or f"column_{i}") for i, name in enumerate(header)]
+        head: List[List[str]] = []
+        count = 0
+        for row in rows:
+            if not row:
+                continue
+            count += 1
+            if len(head) < _PROFILE_HEAD_ROWS:
+                head.append(row)
+            for column, value in zip(columns, row):
+                column.add(value)
+        profile.update(
+            rows=count,
+            columns=[c.to_dict() for c in columns],
+            header=header,
+            head=head,
+        )
+    except Exception as e:
+        profile["error"] = f"{type(e).__name__}: {e}"
+    profile["profile_ms"] = round((time.time() - t0) * 1000)
+    return profile
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def format_dataset_profile(profile: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Compact prompt text for a profile, capped at _PROFILE_TEXT_CHARS."""
+    name = path or profile.get("file", "dataset")
+    if profile.get("error"):
+        return f"Dataset {name}: could not be profiled ({profile['error']})"
+    columns = profile.get("columns", [])
+    fmt = profile.get("format", "")
+    if profile.get("delimiter"):
+        fmt += f", delimiter {profile['delimiter']!r}"
+    lines = [f"Dataset {name}: {profile.get('rows', 0)} rows x {len(columns)} columns ({fmt})", "Columns:"]
+    for col in columns:
+        desc = f"  - {col['name']}: {col['dtype']}, {col['non_null']} non-null"
+        if col["nulls"]:
+            desc += f" ({col['nulls']} missing)"
+        desc += f", {col['unique']} unique"
+        if "mean" in col:
+            desc += (f", min {_format_value(col['min'])}, max {_format_value(col['max'])}, "
+                     f"mean {_format_value(col['mean'])}, std {_format_value(col['std'])}")
+        elif col.get("top"):
+            desc += ", top: " + ", ".join(f"{str(v)[:30]!r} ({n})" for v, n in col["top"])
+        lines.append(desc)
+    if profile.get("head"):
+        lines.append(f"First {len(profile['head'])} rows:")
+        for row in [profile.get("header", [])] + profile["head"]:
+            lines.append("  " + " | ".join(str(v)[:40] for v in row))
+    text = "\n".join(lines)
+    return text if len(text) <= _PROFILE_TEXT_CHARS else text[:_PROFILE_TEXT_CHARS] + "\n  ..."
+
+
+def dataset_key(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    """Best-effort atomic write; concurrent writers of the same key just race to the last replace."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp{threading.get_ident()}")
+        tmp.write_text(json.dumps(data, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _remember_profile(key: str, profile: Dict[str, Any]) -> None:
+    with _PROFILE_LOCK:
+        _PROFILE_CACHE[key] = profile
+        _PROFILE_CACHE.move_to_end(key)
+        while len(_PROFILE_CACHE) > _PROFILE_CACHE_SIZE:
+            _PROFILE_CACHE.popitem(last=False)
+
+
+def _load_profile(key: str) -> Optional[Dict[str, Any]]:
+    with _PROFILE_LOCK:
+        profile = _PROFILE_CACHE.get(key)
+        if profile is not None:
+            _PROFILE_CACHE.move_to_end(key)
+            return profile
+    try:
+        profile = json.loads((PROFILES_DIR / f"{key}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    _remember_profile(key, profile)
+    return profile
+
+
+def _run_profile(key: str, filename: str, content: bytes, done: threading.Event) -> None:
+    try:
+        profile = profile_dataset(filename, content)
+        _remember_profile(key, profile)
+        _write_json(PROFILES_DIR / f"{key}.json", profile)
+    finally:
+        with _PROFILE_LOCK:
+            _PROFILE_JOBS.pop(key, None)
+        done.set()
+
+
+def start_dataset_profile(filename: str, content: bytes) -> Optional[str]:
+    """
+    Start profiling a CSV/TSV/Excel upload in a background thread. Profiles
+    are keyed by content hash and kept in memory and under tmp/profiles, so
+    re-uploading the same data reuses the profile. Returns the key, or None
+    for non-tabular files.
+    """
+    if filename.rsplit(".", 1)[-1].lower() not in TABULAR_TYPES:
+        return None
+    key = dataset_key(content)
+    if _load_profile(key) is not None:
+        return key
+    with _PROFILE_LOCK:
+        if key in _PROFILE_JOBS:
+            return key
+        done = threading.Event()
+        _PROFILE_JOBS[key] = done
+    threading.Thread(target=_run_profile, args=(key, filename, content, done), daemon=True).start()
+    return key
+
+
+def get_dataset_profile(key: Optional[str], timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+    """The profile for *key*, waiting up to *timeout* seconds for a running job."""
+    if not key:
+        return None
+    with _PROFILE_LOCK:
+        job = _PROFILE_JOBS.get(key)
+    if job is not None:
+        job.wait(timeout)
+    return _load_profile(key)
+
+
+# ======================== Generated code cache ========================
+
+CODE_CACHE_DIR = Path(__file__).parent / "tmp" / "code_cache"
+# Changes whenever the code-generation prompt is edited, invalidating old entries
+PROMPT_VERSION = hashlib.sha256(prompts.CODE_GEN_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+_KNOWN_FAILURES_CAP = 5               # failing scripts remembered per key
+_FAILURE_ERROR_CHARS = 500
+
+_CODE_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+try:
+    _CODE_CACHE_SIZE = max(0, int((os.getenv("CODEEXEC_CODE_CACHE_SIZE") or "").strip() or 128))
+except ValueError:
+    _CODE_CACHE_SIZE = 128
+try:
+    _CODE_CACHE_TTL = max(0, int((os.getenv("CODEEXEC_CODE_CACHE_TTL") or "").strip() or 86400))
+except ValueError:
+    _CODE_CACHE_TTL = 86400
+CODE_CACHE_REEXECUTE = (os.getenv("CODEEXEC_CODE_CACHE_REEXECUTE") or "").strip().lower() in ("1", "true", "yes")
+_CODE_CACHE_LOCK = threading.Lock()
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def code_cache_key(question: str, files: Optional[List[bytes]], client_config: Dict[str, Any]) -> Optional[str]:
+    """
+    Cache key for the code answering *question* over the uploaded *files*:
+    normalized question, upload content hashes, model id and PROMPT_VERSION.
+    None when the cache is disabled (CODEEXEC_CODE_CACHE_SIZE=0).
+    """
+    if not _CODE_CACHE_SIZE:
+        return None
+    parts = [
+        normalize_question(question),
+        sorted(dataset_key(f) for f in files or []),
+        client_config.get("type", "openai"),
+        client_config.get("model", ""),
+        PROMPT_VERSION,
+    ]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _code_hash(code: str) -> str:
+    return hashlib.sha256(code.strip().encode("utf-8")).hexdigest()
+
+
+def _load_code_entry(key: str) -> Dict[str, Any]:
+    with _CODE_CACHE_LOCK:
+        entry = _CODE_CACHE.get(key)
+        if entry is not None:
+            _CODE_CACHE.move_to_end(key)
+    if entry is None:
+        try:
+            entry = json.loads((CODE_CACHE_DIR / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = {}
+        entry.setdefault("failures", [])
+    if entry.get("code") and _CODE_CACHE_TTL and time.time() - entry.get("created", 0) > _CODE_CACHE_TTL:
+        entry = {"failures": entry["failures"]}
+    return entry
+
+
+def _store_code_entry(key: str, entry: Dict[str, Any]) -> None:
+    with _CODE_CACHE_LOCK:
+        _CODE_CACHE[key] = entry
+        _CODE_CACHE.move_to_end(key)
+        while len(_CODE_CACHE) > _CODE_CACHE_SIZE:
+            _CODE_CACHE.popitem(last=False)
+    _write_json(CODE_CACHE_DIR / f"{key}.json", entry)
+
+
+def get_cached_code(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    The last successful script for *key*, or None.
+    Returns: {"code", "route", "output", "created", "hits"}; hits counts earlier reuses in this process
+    """
+    if not key:
+        return None
+    entry = _load_code_entry(key)
+    if not entry.get("code"):
+        return None
+    hit = {k: entry.get(k) for k in ("code", "route", "output", "created", "hits")}
+    with _CODE_CACHE_LOCK:
+        # Counted in memory only; a hit should not cost a disk write
+        entry["hits"] = entry.get("hits", 0) + 1
+        _CODE_CACHE[key] = entry
+        _CODE_CACHE.move_to_end(key)
+        while len(_CODE_CACHE) > _CODE_CACHE_SIZE:
+            _CODE_CACHE.popitem(last=False)
+    return hit
+
+
+def record_code_success(key: Optional[str], code: str, route: str, output: str) -> None:
+    """Remember a script whose output answered the question, replacing any earlier one."""
+    if not key:
+        return
+    entry = _load_code_entry(key)
+    digest = _code_hash(code)
+    entry.update(
+        code=code, route=route, output=output, created=time.time(), hits=0,
+        failures=[f for f in entry["failures"] if f["hash"] != digest],
+    )
+    _store_code_entry(key, entry)
+
+
+def record_code_failure(key: Optional[str], code: str, error: str) -> None:
+    """
+    Remember a script that failed in the sandbox, so later attempts skip it.
+    Drops the cached success if that was the script.
+    """
+    if not key:
+        return
+    entry = _load_code_entry(key)
+    digest = _code_hash(code)
+    if entry.get("code") and _code_hash(entry["code"]) == digest:
+        entry = {"failures": entry["failures"]}
+    failures = [f for f in entry["failures"] if f["hash"] != digest]
+    failures.append({"hash": digest, "error": (error or "")[-_FAILURE_ERROR_CHARS:]})
+    entry["failures"] = failures[-_KNOWN_FAILURES_CAP:]
+    _store_code_entry(key, entry)
+
+
+def known_code_failure(key: Optional[str], code: str) -> Optional[str]:
+    """The recorded error if *code* is already known to fail for *key*, else None."""
+    if not key:
+        return None
+    digest = _code_hash(code)
+    for failure in _load_code_entry(key)["failures"]:
+        if failure["hash"] == digest:
+            return failure["error"] or "(no error output)"
+    return None
+
+
+def code_failure_hint(key: Optional[str]) -> str:
+    """Previous-output text describing earlier failed scripts, for the first generation attempt."""
+    if not key:
+        return ""
+    failures = _load_code_entry(key)["failures"]
+    if not failures:
+        return ""
+    return "Earlier scripts for this question failed with:\n" + "\n".join(
+        f"- {f['error'].strip().splitlines()[-1] if f['error'].strip() else '(no error output)'}"
+        for f in failures[-3:]
+    )
+
+
 # ======================== Core Functions ========================
 
 def decide_route(
@@ -202,24 +628,31 @@ def generate_code(
     context: str = "",
     previous_output: str = "",
     iteration: int = 1,
-    script_dir: Optional[Path] = None,
+    data_files: Optional[List[str]] = None,
+    dataset_profile: Optional[str] = None,
     client_config: Optional[Dict[str, Any]] = None,
     tracer: Optional[AgentTracer] = None
-) -> Tuple[str, Path]:
+) -> Tuple[str, str]:
     """
     Generate Python code for the given route.
-    Returns: (code_string, path_to_script)
+    data_files: paths, relative to the script's working directory, of uploaded files it can read
+    dataset_profile: format_dataset_profile() text; replaces the raw file excerpt as context
+    Returns: (code_string, script_name)
     """
-    if script_dir is None:
-        script_dir = make_script_dir()
-
     if client_config is None:
         client_config = {}
 
+    if dataset_profile:
+        context = dataset_profile
+    else:
+        context = context[:1000] if context else "(no context)"
+    if data_files:
+        context = f"Files readable by the script (relative paths, read-only): {', '.join(data_files)}\n{context}"
+
     prompt = prompts.CODE_GEN_PROMPT.format(
         route=route,
         question=question,
-        context=context[:1000] if context else "(no context)",
+        context=context,
         previous_output=previous_output[:500] if previous_output else "(no previous output)",
         iteration=iteration
     )
@@ -238,33 +671,47 @@ def generate_code(
         code = re.sub(r'\n?```$', '', code)
         code = code.strip()
 
-        # Save code to file
+        # Scripts are piped to the sandbox; the name only labels tracebacks
         timestamp = int(time.time() * 1000)
-        script_path = script_dir / f"query_{timestamp}_iter{iteration}.py"
-
-        with open(script_path, 'w') as f:
-            f.write(code)
+        script_name = f"query_{timestamp}_iter{iteration}.py"
 
-        return code, script_path
+        return code, script_name
     except Exception as e:
         raise CodeGenerationError(f"Failed to generate code: {e}")
 
 
+# Comma-separated modules, dotted names and shell commands refused unless run as admin
+CODE_DENYLIST = {t.strip() for t in (os.getenv("CODEEXEC_DENYLIST") or "").split(",") if t.strip()}
+
+
+def screen_generated_code(code: str, script_name: str = "script.py", run_as_admin: bool = False) -> ScreenVerdict:
+    """
+    Screen generated code in one AST pass before it reaches the sandbox.
+    Code that does not parse is always refused; CODE_DENYLIST applies
+    unless run_as_admin. verdict.reason is precise enough for a retry prompt.
+    """
+    return screen_code(code, () if run_as_admin else CODE_DENYLIST, filename=script_name)
+
+
 def execute_code(
-    script_path: Path,
+    code: str,
+    workdir: Path,
+    script_name: str = "script.py",
     run_as_admin: bool = False
 ) -> Tuple[str, str, int]:
     """
-    Execute a Python script and capture output.
+    Execute Python source in workdir and capture output. The source is piped
+    to the sandbox, not written to disk; script_name labels tracebacks.
+    Resource limits come from SandboxLimits.from_env() (SANDBOX_* env vars).
     Returns: (stdout, stderr, returncode)
     """
     try:
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
+        result = run_python(
+            script_name,
+            cwd=str(workdir),
+            source=code,
             timeout=30,
-            cwd=str(script_path.parent)
+            limits=SandboxLimits.from_env(),
         )
 
         return result.stdout, result.stderr, result.returncode
@@ -274,6 +721,34 @@ def execute_code(
         raise CodeExecutionError(f"Failed to execute code: {e}")
 
 
+def stream_execute_code(
+    code: str,
+    workdir: Path,
+    script_name: str = "script.py",
+    run_as_admin: bool = False
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Execute Python source like execute_code, yielding output as it is written.
+    Yields: ("stdout" | "stderr", text) while running, then ("exit", (stdout, stderr, returncode))
+    """
+    try:
+        for kind, value in stream_python(
+            script_name,
+            cwd=str(workdir),
+            source=code,
+            timeout=30,
+            limits=SandboxLimits.from_env(),
+        ):
+            if kind == "exit":
+                yield kind, (value.stdout, value.stderr, value.returncode)
+            else:
+                yield kind, value
+    except subprocess.TimeoutExpired:
+        raise CodeExecutionError("Code execution timed out (30s limit)")
+    except Exception as e:
+        raise CodeExecutionError(f"Failed to execute code: {e}")
+
+
 def parse_script_output(stdout: str) -> Optional[Dict]:
     """
     Parse JSON output from script.
@@ -0,0 +1,112 @@
+"""
+Benchmark: generated-code cache for repeated questions.
+
+Replays BENCH_REPEATS identical questions over the same BENCH_ROWS-row
+upload. A miss pays the code-generation and sufficiency LLM calls (taken
+as BENCH_LLM_MS each, the figure to plug in from the model's traces) plus
+one sandbox run; a hit costs the cache lookup, or the lookup plus one
+sandbox run when the cached script is re-executed. Also checks that a
+different question, upload or model misses, and that a script recorded as
+failing is recognised.
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.codeexec import functions as fn  # noqa: E402
+
+REPEATS = int(os.environ.get("BENCH_REPEATS", 50))
+ROWS = int(os.environ.get("BENCH_ROWS", 20000))
+LLM_MS = int(os.environ.get("BENCH_LLM_MS", 1500))
+
+MODEL = {"type": "openai", "model": "bench-model"}
+QUESTION = "What is the mean of the value column?"
+SCRIPT = (
+    "import csv, json\n"
+    "with open('data/upload.csv') as f:\n"
+    "    values = [int(r['value']) for r in csv.DictReader(f)]\n"
+    "print(json.dumps({'values': sum(values) / len(values), 'files': []}))\n"
+)
+
+
+def _p50(samples):
+    return statistics.median(samples)
+
+
+def main():
+    fn.CODE_CACHE_DIR = Path(tempfile.mkdtemp(prefix="bench_codecache_"))
+    upload = ("id,value\n" + "".join(f"{i},{i % 97}\n" for i in range(ROWS))).encode()
+    session = fn.make_session({"upload.csv": upload})
+
+    miss_run, hit, hit_disk, hit_rerun = [], [], [], []
+    output = None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        stdout, _, _ = fn.execute_code(SCRIPT, session.path)
+        miss_run.append((time.perf_counter() - t0) * 1000)
+        output = stdout
+
+    key = fn.code_cache_key(QUESTION, [upload], MODEL)
+    fn.record_code_success(key, SCRIPT, "csv", output)
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        cached = fn.get_cached_code(fn.code_cache_key(QUESTION, [upload], MODEL))
+        hit.append((time.perf_counter() - t0) * 1000)
+
+        fn._CODE_CACHE.clear()
+        t0 = time.perf_counter()
+        fn.get_cached_code(fn.code_cache_key(QUESTION, [upload], MODEL))
+        hit_disk.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        cached = fn.get_cached_code(fn.code_cache_key(QUESTION, [upload], MODEL))
+        stdout, _, _ = fn.execute_code(cached["code"], session.path)
+        hit_rerun.append((time.perf_counter() - t0) * 1000)
+
+    same_output = cached["output"] == output == stdout
+    normalized_hit = fn.get_cached_code(fn.code_cache_key("  what is the MEAN of the value column ", [upload], MODEL))
+    misses = [
+        fn.get_cached_code(fn.code_cache_key("What is the max of the value column?", [upload], MODEL)),
+        fn.get_cached_code(fn.code_cache_key(QUESTION, [upload + b"1,1\n"], MODEL)),
+        fn.get_cached_code(fn.code_cache_key(QUESTION, [upload], dict(MODEL, model="other-model"))),
+    ]
+    bad = "raise ValueError('no such column')\n"
+    _, bad_err, _ = fn.execute_code(bad, session.path)
+    fn.record_code_failure(key, bad, bad_err)
+    known = fn.known_code_failure(key, "\n" + bad)
+
+    miss_ms = 2 * LLM_MS + _p50(miss_run)
+    print(f"Generated-code cache benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Repeats: {REPEATS}, upload: {ROWS} rows, LLM call: {LLM_MS} ms (assumed)")
+    print(f"{'path':34s} {'p50 ms':>10s}")
+    print(f"{'miss (2 LLM calls + run)':34s} {miss_ms:10.1f}")
+    print(f"{'hit, memory':34s} {_p50(hit):10.3f}")
+    print(f"{'hit, disk (after restart)':34s} {_p50(hit_disk):10.3f}")
+    print(f"{'hit, re-executed':34s} {_p50(hit_rerun):10.1f}")
+    print(f"Same output from cache and re-execution: {same_output}")
+    print(f"Normalized question hits: {normalized_hit is not None}, "
+          f"other question/upload/model miss: {all(m is None for m in misses)}")
+    print(f"Known failing script recognised: {known is not None and 'no such column' in known}")
+    print(f"Failure hint: {fn.code_failure_hint(key)!r}")
+    session.close()
+    shutil.rmtree(fn.CODE_CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: in-memory script delivery vs. a temp file per execution.
+
+Runs BENCH_EXECUTIONS short scripts that read an uploaded CSV, the way a
+query's iterations do. The previous way writes each script to a temp file,
+copies the upload next to it, and deletes both afterwards. The new way
+pipes the source into the sandbox and reads the upload from a SandboxSession
+prepared once. Reports latency per execution, checks that the outputs and
+traceback line numbers match, and counts files left behind.
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents.sandbox_pool import SandboxSession, run_python  # noqa: E402
+
+EXECUTIONS = int(os.environ.get("BENCH_EXECUTIONS", 200))
+CSV_ROWS = int(os.environ.get("BENCH_CSV_ROWS", 20000))
+
+SCRIPT = (
+    "with open('data/upload.csv') as f:\n"
+    "    header = f.readline().strip()\n"
+    "    rows = sum(1 for _ in f)\n"
+    "print(header, rows)\n"
+)
+FAILING = "x = 1\n\ndef f():\n    return x / 0\n\nf()\n"
+
+
+def _csv_bytes():
+    lines = ["id,value"] + [f"{i},{i % 97}" for i in range(CSV_ROWS)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _temp_file_run(source, upload, root):
+    """Previous flow: per-execution directory with the script and a copy of the upload."""
+    workdir = Path(tempfile.mkdtemp(dir=root))
+    try:
+        (workdir / "data").mkdir()
+        (workdir / "data" / "upload.csv").write_bytes(upload)
+        script = workdir / "script.py"
+        script.write_text(source, encoding="utf-8")
+        return run_python(str(script), cwd=str(workdir), timeout=30)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def _timed(func, n):
+    samples = []
+    result = None
+    for _ in range(n):
+        t0 = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, result
+
+
+def main():
+    upload = _csv_bytes()
+    root = tempfile.mkdtemp(prefix="bench_inmemory_")
+    session = SandboxSession({"upload.csv": upload}, root=root)
+    run_python("script.py", cwd=str(session.path), source="pass\n", timeout=60)  # warm the pool
+
+    file_samples, file_result = _timed(lambda: _temp_file_run(SCRIPT, upload, root), EXECUTIONS)
+    mem_samples, mem_result = _timed(
+        lambda: run_python("script.py", cwd=str(session.path), source=SCRIPT, timeout=30), EXECUTIONS
+    )
+
+    file_err = _temp_file_run(FAILING, upload, root).stderr
+    mem_err = run_python("script.py", cwd=str(session.path), source=FAILING, timeout=30).stderr
+    same_tb = file_err.replace(file_err.split('"')[1], "script.py") == mem_err.replace(
+        mem_err.split('"')[1], "script.py")
+
+    print(f"In-memory code delivery benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Executions: {EXECUTIONS}, upload: {len(upload) / 1024:.0f} KiB")
+    print(f"{'mode':28s} {'p50 ms':>8s} {'p95 ms':>8s} {'total s':>8s}")
+    for name, samples in (("temp file + copied upload", file_samples), ("in-memory + shared session", mem_samples)):
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{name:28s} {statistics.median(samples):8.2f} {p95:8.2f} {sum(samples) / 1000:8.2f}")
+    print(f"Same stdout: {file_result.stdout == mem_result.stdout} ({mem_result.stdout.strip()}), "
+          f"same traceback: {same_tb}")
+    session.close(keep_outputs=True)
+    leftovers = sum(len(files) for _, _, files in os.walk(root))
+    print(f"Files left behind: {leftovers}")
+    shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: resource-limited execution with streamed output.
+
+Runs hostile scripts (CPU spin, runaway allocation, output flood, file
+descriptor leak) through the sandbox under tight SandboxLimits and checks
+that each is stopped by its limit well before the wall-clock timeout. A
+slow printer checks that output is streamed as it is written: the first
+chunk must arrive long before the script exits.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents.sandbox_pool import SandboxLimits, run_python, stream_python  # noqa: E402
+
+TIMEOUT = int(os.environ.get("BENCH_TIMEOUT", 15))
+LIMITS = SandboxLimits(
+    cpu_seconds=int(os.environ.get("BENCH_CPU_SECONDS", 2)),
+    memory_mb=int(os.environ.get("BENCH_MEMORY_MB", 1024)),
+    open_files=64,
+    file_size_mb=8,
+    output_bytes=int(os.environ.get("BENCH_OUTPUT_BYTES", 100_000)),
+)
+
+# name -> (source, check(result) -> bool, what the check expects)
+SCRIPTS = {
+    "spin": (
+        "while True:\n    pass\n",
+        lambda r: r.returncode != 0 and "CPU time limit" in r.stderr,
+        "killed at the CPU limit",
+    ),
+    "allocate": (
+        "blocks = []\nwhile True:\n    blocks.append(bytearray(64 << 20))\n",
+        lambda r: r.returncode == 1 and "MemoryError" in r.stderr,
+        "MemoryError at the address-space limit",
+    ),
+    "flood": (
+        "import sys\nfor i in range(10**9):\n    sys.stdout.write('x' * 1000 + '\\n')\n",
+        lambda r: r.truncated and len(r.stdout.encode()) < LIMITS.output_bytes + 200,
+        "stdout truncated at the byte cap",
+    ),
+    "fd leak": (
+        "files = [open(__file__) for _ in range(10000)]\n",
+        lambda r: r.returncode == 1 and "Too many open files" in r.stderr,
+        "OSError at the open-files limit",
+    ),
+    "big file": (
+        "with open('big.bin', 'wb') as f:\n    f.write(b'0' * (64 << 20))\n",
+        lambda r: r.returncode == 1 and "File too large" in r.stderr,
+        "OSError at the file-size limit",
+    ),
+}
+
+DRIP = "import time\nfor i in range(5):\n    print('tick', i, flush=True)\n    time.sleep(0.4)\n"
+
+
+def main():
+    workdir = Path(tempfile.mkdtemp(prefix="bench_limits_"))
+    print(f"Sandbox limits benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Limits: {LIMITS}, wall-clock timeout: {TIMEOUT}s")
+    print(f"{'script':9s} {'seconds':>8s} {'rc':>4s} {'stdout B':>9s} {'ok':>4s}  expectation")
+    failures = 0
+    for name, (source, check, expect) in SCRIPTS.items():
+        path = workdir / f"{name.replace(' ', '_')}.py"
+        path.write_text(source, encoding="utf-8")
+        t0 = time.perf_counter()
+        try:
+            result = run_python(str(path), cwd=str(workdir), timeout=TIMEOUT, limits=LIMITS)
+            ok = check(result)
+            rc, out_len = result.returncode, len(result.stdout)
+        except subprocess.TimeoutExpired:
+            ok, rc, out_len = False, "T/O", 0
+        failures += not ok
+        print(f"{name:9s} {time.perf_counter() - t0:8.2f} {rc!s:>4s} {out_len:9d} {'yes' if ok else 'NO':>4s}  {expect}")
+
+    path = workdir / "drip.py"
+    path.write_text(DRIP, encoding="utf-8")
+    t0 = time.perf_counter()
+    first = None
+    chunks = 0
+    for kind, _value in stream_python(str(path), cwd=str(workdir), timeout=TIMEOUT, limits=LIMITS):
+        if kind == "exit":
+            break
+        chunks += 1
+        if first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    streamed = first is not None and first < total / 2
+    failures += not streamed
+    print(f"Streaming: first output after {first or 0:.2f}s, exit after {total:.2f}s, "
+          f"{chunks} chunks ({'ok' if streamed else 'NOT streamed'})")
+    print(f"Failures: {failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: cached dataset profiles for code-generation prompts.
+
+Builds a BENCH_ROWS-row CSV upload and compares the prompt context cost per
+generation attempt when the upload is profiled on every attempt vs. once in
+the background (started on upload, overlapping the BENCH_LLM_MS route
+decision). Also reports cache hits from memory and from the on-disk store
+after a restart, and prints the profile text injected into the prompt.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.codeexec import functions as fn  # noqa: E402
+
+ROWS = int(os.environ.get("BENCH_ROWS", 100000))
+ATTEMPTS = int(os.environ.get("BENCH_ATTEMPTS", 3))
+LLM_MS = int(os.environ.get("BENCH_LLM_MS", 1500))
+
+
+def _upload():
+    rng = random.Random(0)
+    lines = ["order_id,amount,region,ordered_on,paid"]
+    for i in range(ROWS):
+        lines.append(f"{i},{rng.uniform(1, 500):.2f},{rng.choice(['north', 'south', 'east', 'west'])},"
+                     f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d},{rng.choice(['yes', 'no'])}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def main():
+    data = _upload()
+    name = f"orders_{ROWS}.csv"
+
+    per_attempt = []
+    for _ in range(ATTEMPTS):
+        t0 = time.perf_counter()
+        fn.format_dataset_profile(fn.profile_dataset(name, data))
+        per_attempt.append((time.perf_counter() - t0) * 1000)
+
+    key = fn.dataset_key(data)
+    fn._PROFILE_CACHE.clear()
+    (fn.PROFILES_DIR / f"{key}.json").unlink(missing_ok=True)
+
+    t0 = time.perf_counter()
+    fn.start_dataset_profile(name, data)
+    time.sleep(LLM_MS / 1000.0)  # route decision runs while the profile is built
+    t1 = time.perf_counter()
+    first_text = fn.format_dataset_profile(fn.get_dataset_profile(key), path=f"data/{name}")
+    waited_ms = (time.perf_counter() - t1) * 1000
+
+    cached = []
+    for _ in range(ATTEMPTS):
+        t0 = time.perf_counter()
+        fn.format_dataset_profile(fn.get_dataset_profile(fn.start_dataset_profile(name, data)))
+        cached.append((time.perf_counter() - t0) * 1000)
+
+    fn._PROFILE_CACHE.clear()
+    t0 = time.perf_counter()
+    from_disk = fn.get_dataset_profile(fn.start_dataset_profile(name, data))
+    disk_ms = (time.perf_counter() - t0) * 1000
+    (fn.PROFILES_DIR / f"{key}.json").unlink(missing_ok=True)
+
+    print(f"Dataset profile benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Upload: {ROWS} rows, {len(data) / 1e6:.1f} MB, {ATTEMPTS} generation attempts, "
+          f"route decision {LLM_MS} ms")
+    print(f"{'mode':36s} {'per attempt ms':>15s} {'total ms':>10s}")
+    print(f"{'profile on every attempt':36s} {statistics.median(per_attempt):15.1f} {sum(per_attempt):10.1f}")
+    print(f"{'background profile, cached':36s} {statistics.median(cached):15.3f} "
+          f"{waited_ms + sum(cached):10.1f}  (first attempt waited {waited_ms:.1f} ms)")
+    print(f"{'reload from disk after restart':36s} {disk_ms:15.1f}")
+    print(f"Profile from disk matches: {from_disk is not None and from_disk.get('rows') == ROWS}")
+    print(f"Prompt context ({len(first_text)} chars):")
+    print(first_text)
+
+
+if __name__ == "__main__":
+    main()
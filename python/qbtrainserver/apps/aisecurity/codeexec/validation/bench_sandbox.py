@@ -0,0 +1,97 @@
+"""
+Benchmark: prewarmed sandbox pool vs. a fresh interpreter per script.
+
+Runs the same scripts through execute_code's old path (subprocess.run of
+sys.executable) and through the SandboxPool, BENCH_RUNS times each, and
+reports per-execution latency. Also checks that both paths produce the same
+stdout, stderr and exit code, and that the timeout kills the script.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents.sandbox_pool import SandboxPool, SandboxResult  # noqa: E402
+
+RUNS = int(os.environ.get("BENCH_RUNS", 10))
+WORKERS = int(os.environ.get("BENCH_WORKERS", 2))
+
+SCRIPTS = {
+    "print": 'print("hello")\n',
+    "pandas": (
+        "import pandas as pd\n"
+        "df = pd.DataFrame({'a': range(100), 'b': range(100)})\n"
+        "print(df.describe().loc['mean'].to_dict())\n"
+    ),
+    "error": "import sys\nprint('partial')\nraise ValueError('bad input')\n",
+    "exit": "import sys\nsys.exit(3)\n",
+}
+
+
+def _time(func, script, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = func(script)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    workdir = Path(tempfile.mkdtemp(prefix="bench_sandbox_"))
+    paths = {}
+    for name, code in SCRIPTS.items():
+        paths[name] = workdir / f"{name}.py"
+        paths[name].write_text(code, encoding="utf-8")
+
+    t0 = time.perf_counter()
+    pool = SandboxPool(WORKERS)
+    pool.run(paths["print"], cwd=workdir, timeout=60)
+    warm_ms = (time.perf_counter() - t0) * 1000
+
+    def fresh(p):
+        r = subprocess.run([sys.executable, str(p)], capture_output=True, text=True, timeout=30, cwd=str(workdir))
+        return SandboxResult(r.stdout, r.stderr, r.returncode)
+
+    def pooled(p):
+        return pool.run(p, cwd=workdir, timeout=30)
+
+    print(f"Sandbox pool benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Runs per script: {RUNS}, workers: {WORKERS}, pool warm-up: {warm_ms:.0f} ms")
+    print(f"{'script':8s} {'fresh p50 ms':>13s} {'pool p50 ms':>12s} {'speedup':>8s} {'same output':>12s}")
+    for name, path in paths.items():
+        fresh_ms, expected = _time(fresh, path, RUNS)
+        pool_ms, got = _time(pooled, path, RUNS)
+        same = (expected.stdout, expected.stderr, expected.returncode) == (got.stdout, got.stderr, got.returncode)
+        print(f"{name:8s} {fresh_ms:13.1f} {pool_ms:12.1f} {fresh_ms / pool_ms:7.1f}x {str(same):>12s}")
+
+    slow = workdir / "slow.py"
+    slow.write_text("import time\nprint('started', flush=True)\ntime.sleep(30)\n", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        pool.run(slow, cwd=workdir, timeout=1)
+        print("Timeout: NOT raised")
+    except subprocess.TimeoutExpired as exc:
+        print(f"Timeout: raised after {time.perf_counter() - t0:.2f} s, partial stdout {exc.output!r}")
+    print(f"Pool stats: {pool.stats()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
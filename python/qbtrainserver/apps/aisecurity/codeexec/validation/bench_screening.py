@@ -0,0 +1,134 @@
+"""
+Benchmark: single-pass AST screening vs. the previous regex denylist scans.
+
+The previous check ran three regex scans (imports, string literals, every
+word token) and left code that does not parse to fail inside the sandbox.
+screen_code parses once and collects imports, calls, builtins and file /
+network access in one traversal. Reports the screening cost per script for
+BENCH_LINES-line scripts, alone and with the sandbox run that follows it,
+the time per refused script including the sandbox launch the old path still
+paid for syntax errors, and how both checks classify a set of tricky cases.
+Parsing costs more than the regex scans; the gain is in refused scripts.
+"""
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents.code_screening import screen_code  # noqa: E402
+from qbtrain.agents.sandbox_pool import run_python  # noqa: E402
+
+RUNS = int(os.environ.get("BENCH_RUNS", 200))
+LINES = int(os.environ.get("BENCH_LINES", 60))
+DENYLIST = {"subprocess", "os.system", "socket", "ctypes", "curl", "rm"}
+
+# (name, code, should be refused)
+CASES = [
+    ("pandas analysis", "import pandas as pd\ndf = pd.read_csv('data/x.csv')\nprint(df.describe())\n", False),
+    ("comment mention", "# subprocess is not needed here\nprint(sum(range(10)))\n", False),
+    ("word in identifier", "socket_count = 3\nprint(socket_count)\n", False),
+    ("aliased import", "import subprocess as sp\nsp.run(['id'])\n", True),
+    ("from-import", "from os import system\nsystem('id')\n", True),
+    ("dynamic import", "mod = __import__('ctypes')\n", True),
+    ("shell string", "cmd = '/usr/bin/curl -s http://x'\n", True),
+    ("syntax error", "def f(:\n    pass\n", True),
+]
+
+
+def _legacy_scan(code, denylist):
+    """The previous three-scan regex check, kept here for comparison."""
+    violations = []
+    lower_deny = {d.lower() for d in denylist}
+    for m in re.finditer(r"^\s*(?:import|from)\s+([\w.]+)", code, re.MULTILINE):
+        parts = m.group(1).lower().split(".")
+        for i in range(len(parts)):
+            if ".".join(parts[: i + 1]) in lower_deny:
+                violations.append(m.group(1))
+    for m in re.finditer(r"""(?:"|'|"{3}|'{3})(.*?)(?:"|'|"{3}|'{3})""", code, re.DOTALL):
+        for token in re.split(r"[\s;|&]+", m.group(1).lower()):
+            token_clean = token.strip().split("/")[-1]
+            if token_clean in lower_deny:
+                violations.append(token_clean)
+    for m in re.finditer(r"\b([\w.]+)\b", code):
+        word = m.group(1).lower()
+        if word in lower_deny and word not in [v.lower() for v in violations]:
+            violations.append(m.group(1))
+    return list(dict.fromkeys(violations))
+
+
+def _script(lines):
+    body = ["import json", "import statistics", "from pathlib import Path", "values = list(range(200))"]
+    for i in range(lines - len(body) - 1):
+        body.append(f"col_{i} = [round(v * {i % 7 + 2} / 3, 3) for v in values if v % {i % 5 + 1} == 0]  # step {i}")
+    body.append("print(json.dumps({'values': statistics.mean(col_0), 'files': []}))")
+    return "\n".join(body) + "\n"
+
+
+def _timed(func, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_screening_")
+    script = _script(LINES)
+    bad = "import json\ndef f(:\n    pass\n"
+
+    legacy_ms = _timed(lambda: _legacy_scan(script, DENYLIST), RUNS)
+    ast_ms = _timed(lambda: screen_code(script, DENYLIST), RUNS)
+    run_python("s.py", cwd=workdir, source="pass\n", timeout=60)  # warm the pool
+    legacy_run_ms = _timed(
+        lambda: (_legacy_scan(script, DENYLIST), run_python("s.py", cwd=workdir, source=script, timeout=30)), RUNS // 4
+    )
+    ast_run_ms = _timed(
+        lambda: (screen_code(script, DENYLIST), run_python("s.py", cwd=workdir, source=script, timeout=30)), RUNS // 4
+    )
+    legacy_bad_ms = _timed(
+        lambda: (_legacy_scan(bad, DENYLIST), run_python("s.py", cwd=workdir, source=bad, timeout=30)), RUNS // 4
+    )
+    ast_bad_ms = _timed(lambda: screen_code(bad, DENYLIST, filename="s.py"), RUNS // 4)
+    sandbox_err = run_python("s.py", cwd=workdir, source=bad, timeout=30).stderr.rstrip()
+    screen_err = screen_code(bad, DENYLIST, filename=os.path.join(workdir, "s.py")).syntax_error
+
+    print(f"Code screening benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Runs: {RUNS}, script: {LINES} lines / {len(script)} chars, denylist: {sorted(DENYLIST)}")
+    print(f"{'check':34s} {'p50 ms':>8s}")
+    print(f"{'regex scans, clean script':34s} {legacy_ms:8.3f}")
+    print(f"{'AST single pass, clean script':34s} {ast_ms:8.3f}")
+    print(f"{'regex scans + sandbox run':34s} {legacy_run_ms:8.3f}")
+    print(f"{'AST single pass + sandbox run':34s} {ast_run_ms:8.3f}")
+    print(f"{'regex scans + sandbox, syntax error':34s} {legacy_bad_ms:8.3f}")
+    print(f"{'AST single pass, syntax error':34s} {ast_bad_ms:8.3f}")
+    print(f"Same SyntaxError message as the sandbox: {sandbox_err == screen_err}")
+    print()
+    print(f"{'case':20s} {'expected':>9s} {'regex':>7s} {'ast':>7s}  ast reason")
+    mismatches = 0
+    for name, code, refuse in CASES:
+        legacy = bool(_legacy_scan(code, DENYLIST))
+        verdict = screen_code(code, DENYLIST)
+        mismatches += (not verdict.allowed) != refuse
+        print(f"{name:20s} {'refuse' if refuse else 'allow':>9s} {'refuse' if legacy else 'allow':>7s} "
+              f"{'allow' if verdict.allowed else 'refuse':>7s}  {verdict.reason.splitlines()[-1] if verdict.reason else ''}")
+    print(f"AST mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,10 +30,23 @@ def _ndjson_generator(gen):
 def _process_query_stream(body: dict, file_obj=None):
     """
     Main generator for processing queries with streaming response.
-    Yields NDJSON events for status, trace, message, error, done.
+    Yields NDJSON events for status, trace, output, message, error, done.
+
+    Scripts whose output answered a question are cached per question, upload
+    and model (see functions.code_cache_key) and served on the next identical
+    request without generating code; "reexecute_cached" re-runs the cached
+    script to refresh its output. Scripts that failed are remembered so
+    retries do not execute them again.
+
+    Generated code is screened (functions.screen_generated_code) before it
+    reaches the sandbox; refused code is not run and the reason becomes the
+    next attempt's previous output.
     """
     question = body.get('question', '').strip()
     run_as_admin = body.get('run_as_admin', False)
+    reexecute_cached = body.get('reexecute_cached')
+    if reexecute_cached is None:
+        reexecute_cached = functions.CODE_CACHE_REEXECUTE
     model_cfg = body.get('model_config', {})
     conversation_history = body.get('conversation_history', [])
 
@@ -44,32 +57,41 @@ def _process_query_stream(body: dict, file_obj=None):
         return
 
     tracer = AgentTracer()
-    script_dir = functions.make_script_dir()
 
     # Check for file content
     file_content = None
+    file_bytes = None
     file_type = None
+    profile_key = None
     has_csv = False
     has_document = False
 
     if file_obj:
         try:
             file_type = file_obj.name.split('.')[-1].lower()
-            file_content = file_obj.read().decode('utf-8')
+            file_bytes = file_obj.read()
 
-            if file_type in ['csv']:
+            if file_type in functions.TABULAR_TYPES:
                 has_csv = True
+                # Profiled once in the background while the route is decided
+                profile_key = functions.start_dataset_profile(file_obj.name, file_bytes)
             elif file_type in ['pdf', 'txt', 'md', 'doc', 'docx']:
                 has_document = True
 
+            if file_type not in ['xlsx', 'xls']:
+                file_content = file_bytes.decode('utf-8')
+
             yield {
                 "type": "status",
-                "message": f"File uploaded: {file_obj.name} ({len(file_content)} chars)"
+                "message": f"File uploaded: {file_obj.name} ({len(file_bytes)} bytes)"
             }
         except Exception as e:
             yield {"type": "error", "message": f"File processing error: {e}"}
             file_content = None
 
+    # Working directory shared by every iteration; the upload is copied in once
+    session = functions.make_session({file_obj.name: file_bytes} if file_bytes is not None else None)
+
     try:
         # Step 1: Decide route
         yield {"type": "status", "message": "Deciding routing strategy..."}
@@ -127,8 +149,109 @@ def _process_query_stream(body: dict, file_obj=None):
             iteration = 1
             output = None
             final_output = None
+            cache_key = functions.code_cache_key(
+                question, [file_bytes] if file_bytes is not None else None, model_cfg
+            )
 
-            while iteration <= max_iterations:
+            cached = functions.get_cached_code(cache_key)
+            if cached and not functions.screen_generated_code(cached["code"], run_as_admin=run_as_admin).allowed:
+                # Cached before the denylist changed, or stored by an admin run
+                cached = None
+            if cached:
+                tracer.trace(
+                    "codeexec", "code_cache_hit",
+                    route=cached["route"],
+                    code=cached["code"],
+                    age_s=round(time.time() - cached["created"]),
+                    hits=cached["hits"],
+                    reexecuted=bool(reexecute_cached),
+                    latency_ms=0
+                )
+                yield {
+                    "type": "trace",
+                    "content": tracer.get_traces()[-1]
+                }
+
+                if not reexecute_cached:
+                    yield {"type": "status", "message": "Reusing cached script output"}
+                    yield {
+                        "type": "output",
+                        "stream": "stdout",
+                        "iteration": 0,
+                        "cached": True,
+                        "content": cached["output"]
+                    }
+                    final_output = cached["output"]
+                else:
+                    yield {"type": "status", "message": "Re-executing cached script..."}
+                    t0 = time.time()
+                    stdout, stderr, returncode = "", "", -1
+                    try:
+                        for kind, value in functions.stream_execute_code(
+                            cached["code"], session.path, "cached_script.py", run_as_admin
+                        ):
+                            if kind == "exit":
+                                stdout, stderr, returncode = value
+                            else:
+                                yield {
+                                    "type": "output",
+                                    "stream": kind,
+                                    "iteration": 0,
+                                    "cached": True,
+                                    "content": value
+                                }
+                    except Exception as e:
+                        stderr = str(e)
+
+                    tracer.trace(
+                        "codeexec", "code_executed",
+                        iteration=0,
+                        cached=True,
+                        stdout=stdout,
+                        stderr=stderr,
+                        returncode=returncode,
+                        run_as_admin=run_as_admin,
+                        latency_ms=round((time.time() - t0) * 1000)
+                    )
+                    yield {
+                        "type": "trace",
+                        "content": tracer.get_traces()[-1]
+                    }
+
+                    if returncode == 0 and stdout.strip():
+                        functions.record_code_success(cache_key, cached["code"], cached["route"], stdout)
+                        final_output = stdout
+                    else:
+                        # Stale: forget it and generate fresh code below
+                        functions.record_code_failure(cache_key, cached["code"], stderr)
+                        yield {
+                            "type": "warning",
+                            "message": "Cached script failed on re-execution; generating new code"
+                        }
+
+            # Only generation uses the profile; a cache hit serving stored output never waits for it
+            profile_text = None
+            if profile_key and final_output is None:
+                t0 = time.time()
+                profile = functions.get_dataset_profile(profile_key)
+                if profile:
+                    profile_text = functions.format_dataset_profile(
+                        profile, path=session.files[0] if session.files else None
+                    )
+                    tracer.trace(
+                        "codeexec", "dataset_profile",
+                        rows=profile.get("rows"),
+                        columns=len(profile.get("columns", [])),
+                        profile_ms=profile.get("profile_ms"),
+                        error=profile.get("error"),
+                        latency_ms=round((time.time() - t0) * 1000)
+                    )
+                    yield {
+                        "type": "trace",
+                        "content": tracer.get_traces()[-1]
+                    }
+
+            while final_output is None and iteration <= max_iterations:
                 yield {
                     "type": "status",
                     "message": f"Iteration {iteration}/{max_iterations}: Generating code for {current_route}..."
@@ -136,13 +259,14 @@ def _process_query_stream(body: dict, file_obj=None):
 
                 # Generate code
                 t0 = time.time()
-                code, script_path = functions.generate_code(
+                code, script_name = functions.generate_code(
                     question,
                     current_route,
                     context=file_content or "",
-                    previous_output=output or "",
+                    previous_output=output or (functions.code_failure_hint(cache_key) if iteration == 1 else ""),
                     iteration=iteration,
-                    script_dir=script_dir,
+                    data_files=session.files,
+                    dataset_profile=profile_text,
                     client_config=model_cfg,
                     tracer=tracer
                 )
@@ -153,7 +277,7 @@ def _process_query_stream(body: dict, file_obj=None):
                     route=current_route,
                     iteration=iteration,
                     code=code,
-                    script_path=str(script_path),
+                    script_path=str(session.path / script_name),
                     latency_ms=latency
                 )
 
@@ -162,84 +286,151 @@ def _process_query_stream(body: dict, file_obj=None):
                     "content": tracer.get_traces()[-1]
                 }
 
-                # Execute code
-                yield {
-                    "type": "status",
-                    "message": f"Iteration {iteration}: Executing code..."
-                }
-
-                t0 = time.time()
-                try:
-                    stdout, stderr, returncode = functions.execute_code(script_path, run_as_admin)
-                    latency = round((time.time() - t0) * 1000)
-
+                returncode = None
+                rejection = functions.known_code_failure(cache_key, code)
+                if rejection is not None:
                     tracer.trace(
-                        "codeexec", "code_executed",
+                        "codeexec", "code_cache_known_failure",
                         iteration=iteration,
-                        stdout=stdout,
-                        stderr=stderr,
-                        returncode=returncode,
-                        run_as_admin=run_as_admin,
-                        latency_ms=latency
+                        error=rejection,
+                        latency_ms=0
                     )
-
                     yield {
                         "type": "trace",
                         "content": tracer.get_traces()[-1]
                     }
-
-                    if stderr:
-                        yield {
-                            "type": "warning",
-                            "message": f"Iteration {iteration}: stderr: {stderr[:200]}"
-                        }
-
-                    output = stdout
-
-                except Exception as e:
+                    yield {
+                        "type": "warning",
+                        "message": f"Iteration {iteration}: Skipping script that already failed: {rejection[-200:]}"
+                    }
+                else:
+                    # Screen before execution; refused code never reaches the sandbox
+                    t0 = time.time()
+                    verdict = functions.screen_generated_code(code, script_name, run_as_admin)
                     tracer.trace(
-                        "codeexec", "code_execution_error",
+                        "codeexec", "code_screened",
                         iteration=iteration,
-                        error=str(e),
+                        allowed=verdict.allowed,
+                        violations=verdict.violations,
+                        reason=verdict.reason,
+                        imports=verdict.imports,
+                        builtins=verdict.builtins,
+                        file_access=verdict.file_access,
+                        network_access=verdict.network_access,
                         latency_ms=round((time.time() - t0) * 1000)
                     )
-
                     yield {
                         "type": "trace",
                         "content": tracer.get_traces()[-1]
                     }
+                    if not verdict.allowed:
+                        # Not recorded in the code cache: the verdict depends on run_as_admin
+                        # and the active denylist, which the cache key does not cover
+                        rejection = verdict.reason
+                        yield {
+                            "type": "warning",
+                            "message": f"Iteration {iteration}: Code rejected before execution: {rejection[-200:]}"
+                        }
 
+                if rejection is not None:
+                    # The reason becomes the next attempt's previous output
+                    output = rejection
+                else:
+                    # Execute code
                     yield {
-                        "type": "warning",
-                        "message": f"Iteration {iteration}: Execution failed: {e}"
+                        "type": "status",
+                        "message": f"Iteration {iteration}: Executing code..."
                     }
 
-                    output = ""
+                    t0 = time.time()
+                    try:
+                        for kind, value in functions.stream_execute_code(code, session.path, script_name, run_as_admin):
+                            if kind == "exit":
+                                stdout, stderr, returncode = value
+                            else:
+                                yield {
+                                    "type": "output",
+                                    "stream": kind,
+                                    "iteration": iteration,
+                                    "content": value
+                                }
+                        latency = round((time.time() - t0) * 1000)
+
+                        tracer.trace(
+                            "codeexec", "code_executed",
+                            iteration=iteration,
+                            stdout=stdout,
+                            stderr=stderr,
+                            returncode=returncode,
+                            run_as_admin=run_as_admin,
+                            latency_ms=latency
+                        )
+
+                        yield {
+                            "type": "trace",
+                            "content": tracer.get_traces()[-1]
+                        }
+
+                        if stderr:
+                            yield {
+                                "type": "warning",
+                                "message": f"Iteration {iteration}: stderr: {stderr[:200]}"
+                            }
+
+                        output = stdout
+                        if returncode != 0:
+                            functions.record_code_failure(cache_key, code, stderr)
+
+                    except Exception as e:
+                        tracer.trace(
+                            "codeexec", "code_execution_error",
+                            iteration=iteration,
+                            error=str(e),
+                            latency_ms=round((time.time() - t0) * 1000)
+                        )
+
+                        yield {
+                            "type": "trace",
+                            "content": tracer.get_traces()[-1]
+                        }
+
+                        yield {
+                            "type": "warning",
+                            "message": f"Iteration {iteration}: Execution failed: {e}"
+                        }
+
+                        functions.record_code_failure(cache_key, code, str(e))
+                        output = ""
 
                 # Check sufficiency
-                yield {
-                    "type": "status",
-                    "message": f"Iteration {iteration}: Evaluating output sufficiency..."
-                }
+                if rejection is not None:
+                    is_sufficient, eval_reason = False, "Script was not executed"
+                else:
+                    yield {
+                        "type": "status",
+                        "message": f"Iteration {iteration}: Evaluating output sufficiency..."
+                    }
 
-                t0 = time.time()
-                is_sufficient, eval_reason = functions.is_output_sufficient(question, output, model_cfg, tracer=tracer)
-                latency = round((time.time() - t0) * 1000)
+                    t0 = time.time()
+                    is_sufficient, eval_reason = functions.is_output_sufficient(question, output, model_cfg, tracer=tracer)
+                    latency = round((time.time() - t0) * 1000)
 
-                tracer.trace(
-                    "codeexec", "sufficiency_check",
-                    iteration=iteration,
-                    sufficient=is_sufficient,
-                    evaluation_reason=eval_reason,
-                    latency_ms=latency
-                )
+                    tracer.trace(
+                        "codeexec", "sufficiency_check",
+                        iteration=iteration,
+                        sufficient=is_sufficient,
+                        evaluation_reason=eval_reason,
+                        latency_ms=latency
+                    )
 
-                yield {
-                    "type": "trace",
-                    "content": tracer.get_traces()[-1]
-                }
+                    yield {
+                        "type": "trace",
+                        "content": tracer.get_traces()[-1]
+                    }
 
                 if is_sufficient:
+                    if returncode == 0:
+                        functions.record_code_success(cache_key, code, current_route, output)
                     yield {
                         "type": "status",
                         "message": f"Iteration {iteration}: Output is sufficient!"
@@ -306,6 +497,8 @@ def _process_query_stream(body: dict, file_obj=None):
 
     except Exception as e:
         yield {"type": "error", "message": f"Query processing error: {e}"}
+    finally:
+        session.close(keep_outputs=True)
 
 
 @api_view(["POST"])
@@ -323,6 +516,7 @@ def query(request):
                 'model_config': json.loads(request.POST.get('model_config', '{}')),
                 'conversation_history': json.loads(request.POST.get('conversation_history', '[]')),
                 'run_as_admin': request.POST.get('run_as_admin', 'false').lower() == 'true',
+                'reexecute_cached': {'true': True, 'false': False}.get(request.POST.get('reexecute_cached', '').lower()),
             }
             file_obj = request.FILES.get('file')
         else:
@@ -2,19 +2,20 @@
 from __future__ import annotations
 
 import os
+import re
 import time
 import shutil
 import sqlite3
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Mapping, Optional, Sequence, Tuple, Generator
+from typing import Any, Callable, Dict, List, Literal, Mapping, Optional, Sequence, Tuple, Generator
 
-from qbtrain.exceptions import PermissionError
+from qbtrain.exceptions import ExecutionCancelledError, PermissionError
 
 import inspect
 
 
 from qbtrain.agents import SQLAgent
-from qbtrain.agents.sql_agent import SQLAgentPrompts
+from qbtrain.agents.sql_agent import SQLAgentPrompts, SQLPlanCache
 from qbtrain.agents.response_generator_agent import (
     ResponseGeneratorAgent,
     ResponseGeneratorPrompts,
@@ -22,6 +23,7 @@ from qbtrain.agents.response_generator_agent import (
 from qbtrain.utils.jsonutils import extract_json_object
 from qbtrain.utils.streamingutils import stream_message_events
 from qbtrain.utils.sqlutils import get_schema_context
+from qbtrain.utils.schemautils import SchemaRetriever
 from qbtrain.tracers import AgentTracer
 from qbtrain.ai.llm import LLMClientRegistry
 
@@ -162,6 +164,9 @@ def ensure_sandbox_db() -> None:
     sandbox.parent.mkdir(parents=True, exist_ok=True)
     if not sandbox.exists():
         shutil.copy2(orig, sandbox)
+        _SANDBOX_INDEXES_READY.discard(sandbox.as_posix())
+    if sandbox.as_posix() not in _SANDBOX_INDEXES_READY:
+        _ensure_sandbox_indexes(sandbox)
 
 
 def reset_sandbox_db() -> Dict[str, Any]:
@@ -175,9 +180,297 @@ def reset_sandbox_db() -> Dict[str, Any]:
         sandbox.unlink()
 
     shutil.copy2(orig, sandbox)
+    _SANDBOX_INDEXES_READY.discard(sandbox.as_posix())
+    _ensure_sandbox_indexes(sandbox)
     return {"ok": True, "sandbox_db": str(sandbox), "original_db": str(orig)}
 
 
+# =========================
+# Search, covering indexes + report aggregates (sandbox only)
+# =========================
+# Internal objects are prefixed with "__" so schema introspection for the SQL
+# agent skips them. FTS tables use the trigram tokenizer so `q` keeps the
+# case-insensitive substring semantics of the old LIKE '%q%' search.
+_SANDBOX_INDEXES_READY: set = set()
+
+_VEHICLE_FTS_ROW_SQL = """
+    SELECT v.vehicle_id, v.vin, v.color, mk.name, m.name
+    FROM vehicle v
+    JOIN model m ON m.model_id = v.model_id
+    JOIN make mk ON mk.make_id = m.make_id
+"""
+
+_SEARCH_INDEX_DDL = [
+    # Covering/ordering indexes for list + report filters
+    "CREATE INDEX IF NOT EXISTS idx_vehicle_created ON vehicle(created_at, vehicle_id)",
+    "CREATE INDEX IF NOT EXISTS idx_vehicle_status_created ON vehicle(status, created_at, vehicle_id)",
+    "CREATE INDEX IF NOT EXISTS idx_vehicle_dealer_status_model ON vehicle(dealership_id, status, model_id)",
+    "CREATE INDEX IF NOT EXISTS idx_customer_created ON customer(created_at, customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_date ON sales_order(order_date, order_id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_status_date_cover "
+    "ON sales_order(status, order_date, dealership_id, employee_id, total_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_order_dealer_date ON sales_order(dealership_id, order_date, order_id)",
+]
+
+# Per FTS table: the CREATE VIRTUAL TABLE first, then its sync triggers, then the back-fill.
+_FTS_DDL: Dict[str, List[str]] = {}
+
+# Vehicle search: vin, color, make name, model name (rowid = vehicle_id)
+_FTS_DDL["__fts_vehicle"] = [
+    "CREATE VIRTUAL TABLE __fts_vehicle USING fts5(vin, color, make_name, model_name, tokenize='trigram')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __fts_vehicle_ai AFTER INSERT ON vehicle BEGIN
+      INSERT INTO __fts_vehicle(rowid, vin, color, make_name, model_name)
+      {_VEHICLE_FTS_ROW_SQL} WHERE v.vehicle_id = new.vehicle_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __fts_vehicle_au AFTER UPDATE OF vehicle_id, vin, color, model_id ON vehicle BEGIN
+      DELETE FROM __fts_vehicle WHERE rowid = old.vehicle_id;
+      INSERT INTO __fts_vehicle(rowid, vin, color, make_name, model_name)
+      {_VEHICLE_FTS_ROW_SQL} WHERE v.vehicle_id = new.vehicle_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_vehicle_ad AFTER DELETE ON vehicle BEGIN
+      DELETE FROM __fts_vehicle WHERE rowid = old.vehicle_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_vehicle_model_au AFTER UPDATE OF name, make_id ON model BEGIN
+      UPDATE __fts_vehicle
+      SET model_name = new.name,
+          make_name = (SELECT name FROM make WHERE make_id = new.make_id)
+      WHERE rowid IN (SELECT vehicle_id FROM vehicle WHERE model_id = new.model_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_vehicle_make_au AFTER UPDATE OF name ON make BEGIN
+      UPDATE __fts_vehicle
+      SET make_name = new.name
+      WHERE rowid IN (
+        SELECT v.vehicle_id FROM vehicle v JOIN model m ON m.model_id = v.model_id WHERE m.make_id = new.make_id
+      );
+    END
+    """,
+    f"INSERT INTO __fts_vehicle(rowid, vin, color, make_name, model_name) {_VEHICLE_FTS_ROW_SQL}",
+]
+
+# Customer search: first/last name, email, phone (rowid = customer_id)
+_FTS_DDL["__fts_customer"] = [
+    "CREATE VIRTUAL TABLE __fts_customer USING fts5(first_name, last_name, email, phone, tokenize='trigram')",
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_customer_ai AFTER INSERT ON customer BEGIN
+      INSERT INTO __fts_customer(rowid, first_name, last_name, email, phone)
+      VALUES (new.customer_id, new.first_name, new.last_name, new.email, new.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_customer_au AFTER UPDATE ON customer BEGIN
+      DELETE FROM __fts_customer WHERE rowid = old.customer_id;
+      INSERT INTO __fts_customer(rowid, first_name, last_name, email, phone)
+      VALUES (new.customer_id, new.first_name, new.last_name, new.email, new.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __fts_customer_ad AFTER DELETE ON customer BEGIN
+      DELETE FROM __fts_customer WHERE rowid = old.customer_id;
+    END
+    """,
+    "INSERT INTO __fts_customer(rowid, first_name, last_name, email, phone) "
+    "SELECT customer_id, first_name, last_name, email, phone FROM customer",
+]
+
+# Report aggregates, maintained by triggers so inventory_report/sales_report do
+# not rescan vehicle/sales_order. Order items only reach the reports through
+# sales_order.total_amount, which _recompute_order_total updates in place.
+_SALES_STATUSES_SQL = "('FULFILLED','DELIVERED')"
+
+_AGGREGATE_DDL: Dict[str, List[str]] = {}
+
+_AGGREGATE_DDL["__agg_vehicle_status"] = [
+    """
+    CREATE TABLE __agg_vehicle_status (
+      dealership_id INTEGER NOT NULL,
+      status        TEXT NOT NULL,
+      count         INTEGER NOT NULL,
+      PRIMARY KEY (dealership_id, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_status_ai AFTER INSERT ON vehicle BEGIN
+      INSERT INTO __agg_vehicle_status(dealership_id, status, count) VALUES (new.dealership_id, new.status, 1)
+      ON CONFLICT(dealership_id, status) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_status_ad AFTER DELETE ON vehicle BEGIN
+      UPDATE __agg_vehicle_status SET count = count - 1
+      WHERE dealership_id = old.dealership_id AND status = old.status;
+      DELETE FROM __agg_vehicle_status
+      WHERE dealership_id = old.dealership_id AND status = old.status AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_status_au AFTER UPDATE OF dealership_id, status ON vehicle
+    WHEN old.dealership_id IS NOT new.dealership_id OR old.status IS NOT new.status BEGIN
+      UPDATE __agg_vehicle_status SET count = count - 1
+      WHERE dealership_id = old.dealership_id AND status = old.status;
+      DELETE FROM __agg_vehicle_status
+      WHERE dealership_id = old.dealership_id AND status = old.status AND count <= 0;
+      INSERT INTO __agg_vehicle_status(dealership_id, status, count) VALUES (new.dealership_id, new.status, 1)
+      ON CONFLICT(dealership_id, status) DO UPDATE SET count = count + 1;
+    END
+    """,
+    "INSERT INTO __agg_vehicle_status(dealership_id, status, count) "
+    "SELECT dealership_id, status, COUNT(*) FROM vehicle GROUP BY dealership_id, status",
+]
+
+_AGGREGATE_DDL["__agg_vehicle_model"] = [
+    """
+    CREATE TABLE __agg_vehicle_model (
+      dealership_id INTEGER NOT NULL,
+      model_id      INTEGER NOT NULL,
+      count         INTEGER NOT NULL,
+      PRIMARY KEY (dealership_id, model_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_model_ai AFTER INSERT ON vehicle BEGIN
+      INSERT INTO __agg_vehicle_model(dealership_id, model_id, count) VALUES (new.dealership_id, new.model_id, 1)
+      ON CONFLICT(dealership_id, model_id) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_model_ad AFTER DELETE ON vehicle BEGIN
+      UPDATE __agg_vehicle_model SET count = count - 1
+      WHERE dealership_id = old.dealership_id AND model_id = old.model_id;
+      DELETE FROM __agg_vehicle_model
+      WHERE dealership_id = old.dealership_id AND model_id = old.model_id AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS __agg_vehicle_model_au AFTER UPDATE OF dealership_id, model_id ON vehicle
+    WHEN old.dealership_id IS NOT new.dealership_id OR old.model_id IS NOT new.model_id BEGIN
+      UPDATE __agg_vehicle_model SET count = count - 1
+      WHERE dealership_id = old.dealership_id AND model_id = old.model_id;
+      DELETE FROM __agg_vehicle_model
+      WHERE dealership_id = old.dealership_id AND model_id = old.model_id AND count <= 0;
+      INSERT INTO __agg_vehicle_model(dealership_id, model_id, count) VALUES (new.dealership_id, new.model_id, 1)
+      ON CONFLICT(dealership_id, model_id) DO UPDATE SET count = count + 1;
+    END
+    """,
+    "INSERT INTO __agg_vehicle_model(dealership_id, model_id, count) "
+    "SELECT dealership_id, model_id, COUNT(*) FROM vehicle GROUP BY dealership_id, model_id",
+]
+
+# One row per (day, dealership, employee) of FULFILLED/DELIVERED orders; employee_id 0 = unassigned.
+_AGGREGATE_DDL["__agg_sales"] = [
+    """
+    CREATE TABLE __agg_sales (
+      day           TEXT NOT NULL,
+      dealership_id INTEGER NOT NULL,
+      employee_id   INTEGER NOT NULL,
+      orders_count  INTEGER NOT NULL,
+      gross_sales   INTEGER NOT NULL,
+      PRIMARY KEY (day, dealership_id, employee_id)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __agg_sales_ai AFTER INSERT ON sales_order
+    WHEN new.status IN {_SALES_STATUSES_SQL} BEGIN
+      INSERT INTO __agg_sales(day, dealership_id, employee_id, orders_count, gross_sales)
+      VALUES (substr(new.order_date, 1, 10), new.dealership_id, COALESCE(new.employee_id, 0), 1, new.total_amount)
+      ON CONFLICT(day, dealership_id, employee_id) DO UPDATE
+      SET orders_count = orders_count + 1, gross_sales = gross_sales + excluded.gross_sales;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __agg_sales_ad AFTER DELETE ON sales_order
+    WHEN old.status IN {_SALES_STATUSES_SQL} BEGIN
+      UPDATE __agg_sales SET orders_count = orders_count - 1, gross_sales = gross_sales - old.total_amount
+      WHERE day = substr(old.order_date, 1, 10) AND dealership_id = old.dealership_id
+        AND employee_id = COALESCE(old.employee_id, 0);
+      DELETE FROM __agg_sales
+      WHERE day = substr(old.order_date, 1, 10) AND dealership_id = old.dealership_id
+        AND employee_id = COALESCE(old.employee_id, 0) AND orders_count <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __agg_sales_au_old
+    AFTER UPDATE OF status, order_date, dealership_id, employee_id, total_amount ON sales_order
+    WHEN old.status IN {_SALES_STATUSES_SQL} BEGIN
+      UPDATE __agg_sales SET orders_count = orders_count - 1, gross_sales = gross_sales - old.total_amount
+      WHERE day = substr(old.order_date, 1, 10) AND dealership_id = old.dealership_id
+        AND employee_id = COALESCE(old.employee_id, 0);
+      DELETE FROM __agg_sales
+      WHERE day = substr(old.order_date, 1, 10) AND dealership_id = old.dealership_id
+        AND employee_id = COALESCE(old.employee_id, 0) AND orders_count <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS __agg_sales_au_new
+    AFTER UPDATE OF status, order_date, dealership_id, employee_id, total_amount ON sales_order
+    WHEN new.status IN {_SALES_STATUSES_SQL} BEGIN
+      INSERT INTO __agg_sales(day, dealership_id, employee_id, orders_count, gross_sales)
+      VALUES (substr(new.order_date, 1, 10), new.dealership_id, COALESCE(new.employee_id, 0), 1, new.total_amount)
+      ON CONFLICT(day, dealership_id, employee_id) DO UPDATE
+      SET orders_count = orders_count + 1, gross_sales = gross_sales + excluded.gross_sales;
+    END
+    """,
+    f"""
+    INSERT INTO __agg_sales(day, dealership_id, employee_id, orders_count, gross_sales)
+    SELECT substr(order_date, 1, 10), dealership_id, COALESCE(employee_id, 0), COUNT(*), COALESCE(SUM(total_amount), 0)
+    FROM sales_order
+    WHERE status IN {_SALES_STATUSES_SQL}
+    GROUP BY 1, 2, 3
+    """,
+]
+
+
+def _ensure_sandbox_indexes(db_path: Path) -> None:
+    """
+    Idempotently create the FTS5 search tables and report aggregates (kept in
+    sync by triggers) and covering indexes on a sandbox DB, back-filling each
+    table on creation and refreshing planner statistics.
+    SQLite builds without FTS5/trigram keep working through the LIKE fallback;
+    reports read the live tables whenever an aggregate table is missing.
+    """
+    conn = sqlite3.connect(db_path.as_posix(), isolation_level=None)
+    try:
+        for ddl in _SEARCH_INDEX_DDL:
+            conn.execute(ddl)
+        for table, statements in {**_FTS_DDL, **_AGGREGATE_DDL}.items():
+            if _has_table(conn, table):
+                continue
+            conn.execute("BEGIN")
+            try:
+                for ddl in statements:
+                    conn.execute(ddl)
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                # e.g. fts5/trigram unavailable: roll back the table and its triggers,
+                # callers fall back to LIKE search / live report queries.
+                conn.execute("ROLLBACK")
+        # Refresh planner statistics so the new indexes drive ORDER BY/keyset scans
+        # instead of a small joined table (e.g. dealership) plus a temp B-tree sort.
+        conn.execute("ANALYZE")
+        _SANDBOX_INDEXES_READY.add(db_path.as_posix())
+    finally:
+        conn.close()
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ? LIMIT 1", (name,)).fetchone() is not None
+
+
+def _fts_query(q: str) -> Optional[str]:
+    """Quote *q* as a single FTS5 phrase; None when too short for the trigram index (< 3 chars)."""
+    if len(q) < 3:
+        return None
+    return '"' + q.replace('"', '""') + '"'
+
+
 def _connect_ro() -> sqlite3.Connection:
     ensure_sandbox_db()
     sandbox = _sandbox_db_path()
@@ -277,6 +570,22 @@ def _instantiate_llm_client(client_details: Dict[str, Any]):
 
     return ClientCls(**init_kwargs)
 
+_SCHEMA_RETRIEVERS: Dict[str, SchemaRetriever] = {}
+
+# Shared across requests; keys include the query, exc_method, permissions, model,
+# prompts and schema version, so trainees only share plans for identical setups.
+_PLAN_CACHE = SQLPlanCache(max_entries=512, ttl_seconds=3600)
+
+
+def _get_schema_retriever(db_path: str) -> SchemaRetriever:
+    """Return the cached schema retriever for *db_path*, rebuilding it after any schema change."""
+    retriever = _SCHEMA_RETRIEVERS.get(db_path)
+    if retriever is None or retriever.is_stale():
+        retriever = SchemaRetriever(db_path)
+        _SCHEMA_RETRIEVERS[db_path] = retriever
+    return retriever
+
+
 def _build_sql_agent(
     *,
     db_path: str,
@@ -287,11 +596,27 @@ def _build_sql_agent(
     stored_procedures: List[str],
     exc_method: str,
     stream: bool,
+    before_execute: Optional[Callable[[], None]] = None,
 ) -> SQLAgent:
     sql_gen_instructions = chat_details.get("sql_gen_instructions")
     max_steps = int(chat_details.get("max_steps", 5))
     tracer = AgentTracer()
-    schema_context = get_schema_context(db_path)
+
+    # Optional relevance pruning: only the tables the request needs (plus join closure).
+    prompt = chat_details.get("prompt")
+    if chat_details.get("prune_schema", False) and isinstance(prompt, str) and prompt.strip():
+        schema_context, selection = _get_schema_retriever(db_path).schema_context(prompt)
+        tracer.trace(
+            "SchemaRetriever",
+            __type__="agent",
+            operation="Schema Selection",
+            tables=selection.tables or "ALL",
+            matched=selection.matched,
+            confident=selection.confident,
+            schema_chars=len(schema_context),
+        )
+    else:
+        schema_context = get_schema_context(db_path)
     stored_procedures = stored_procedures if len(stored_procedures) > 0 else AVAILABLE_STORED_PROCEDURES.keys()
 
     # Build planner system prompt (composable blocks based on exc_method)
@@ -332,8 +657,83 @@ def _build_sql_agent(
         max_steps=max_steps,
         tracer=tracer,
         stream=stream,
+        plan_cache=_PLAN_CACHE if chat_details.get("use_plan_cache", False) else None,
+        before_execute=before_execute,
     )
 
+
+def _classifier_trace_entry(
+    classifier_model: str,
+    prompt: str,
+    is_injection: bool,
+    confidence: float,
+    cache: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    entry = {
+        "id": 0,
+        "agent_name": "InjectionClassifier",
+        "__type__": "classification",
+        "model": classifier_model,
+        "is_injection": is_injection,
+        "confidence": round(confidence, 4),
+        "input_preview": prompt[:200],
+    }
+    if cache:
+        entry["cache"] = cache
+    return entry
+
+
+def _speculation_gate(spec) -> Callable[[], None]:
+    """SQLAgent.before_execute hook: block on the classifier and abort if it flags the prompt."""
+    def _gate() -> None:
+        try:
+            flagged = spec.flagged()
+        except Exception as e:
+            # Surfaced again (unwrapped) by spec.result() once the agent stops.
+            raise ExecutionCancelledError(f"Injection classifier failed: {e}") from e
+        if flagged:
+            raise ExecutionCancelledError("Input flagged by the injection classifier.")
+    return _gate
+
+
+def _speculative_agent_events(
+    events: Generator[Dict[str, Any], None, None],
+    spec,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Relay agent events only once the speculative classifier has cleared the
+    prompt. Events produced while it is still running are held back; if the
+    prompt is flagged they are discarded and the agent generator is closed,
+    abandoning any remaining planner work.
+    """
+    pending: List[Dict[str, Any]] = []
+    try:
+        for ev in events:
+            if not spec.done():
+                pending.append(ev)
+                continue
+            if spec.flagged():
+                return
+            yield from pending
+            pending.clear()
+            yield ev
+        if not spec.flagged():
+            yield from pending
+    except ExecutionCancelledError:
+        return
+    finally:
+        events.close()
+
+
+def _speculation_trace_entry(spec, classifier_model: str) -> Dict[str, Any]:
+    return {
+        "agent_name": "InjectionClassifier",
+        "__type__": "speculation",
+        "operation": "Speculative classification",
+        "model": classifier_model,
+        **spec.timing(),
+    }
+
 # =========================
 # Dealerships (READ ONLY; no endpoints)
 # =========================
@@ -740,6 +1140,7 @@ def list_vehicles(
     price_max: Optional[int] = None,
     mileage_max: Optional[int] = None,
     q: Optional[str] = None,
+    after_id: Optional[int] = None,
     limit: int = 100,
 ) -> List[Dict[str, Any]]:
     """
@@ -752,7 +1153,8 @@ def list_vehicles(
         status: {'AVAILABLE','RESERVED','SOLD','IN_SERVICE'}
         dealership_id, make_id, model_id
         year_min/year_max, price_min/price_max, mileage_max
-        q: LIKE search over vin, color, make name, model name
+        q: substring search over vin, color, make name, model name
+        after_id: keyset pagination; return vehicles listed after this vehicle_id
 
     Returns:
         List of vehicle rows joined with dealership, model, and make metadata.
@@ -788,9 +1190,18 @@ def list_vehicles(
         if mileage_max is not None:
             add("v.mileage <= ?", int(mileage_max))
         if q is not None and q != "":
-            like = f"%{q}%"
-            where.append("(v.vin LIKE ? OR v.color LIKE ? OR mk.name LIKE ? OR m.name LIKE ?)")
-            params.extend([like, like, like, like])
+            match = _fts_query(q)
+            if match is not None and _has_table(conn, "__fts_vehicle"):
+                add("v.vehicle_id IN (SELECT rowid FROM __fts_vehicle WHERE __fts_vehicle MATCH ?)", match)
+            else:
+                like = f"%{q}%"
+                where.append("(v.vin LIKE ? OR v.color LIKE ? OR mk.name LIKE ? OR m.name LIKE ?)")
+                params.extend([like, like, like, like])
+        if after_id is not None:
+            add(
+                "(v.created_at, v.vehicle_id) < (SELECT created_at, vehicle_id FROM vehicle WHERE vehicle_id = ?)",
+                int(after_id),
+            )
 
         where_sql = ("WHERE " + " AND ".join(where)) if where else ""
         params.append(limit)
@@ -969,7 +1380,12 @@ def delete_vehicle(permissions: Sequence[str], vehicle_id: int) -> Dict[str, Any
 # =========================
 # Customers
 # =========================
-def list_customers(permissions: Sequence[str], q: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+def list_customers(
+    permissions: Sequence[str],
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
     """
     List customers, optionally searching by name/email/phone.
 
@@ -977,7 +1393,8 @@ def list_customers(permissions: Sequence[str], q: Optional[str] = None, limit: i
         Requires Sales.Read (or bypass_all_auth).
 
     Args:
-        q: LIKE search over first_name, last_name, email, phone.
+        q: substring search over first_name, last_name, email, phone.
+        after_id: keyset pagination; return customers listed after this customer_id.
 
     Returns:
         List of customer rows.
@@ -987,18 +1404,34 @@ def list_customers(permissions: Sequence[str], q: Optional[str] = None, limit: i
     )
     conn = _connect_ro()
     try:
-        if not q:
-            return _fetch_all(conn, "SELECT * FROM customer ORDER BY created_at DESC, customer_id DESC LIMIT ?", (limit,))
-        like = f"%{q}%"
+        where: List[str] = []
+        params: List[Any] = []
+        if q:
+            match = _fts_query(q)
+            if match is not None and _has_table(conn, "__fts_customer"):
+                where.append("customer_id IN (SELECT rowid FROM __fts_customer WHERE __fts_customer MATCH ?)")
+                params.append(match)
+            else:
+                like = f"%{q}%"
+                where.append("(first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ?)")
+                params.extend([like, like, like, like])
+        if after_id is not None:
+            where.append(
+                "(created_at, customer_id) < (SELECT created_at, customer_id FROM customer WHERE customer_id = ?)"
+            )
+            params.append(int(after_id))
+
+        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+        params.append(limit)
         return _fetch_all(
             conn,
-            """
+            f"""
             SELECT * FROM customer
-            WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ?
+            {where_sql}
             ORDER BY created_at DESC, customer_id DESC
             LIMIT ?
             """,
-            (like, like, like, like, limit),
+            tuple(params),
         )
     finally:
         conn.close()
@@ -1344,6 +1777,7 @@ def list_orders(
     employee_id: Optional[int] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    after_id: Optional[int] = None,
     limit: int = 100,
 ) -> List[Dict[str, Any]]:
     """
@@ -1356,6 +1790,7 @@ def list_orders(
         status: {'PENDING','CONFIRMED','CANCELLED','FULFILLED','DELIVERED','REFUNDED'}
         dealership_id, customer_id, employee_id
         date_from/date_to: inclusive bounds on order_date (SQLite datetime text)
+        after_id: keyset pagination; return orders listed after this order_id
 
     Returns:
         List of sales orders joined with customer/employee/dealership metadata.
@@ -1384,6 +1819,11 @@ def list_orders(
             add("o.order_date >= ?", date_from)
         if date_to is not None:
             add("o.order_date <= ?", date_to)
+        if after_id is not None:
+            add(
+                "(o.order_date, o.order_id) < (SELECT order_date, order_id FROM sales_order WHERE order_id = ?)",
+                int(after_id),
+            )
 
         where_sql = ("WHERE " + " AND ".join(where)) if where else ""
         params.append(limit)
@@ -2088,48 +2528,118 @@ def inventory_report(permissions: Sequence[str], dealership_id: Optional[int] =
     )
     conn = _connect_ro()
     try:
-        params: List[Any] = []
-        where = ""
-        if dealership_id is not None:
-            where = "WHERE v.dealership_id = ?"
-            params.append(int(dealership_id))
-
-        by_status = _fetch_all(
-            conn,
-            f"""
-            SELECT v.dealership_id, d.name AS dealership_name, v.status, COUNT(*) AS count
-            FROM vehicle v
-            JOIN dealership d ON d.dealership_id = v.dealership_id
-            {where}
-            GROUP BY v.dealership_id, v.status
-            ORDER BY d.name, v.status
-            """,
-            tuple(params),
-        )
-
-        by_model = _fetch_all(
-            conn,
-            f"""
-            SELECT
-              v.dealership_id, d.name AS dealership_name,
-              mk.name AS make_name, m.name AS model_name,
-              COUNT(*) AS count
-            FROM vehicle v
-            JOIN dealership d ON d.dealership_id = v.dealership_id
-            JOIN model m ON m.model_id = v.model_id
-            JOIN make mk ON mk.make_id = m.make_id
-            {where}
-            GROUP BY v.dealership_id, mk.name, m.name
-            ORDER BY d.name, mk.name, m.name
-            """,
-            tuple(params),
-        )
-
-        return {"by_status": by_status, "by_model": by_model}
+        if _has_table(conn, "__agg_vehicle_status") and _has_table(conn, "__agg_vehicle_model"):
+            return _inventory_report_aggregated(conn, dealership_id)
+        return _inventory_report_live(conn, dealership_id)
     finally:
         conn.close()
 
 
+def _inventory_report_live(conn: sqlite3.Connection, dealership_id: Optional[int]) -> Dict[str, Any]:
+    params: List[Any] = []
+    where = ""
+    if dealership_id is not None:
+        where = "WHERE v.dealership_id = ?"
+        params.append(int(dealership_id))
+
+    by_status = _fetch_all(
+        conn,
+        f"""
+        SELECT v.dealership_id, d.name AS dealership_name, v.status, COUNT(*) AS count
+        FROM vehicle v
+        JOIN dealership d ON d.dealership_id = v.dealership_id
+        {where}
+        GROUP BY v.dealership_id, v.status
+        ORDER BY d.name, v.status
+        """,
+        tuple(params),
+    )
+
+    by_model = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          v.dealership_id, d.name AS dealership_name,
+          mk.name AS make_name, m.name AS model_name,
+          COUNT(*) AS count
+        FROM vehicle v
+        JOIN dealership d ON d.dealership_id = v.dealership_id
+        JOIN model m ON m.model_id = v.model_id
+        JOIN make mk ON mk.make_id = m.make_id
+        {where}
+        GROUP BY v.dealership_id, mk.name, m.name
+        ORDER BY d.name, mk.name, m.name
+        """,
+        tuple(params),
+    )
+
+    return {"by_status": by_status, "by_model": by_model}
+
+
+def _inventory_report_aggregated(conn: sqlite3.Connection, dealership_id: Optional[int]) -> Dict[str, Any]:
+    params: List[Any] = []
+    where = ""
+    if dealership_id is not None:
+        where = "WHERE a.dealership_id = ?"
+        params.append(int(dealership_id))
+
+    by_status = _fetch_all(
+        conn,
+        f"""
+        SELECT a.dealership_id, d.name AS dealership_name, a.status, a.count
+        FROM __agg_vehicle_status a
+        JOIN dealership d ON d.dealership_id = a.dealership_id
+        {where}
+        ORDER BY d.name, a.status
+        """,
+        tuple(params),
+    )
+
+    by_model = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          a.dealership_id, d.name AS dealership_name,
+          mk.name AS make_name, m.name AS model_name,
+          SUM(a.count) AS count
+        FROM __agg_vehicle_model a
+        JOIN dealership d ON d.dealership_id = a.dealership_id
+        JOIN model m ON m.model_id = a.model_id
+        JOIN make mk ON mk.make_id = m.make_id
+        {where}
+        GROUP BY a.dealership_id, mk.name, m.name
+        ORDER BY d.name, mk.name, m.name
+        """,
+        tuple(params),
+    )
+
+    return {"by_status": by_status, "by_model": by_model}
+
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _sales_day_bounds(
+    date_from: Optional[str], date_to: Optional[str]
+) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    Map order_date bounds onto whole days of __agg_sales, or None when a bound
+    falls inside a day and the live query is needed. date_from must be a bare
+    'YYYY-MM-DD'; date_to must be 'YYYY-MM-DD 23:59:59'.
+    """
+    day_from = day_to = None
+    if date_from is not None:
+        if not _DAY_RE.match(date_from):
+            return None
+        day_from = date_from
+    if date_to is not None:
+        day, _, clock = date_to.partition(" ")
+        if not _DAY_RE.match(day) or clock != "23:59:59":
+            return None
+        day_to = day
+    return day_from, day_to
+
+
 def sales_report(
     permissions: Sequence[str],
     *,
@@ -2159,71 +2669,152 @@ def sales_report(
     )
     conn = _connect_ro()
     try:
-        where = ["o.status IN ('FULFILLED','DELIVERED')"]
-        params: List[Any] = []
-
-        def add(cond: str, val: Any) -> None:
-            where.append(cond)
-            params.append(val)
-
-        if dealership_id is not None:
-            add("o.dealership_id = ?", int(dealership_id))
-        if date_from is not None:
-            add("o.order_date >= ?", date_from)
-        if date_to is not None:
-            add("o.order_date <= ?", date_to)
-
-        where_sql = "WHERE " + " AND ".join(where)
-
-        totals = _fetch_one(
-            conn,
-            f"""
-            SELECT
-              COUNT(*) AS orders_count,
-              COALESCE(SUM(o.total_amount), 0) AS gross_sales
-            FROM sales_order o
-            {where_sql}
-            """,
-            tuple(params),
-        ) or {"orders_count": 0, "gross_sales": 0}
-
-        by_day = _fetch_all(
-            conn,
-            f"""
-            SELECT
-              substr(o.order_date, 1, 10) AS day,
-              COUNT(*) AS orders_count,
-              COALESCE(SUM(o.total_amount), 0) AS gross_sales
-            FROM sales_order o
-            {where_sql}
-            GROUP BY day
-            ORDER BY day DESC
-            """,
-            tuple(params),
-        )
-
-        by_employee = _fetch_all(
-            conn,
-            f"""
-            SELECT
-              o.employee_id,
-              e.first_name || ' ' || e.last_name AS employee_name,
-              COUNT(*) AS orders_count,
-              COALESCE(SUM(o.total_amount), 0) AS gross_sales
-            FROM sales_order o
-            LEFT JOIN employee e ON e.employee_id = o.employee_id
-            {where_sql}
-            GROUP BY o.employee_id
-            ORDER BY gross_sales DESC
-            """,
-            tuple(params),
-        )
-
-        return {"totals": totals, "by_day": by_day, "by_employee": by_employee}
+        day_bounds = _sales_day_bounds(date_from, date_to)
+        if day_bounds is not None and _has_table(conn, "__agg_sales"):
+            return _sales_report_aggregated(conn, dealership_id, *day_bounds)
+        return _sales_report_live(conn, dealership_id, date_from, date_to)
     finally:
         conn.close()
 
 
+def _sales_report_live(
+    conn: sqlite3.Connection,
+    dealership_id: Optional[int],
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> Dict[str, Any]:
+    where = [f"o.status IN {_SALES_STATUSES_SQL}"]
+    params: List[Any] = []
+
+    def add(cond: str, val: Any) -> None:
+        where.append(cond)
+        params.append(val)
+
+    if dealership_id is not None:
+        add("o.dealership_id = ?", int(dealership_id))
+    if date_from is not None:
+        add("o.order_date >= ?", date_from)
+    if date_to is not None:
+        add("o.order_date <= ?", date_to)
+
+    where_sql = "WHERE " + " AND ".join(where)
+
+    totals = _fetch_one(
+        conn,
+        f"""
+        SELECT
+          COUNT(*) AS orders_count,
+          COALESCE(SUM(o.total_amount), 0) AS gross_sales
+        FROM sales_order o
+        {where_sql}
+        """,
+        tuple(params),
+    ) or {"orders_count": 0, "gross_sales": 0}
+
+    by_day = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          substr(o.order_date, 1, 10) AS day,
+          COUNT(*) AS orders_count,
+          COALESCE(SUM(o.total_amount), 0) AS gross_sales
+        FROM sales_order o
+        {where_sql}
+        GROUP BY day
+        ORDER BY day DESC
+        """,
+        tuple(params),
+    )
+
+    by_employee = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          o.employee_id,
+          e.first_name || ' ' || e.last_name AS employee_name,
+          COUNT(*) AS orders_count,
+          COALESCE(SUM(o.total_amount), 0) AS gross_sales
+        FROM sales_order o
+        LEFT JOIN employee e ON e.employee_id = o.employee_id
+        {where_sql}
+        GROUP BY o.employee_id
+        ORDER BY gross_sales DESC
+        """,
+        tuple(params),
+    )
+
+    return {"totals": totals, "by_day": by_day, "by_employee": by_employee}
+
+
+def _sales_report_aggregated(
+    conn: sqlite3.Connection,
+    dealership_id: Optional[int],
+    day_from: Optional[str],
+    day_to: Optional[str],
+) -> Dict[str, Any]:
+    where: List[str] = []
+    params: List[Any] = []
+
+    def add(cond: str, val: Any) -> None:
+        where.append(cond)
+        params.append(val)
+
+    if dealership_id is not None:
+        add("s.dealership_id = ?", int(dealership_id))
+    if day_from is not None:
+        add("s.day >= ?", day_from)
+    if day_to is not None:
+        add("s.day <= ?", day_to)
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    totals = _fetch_one(
+        conn,
+        f"""
+        SELECT
+          COALESCE(SUM(s.orders_count), 0) AS orders_count,
+          COALESCE(SUM(s.gross_sales), 0) AS gross_sales
+        FROM __agg_sales s
+        {where_sql}
+        """,
+        tuple(params),
+    ) or {"orders_count": 0, "gross_sales": 0}
+
+    by_day = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          s.day,
+          SUM(s.orders_count) AS orders_count,
+          SUM(s.gross_sales) AS gross_sales
+        FROM __agg_sales s
+        {where_sql}
+        GROUP BY s.day
+        ORDER BY s.day DESC
+        """,
+        tuple(params),
+    )
+
+    by_employee = _fetch_all(
+        conn,
+        f"""
+        SELECT
+          NULLIF(s.employee_id, 0) AS employee_id,
+          e.first_name || ' ' || e.last_name AS employee_name,
+          SUM(s.orders_count) AS orders_count,
+          SUM(s.gross_sales) AS gross_sales
+        FROM __agg_sales s
+        LEFT JOIN employee e ON e.employee_id = s.employee_id
+        {where_sql}
+        GROUP BY s.employee_id
+        ORDER BY gross_sales DESC
+        """,
+        tuple(params),
+    )
+
+    return {"totals": totals, "by_day": by_day, "by_employee": by_employee}
+
+
 
 # --------- Assistant Functions ---------
 def assistant_query(request_permissions: List[str], body: Dict[str, Any]) -> Dict[str, Any]:
@@ -2266,10 +2857,18 @@ def assistant_query(request_permissions: List[str], body: Dict[str, Any]) -> Dic
     use_classifier = chat_details.get("use_classifier", False)
     classifier_model = (chat_details.get("classifier_model") or "").strip()
 
-    if use_classifier and classifier_model:
+    # Speculative mode: classify concurrently with client/agent construction and
+    # planning; the agent blocks on the verdict only before executing SQL.
+    spec = None
+    if use_classifier and classifier_model and chat_details.get("speculative_classifier", False):
+        from qbtrain.ai.classifiers.injection_classifier import SpeculativeClassification
+
+        spec = SpeculativeClassification(classifier_model, prompt)
+    elif use_classifier and classifier_model:
         from qbtrain.ai.classifiers.injection_classifier import classify as run_classify
 
-        is_injection, confidence = run_classify(classifier_model, prompt)
+        cache_info: Dict[str, Any] = {}
+        is_injection, confidence = run_classify(classifier_model, prompt, cache_info=cache_info)
         classifier_trace = AgentTracer()
         classifier_trace.trace(
             "InjectionClassifier",
@@ -2278,6 +2877,7 @@ def assistant_query(request_permissions: List[str], body: Dict[str, Any]) -> Dic
             is_injection=is_injection,
             confidence=round(confidence, 4),
             input_preview=prompt[:200],
+            cache=cache_info,
         )
         if is_injection:
             return {
@@ -2295,29 +2895,40 @@ def assistant_query(request_permissions: List[str], body: Dict[str, Any]) -> Dic
         stored_procedures=stored_procedures,
         exc_method=exc_method,
         stream=False,
+        before_execute=_speculation_gate(spec) if spec is not None else None,
     )
 
     # Merge classifier trace into agent tracer if classification passed
-    if use_classifier and classifier_model and agent.tracer:
-        agent.tracer.trace_steps.insert(0, {
-            "id": 0,
-            "agent_name": "InjectionClassifier",
-            "__type__": "classification",
-            "model": classifier_model,
-            "is_injection": False,
-            "confidence": round(confidence, 4),
-            "input_preview": prompt[:200],
-        })
+    if spec is None and use_classifier and classifier_model and agent.tracer:
+        agent.tracer.trace_steps.insert(
+            0, _classifier_trace_entry(classifier_model, prompt, False, confidence, cache_info)
+        )
 
     # Run SQLAgent (raw sql+results), then generate a customer-facing response outside the SQLAgent.
     raw_parts: List[str] = []
     final_trace: Dict[str, Any] = {}
-    for ev in agent.act(user_query=prompt, exc_method=exc_method):
+    events = agent.act(user_query=prompt, exc_method=exc_method)
+    if spec is not None:
+        events = _speculative_agent_events(events, spec)
+    for ev in events:
         if ev.get("type") == "message":
             raw_parts.append(ev.get("content", "") or "")
         elif ev.get("type") == "trace":
             final_trace = ev.get("content") or {}
 
+    if spec is not None:
+        is_injection, confidence = spec.result()
+        calls = [
+            _classifier_trace_entry(classifier_model, prompt, is_injection, confidence, spec.cache_info),
+            _speculation_trace_entry(spec, classifier_model),
+        ]
+        if is_injection:
+            return {
+                "message": "Your request has been flagged as a potential prompt injection attack and has been blocked.",
+                "trace": {"calls": calls},
+            }
+        final_trace = {**final_trace, "calls": calls + list(final_trace.get("calls") or [])}
+
     raw_payload = extract_json_object("".join(raw_parts).strip()) or {}
     sql = str(raw_payload.get("sql") or "")
     results = raw_payload.get("results")
@@ -2374,19 +2985,19 @@ def assistant_stream(request_permissions: List[str], body: Dict[str, Any]) -> Ge
     use_classifier = chat_details.get("use_classifier", False)
     classifier_model = (chat_details.get("classifier_model") or "").strip()
 
-    if use_classifier and classifier_model:
+    # Speculative mode: classify concurrently with client/agent construction and
+    # planning; the agent blocks on the verdict only before executing SQL.
+    spec = None
+    if use_classifier and classifier_model and chat_details.get("speculative_classifier", False):
+        from qbtrain.ai.classifiers.injection_classifier import SpeculativeClassification
+
+        spec = SpeculativeClassification(classifier_model, prompt)
+    elif use_classifier and classifier_model:
         from qbtrain.ai.classifiers.injection_classifier import classify as run_classify
 
-        is_injection, confidence = run_classify(classifier_model, prompt)
-        classifier_trace_entry = {
-            "id": 0,
-            "agent_name": "InjectionClassifier",
-            "__type__": "classification",
-            "model": classifier_model,
-            "is_injection": is_injection,
-            "confidence": round(confidence, 4),
-            "input_preview": prompt[:200],
-        }
+        cache_info: Dict[str, Any] = {}
+        is_injection, confidence = run_classify(classifier_model, prompt, cache_info=cache_info)
+        classifier_trace_entry = _classifier_trace_entry(classifier_model, prompt, is_injection, confidence, cache_info)
         yield {"type": "trace", "content": classifier_trace_entry}
 
         if is_injection:
@@ -2404,10 +3015,11 @@ def assistant_stream(request_permissions: List[str], body: Dict[str, Any]) -> Ge
         stored_procedures=stored_procedures,
         exc_method=exc_method,
         stream=True,
+        before_execute=_speculation_gate(spec) if spec is not None else None,
     )
 
     # Merge classifier trace into agent tracer if classification passed
-    if use_classifier and classifier_model and agent.tracer:
+    if spec is None and use_classifier and classifier_model and agent.tracer:
         agent.tracer.trace_steps.insert(0, classifier_trace_entry)
 
     start_total = time.monotonic()
@@ -2416,13 +3028,41 @@ def assistant_stream(request_permissions: List[str], body: Dict[str, Any]) -> Ge
     # Capture raw sql+results message to format externally.
     raw_parts: List[str] = []
 
-    for ev in agent.act(user_query=prompt, exc_method=exc_method):
+    events = agent.act(user_query=prompt, exc_method=exc_method)
+    if spec is not None:
+        events = _speculative_agent_events(events, spec)
+    cleared = spec is None
+    for ev in events:
+        if not cleared:
+            # First relayed event: the classifier has just cleared the prompt.
+            cleared = True
+            yield {
+                "type": "trace",
+                "content": _classifier_trace_entry(classifier_model, prompt, False, spec.result()[1], spec.cache_info),
+            }
         et = ev.get("type")
         if et == "message":
             raw_parts.append(ev.get("content", "") or "")
             continue
         yield ev
 
+    if spec is not None:
+        is_injection, confidence = spec.result()
+        classifier_trace_entry = _classifier_trace_entry(classifier_model, prompt, is_injection, confidence, spec.cache_info)
+        speculation_entry = _speculation_trace_entry(spec, classifier_model)
+        if is_injection:
+            yield {"type": "trace", "content": classifier_trace_entry}
+            yield {"type": "trace", "content": speculation_entry}
+            yield {"type": "message", "content": "Your request has been flagged as a potential prompt injection attack and has been blocked."}
+            yield {"type": "trace", "content": {"calls": [classifier_trace_entry, speculation_entry], "total_latency_ms": 0}}
+            return
+        if not cleared:
+            yield {"type": "trace", "content": classifier_trace_entry}
+        yield {"type": "trace", "content": speculation_entry}
+        if agent.tracer:
+            agent.tracer.trace_steps.insert(0, classifier_trace_entry)
+            agent.tracer.trace_steps.append(speculation_entry)
+
     raw_payload = extract_json_object("".join(raw_parts).strip()) or {}
     sql = str(raw_payload.get("sql") or "")
     results = raw_payload.get("results")
@@ -0,0 +1,95 @@
+"""
+Benchmark: injection-classifier backends (PyTorch fp32, ONNX Runtime fp32,
+ONNX Runtime dynamic int8) on CPU for CRDLR prompts.
+
+For every installed classifier and backend this reports pipeline load time
+(including the one-off ONNX export / validation), median and p95 latency of
+classify() per prompt, and accuracy deltas vs. PyTorch: top-label agreement,
+flip count and max label-probability difference. Prompts are taken from the
+validation suite (test.py), so the set mixes benign and injection queries.
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.ai.classifiers import injection_classifier as ic  # noqa: E402
+from qbtrain.ai.classifiers.onnx_backend import compare_pipelines  # noqa: E402
+from apps.aisecurity.crdlr.validation.test import TESTS  # noqa: E402
+
+REPEATS = 3
+
+
+def _prompts():
+    prompts = []
+    for _, _, _, _, body in TESTS:
+        p = body["chatDetails"]["prompt"]
+        if p.strip() and p not in prompts:
+            prompts.append(p)
+    return prompts
+
+
+def _latencies(model_id, prompts):
+    samples = []
+    for _ in range(REPEATS):
+        for p in prompts:
+            t0 = time.perf_counter()
+            ic.classify(model_id, p)
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def main():
+    # Measure inference, not verdict-cache hits on repeated prompts.
+    ic.set_classification_cache(None)
+    prompts = _prompts()
+    installed = [c["model_id"] for c in ic.list_classifiers() if c["installed"]]
+    print(f"Injection classifier backend benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Prompts: {len(prompts)}, repeats: {REPEATS}, cpu_count: {os.cpu_count()}")
+    if not installed:
+        print("No injection classifier installed; download one first.")
+        return
+
+    for model_id in installed:
+        print(f"\n{model_id}")
+        print(f"  {'backend':10s} {'active':10s} {'load s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} "
+              f"{'speedup':>8s} {'agree':>6s} {'flips':>6s} {'max dP':>8s}")
+        reference = None
+        base_p50 = None
+        for backend in ic.CLASSIFIER_BACKENDS:
+            ic.set_classifier_backend(model_id, backend)
+            t0 = time.perf_counter()
+            pipe = ic._get_pipeline(model_id, ic.DEFAULT_MODELS_DIR)
+            load_s = time.perf_counter() - t0
+            status = (ic._BACKEND_STATUS.get(f"{ic.DEFAULT_MODELS_DIR}::{model_id}") or {}) if backend != "torch" else {}
+            active = status.get("active", backend)
+
+            p50, p95 = _latencies(model_id, prompts)
+            if reference is None:
+                reference, base_p50 = pipe, p50
+                delta = {"label_agreement": 1.0, "max_abs_diff": 0.0}
+            else:
+                delta = compare_pipelines(reference, pipe, prompts)
+            flips = round((1.0 - delta["label_agreement"]) * len(prompts))
+            print(f"  {backend:10s} {active:10s} {load_s:7.1f} {p50:8.1f} {p95:8.1f} {base_p50 / p50:7.1f}x "
+                  f"{delta['label_agreement']:6.3f} {flips:6d} {delta['max_abs_diff']:8.4f}")
+            if status.get("error"):
+                print(f"    fell back to torch: {status['error']}")
+        ic.set_classifier_backend(model_id, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: relevance-pruned schema context for the CRDLR planner prompt.
+
+For every prompt in the validation suite (test.py) this reports the planner
+system prompt size with the full schema vs. the pruned schema, and — for the
+hand-labelled queries below — table recall of the selection (every table the
+correct SQL needs must be present). No LLM is called.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.utils.schemautils import SchemaRetriever  # noqa: E402
+from qbtrain.utils.sqlutils import get_schema_context  # noqa: E402
+from apps.aisecurity.crdlr.functions import _resolve_db_path, authorizer  # noqa: E402
+from apps.aisecurity.crdlr.prompts import build_planner_system_prompt  # noqa: E402
+from apps.aisecurity.crdlr.validation.test import TESTS  # noqa: E402
+
+# Minimum set of tables the correct statement touches.
+EXPECTED_TABLES = {
+    "Show all vehicles": {"vehicle"},
+    "List all customers": {"customer"},
+    "Show all makes": {"make"},
+    "List all dealerships": {"dealership"},
+    "Show all employees": {"employee"},
+    "Show vehicles under 30000": {"vehicle"},
+    "Show customers named John": {"customer"},
+    "Show all vehicles with their model names": {"vehicle", "model"},
+    "Show all vehicles with their make name": {"vehicle", "model", "make"},
+    "List all Toyota vehicles": {"vehicle", "model", "make"},
+    "Show BMW cars under 50000": {"vehicle", "model", "make"},
+    "How many vehicles are there?": {"vehicle"},
+    "Count vehicles by make": {"vehicle", "model", "make"},
+    "Which makes have more than 10 vehicles in inventory?": {"vehicle", "model", "make"},
+    "Show all orders with the customer name and order status": {"sales_order", "customer"},
+    "Show total sales revenue by dealership": {"sales_order", "dealership"},
+    "Which employee has handled the most orders?": {"sales_order", "employee"},
+    "Delete all vehicles of make Tesla": {"vehicle", "model", "make"},
+    "Set price to 50000 for all Toyota vehicles": {"vehicle", "model", "make"},
+    "Add a new customer named Test User with email test@example.com": {"customer"},
+}
+
+
+def _prompt_chars(schema_context: str) -> int:
+    return len(build_planner_system_prompt(
+        exc_method="full_access",
+        schema_context=schema_context,
+        permissions_map_block=authorizer.get_permissions_access(fmt="str"),
+    ))
+
+
+def main():
+    db_path = _resolve_db_path()
+
+    t0 = time.perf_counter()
+    retriever = SchemaRetriever(db_path)
+    build_ms = (time.perf_counter() - t0) * 1000
+    full_chars = _prompt_chars(get_schema_context(db_path))
+
+    prompts = []
+    for _, _, _, _, body in TESTS:
+        p = body["chatDetails"]["prompt"]
+        if p.strip() and p not in prompts:
+            prompts.append(p)
+
+    lines = []
+    total_pruned = hits = labelled = fallbacks = 0
+    select_ms = 0.0
+    for p in prompts:
+        t0 = time.perf_counter()
+        ctx, sel = retriever.schema_context(p)
+        select_ms += (time.perf_counter() - t0) * 1000
+        chars = _prompt_chars(ctx)
+        total_pruned += chars
+        fallbacks += 0 if sel.confident else 1
+        recall = ""
+        expected = EXPECTED_TABLES.get(p)
+        if expected is not None:
+            labelled += 1
+            got = set(sel.tables) if sel.tables is not None else expected
+            ok = expected <= got
+            hits += int(ok)
+            recall = "  recall=OK" if ok else f"  recall=MISS {sorted(expected - got)}"
+        tables = ",".join(sel.tables) if sel.tables is not None else "ALL"
+        lines.append(f"  {chars:6d} / {full_chars:6d} chars  [{tables}]{recall}  {p[:70]}")
+
+    n = max(1, len(prompts))
+    print(f"CRDLR schema pruning benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Index build: {build_ms:.1f} ms, avg selection: {select_ms / n:.2f} ms")
+    print(f"Planner prompt: full={full_chars} chars, pruned avg={total_pruned // n} chars "
+          f"({100 * total_pruned / (n * full_chars):.1f}% of full)")
+    print(f"Full-schema fallbacks: {fallbacks}/{len(prompts)}")
+    print(f"Table recall (labelled): {hits}/{labelled}")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
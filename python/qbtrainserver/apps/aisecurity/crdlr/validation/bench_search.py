@@ -0,0 +1,204 @@
+"""
+Benchmark: FTS5 search, covering indexes, keyset pagination and
+trigger-maintained report aggregates for the CRDLR list/report endpoints.
+
+Builds two synthetically enlarged copies of the seed DB in a temp directory
+(the seed and sandbox DBs are never touched): one as shipped, one with the
+search/covering indexes and __agg_* tables from
+functions._ensure_sandbox_indexes. The same list/report functions are timed
+against both, plus deep OFFSET vs. keyset pagination, and the aggregated
+reports are checked against the live GROUP BY queries.
+"""
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.crdlr import functions as fn  # noqa: E402
+
+N_VEHICLES = int(os.environ.get("BENCH_VEHICLES", 100_000))
+N_CUSTOMERS = int(os.environ.get("BENCH_CUSTOMERS", 50_000))
+N_ORDERS = int(os.environ.get("BENCH_ORDERS", 1_000_000))
+REPEATS = 5
+PERMS = [fn.BYPASS_PERMISSION]
+
+_COLORS = ("Black", "White", "Gray", "Silver", "Blue", "Red", "Green", "Beige")
+_STATUSES_V = ("AVAILABLE", "RESERVED", "SOLD", "IN_SERVICE")
+_STATUSES_O = ("PENDING", "CONFIRMED", "CANCELLED", "FULFILLED", "DELIVERED", "REFUNDED")
+
+
+def _lookup(conn: sqlite3.Connection, name: str, values) -> int:
+    conn.execute(f"CREATE TEMP TABLE {name}(i INTEGER PRIMARY KEY, v)")
+    conn.executemany(f"INSERT INTO {name} VALUES (?, ?)", list(enumerate(values)))
+    return len(values)
+
+
+def _enlarge(path: Path) -> None:
+    conn = sqlite3.connect(path.as_posix())
+    try:
+        ids = lambda sql: [r[0] for r in conn.execute(sql)]  # noqa: E731
+        n_m = _lookup(conn, "_m", ids("SELECT model_id FROM model ORDER BY model_id"))
+        n_d = _lookup(conn, "_d", ids("SELECT dealership_id FROM dealership ORDER BY dealership_id"))
+        n_e = _lookup(conn, "_e", ids("SELECT employee_id FROM employee ORDER BY employee_id"))
+        n_c = _lookup(conn, "_c", _COLORS)
+        n_sv = _lookup(conn, "_sv", _STATUSES_V)
+        n_so = _lookup(conn, "_so", _STATUSES_O)
+        conn.executescript(f"""
+            WITH RECURSIVE s(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM s WHERE x < {N_VEHICLES})
+            INSERT INTO vehicle(vin, model_id, model_year, color, mileage, list_price, dealership_id, status, created_at)
+            SELECT printf('BENCH%012d', x),
+                   (SELECT v FROM _m WHERE i = x % {n_m}),
+                   2010 + x % 16,
+                   (SELECT v FROM _c WHERE i = x % {n_c}),
+                   (x * 37) % 150000,
+                   15000 + (x * 97) % 90000,
+                   (SELECT v FROM _d WHERE i = x % {n_d}),
+                   (SELECT v FROM _sv WHERE i = x % {n_sv}),
+                   datetime('2024-01-01', printf('+%d minutes', x))
+            FROM s;
+
+            WITH RECURSIVE s(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM s WHERE x < {N_CUSTOMERS})
+            INSERT INTO customer(first_name, last_name, email, phone, created_at)
+            SELECT printf('First%d', x), printf('Last%d', x % 997), printf('bench%d@example.com', x),
+                   printf('555-%07d', x), datetime('2024-01-01', printf('+%d minutes', x))
+            FROM s;
+        """)
+        n_cu = _lookup(conn, "_cu", ids("SELECT customer_id FROM customer ORDER BY customer_id"))
+        conn.executescript(f"""
+            WITH RECURSIVE s(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM s WHERE x < {N_ORDERS})
+            INSERT INTO sales_order(customer_id, employee_id, dealership_id, status, order_date, total_amount)
+            SELECT (SELECT v FROM _cu WHERE i = x % {n_cu}),
+                   (SELECT v FROM _e WHERE i = x % {n_e}),
+                   (SELECT v FROM _d WHERE i = x % {n_d}),
+                   (SELECT v FROM _so WHERE i = x % {n_so}),
+                   datetime('2023-01-01', printf('+%d minutes', x)),
+                   15000 + (x * 89) % 90000
+            FROM s;
+        """)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def _time(func, repeats: int = REPEATS):
+    samples = []
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def _use_db(path: Path) -> None:
+    fn._sandbox_db_path = lambda: path
+    # Mark as prepared so ensure_sandbox_db() does not add indexes to the baseline copy.
+    fn._SANDBOX_INDEXES_READY.add(path.as_posix())
+
+
+_ORDERS_PAGE_SQL = """
+    SELECT o.*, c.first_name, c.last_name, e.first_name, d.name
+    FROM sales_order o
+    JOIN customer c ON c.customer_id = o.customer_id
+    LEFT JOIN employee e ON e.employee_id = o.employee_id
+    JOIN dealership d ON d.dealership_id = o.dealership_id
+    {where}
+    ORDER BY o.order_date DESC, o.order_id DESC
+    LIMIT ? {offset}
+"""
+
+
+def _orders_page_offset(conn: sqlite3.Connection, offset: int, page_size: int) -> list:
+    return conn.execute(_ORDERS_PAGE_SQL.format(where="", offset="OFFSET ?"), (page_size, offset)).fetchall()
+
+
+def _orders_page_keyset(conn: sqlite3.Connection, after_id: int, page_size: int) -> list:
+    where = "WHERE (o.order_date, o.order_id) < (SELECT order_date, order_id FROM sales_order WHERE order_id = ?)"
+    return conn.execute(_ORDERS_PAGE_SQL.format(where=where, offset=""), (after_id, page_size)).fetchall()
+
+
+def _same(a: dict, b: dict) -> bool:
+    # Row order only differs between ties (e.g. equal gross_sales), so compare as sorted rows.
+    def norm(v):
+        return sorted(map(repr, v)) if isinstance(v, list) else dict(v)
+    return {k: norm(v) for k, v in a.items()} == {k: norm(v) for k, v in b.items()}
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp(prefix="crdlr_bench_"))
+    try:
+        baseline = tmp / "baseline.db"
+        indexed = tmp / "indexed.db"
+        t0 = time.perf_counter()
+        shutil.copy2(fn._original_db_path(), baseline)
+        _enlarge(baseline)
+        shutil.copy2(baseline, indexed)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        fn._ensure_sandbox_indexes(indexed)
+        index_s = time.perf_counter() - t0
+
+        cases = [
+            ("list_vehicles q='00000004242'", lambda: fn.list_vehicles(PERMS, q="00000004242")),
+            ("list_vehicles q='silver'", lambda: fn.list_vehicles(PERMS, q="silver")),
+            ("list_vehicles status=SOLD", lambda: fn.list_vehicles(PERMS, status="SOLD")),
+            ("list_customers q='first4242'", lambda: fn.list_customers(PERMS, q="first4242")),
+            ("list_orders status=DELIVERED", lambda: fn.list_orders(PERMS, status="DELIVERED")),
+            ("sales_report (all time)", lambda: fn.sales_report(PERMS)),
+            ("inventory_report", lambda: fn.inventory_report(PERMS)),
+        ]
+
+        print(f"CRDLR search/index benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+        print(f"Rows: vehicles+{N_VEHICLES}, customers+{N_CUSTOMERS}, orders+{N_ORDERS}")
+        print(f"Build: {build_s:.1f} s, search/covering index creation: {index_s:.1f} s")
+        print(f"{'case':40s} {'baseline ms':>12s} {'indexed ms':>12s} {'speedup':>8s}  rows")
+        for name, case in cases:
+            _use_db(baseline)
+            base_ms, base_rows = _time(case)
+            _use_db(indexed)
+            idx_ms, idx_rows = _time(case)
+            same = "" if len(base_rows) == len(idx_rows) else f"  MISMATCH {len(base_rows)} != {len(idx_rows)}"
+            print(f"{name:40s} {base_ms:12.2f} {idx_ms:12.2f} {base_ms / max(idx_ms, 1e-6):7.1f}x  {len(idx_rows)}{same}")
+
+        page_size = 100
+        conn = sqlite3.connect(indexed.as_posix())
+        conn.row_factory = sqlite3.Row
+        try:
+            inv_ok = _same(fn._inventory_report_aggregated(conn, None), fn._inventory_report_live(conn, None))
+            sales_ok = _same(fn._sales_report_aggregated(conn, None, None, None),
+                             fn._sales_report_live(conn, None, None, None))
+            print(f"Aggregates match live queries: inventory={inv_ok} sales={sales_ok}")
+            for offset in (100, 10_000, N_ORDERS // 2):
+                after_id = conn.execute(
+                    "SELECT order_id FROM sales_order ORDER BY order_date DESC, order_id DESC LIMIT 1 OFFSET ?",
+                    (offset - 1,),
+                ).fetchone()[0]
+                off_ms, off_rows = _time(lambda: _orders_page_offset(conn, offset, page_size))
+                key_ms, key_rows = _time(lambda: _orders_page_keyset(conn, after_id, page_size))
+                same = "" if off_rows == key_rows else "  MISMATCH"
+                print(f"orders page at offset {offset:<9d} OFFSET {off_ms:9.2f} ms   keyset {key_ms:7.2f} ms{same}")
+        finally:
+            conn.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,9 @@ from . import functions as fn
 # If False, all permission checks are bypassed by passing ["bypass_all_auth"] into functions.
 enable_permissions: bool = True
 
+# Largest page a list endpoint returns; larger `limit` values are clamped.
+MAX_PAGE_LIMIT: int = 500
+
 
 def _error_response(exc: Exception) -> Response:
     if isinstance(exc, PermissionError):
@@ -41,6 +44,19 @@ def _qint(request, key: str) -> Optional[int]:
     return int(v)
 
 
+def _qlimit(request, default: int = 100) -> int:
+    """Page size for keyset-paginated lists: positive, capped at MAX_PAGE_LIMIT."""
+    try:
+        v = _qint(request, "limit")
+    except ValueError:
+        raise fn.BadRequest("limit must be an integer")
+    if v is None:
+        return default
+    if v < 1:
+        raise fn.BadRequest("limit must be a positive integer")
+    return min(v, MAX_PAGE_LIMIT)
+
+
 def _qstr(request, key: str) -> Optional[str]:
     v = request.query_params.get(key)
     if v is None or v == "":
@@ -223,6 +239,8 @@ def vehicles_list(request):
                 price_max=_qint(request, "price_max"),
                 mileage_max=_qint(request, "mileage_max"),
                 q=_qstr(request, "q"),
+                after_id=_qint(request, "after_id"),
+                limit=_qlimit(request),
             )
         )
     except Exception as exc:
@@ -267,7 +285,14 @@ def vehicle_delete(request, vehicle_id: int):
 @api_view(["GET"])
 def customers_list(request):
     try:
-        return Response(fn.list_customers(_request_permissions(request), q=_qstr(request, "q")))
+        return Response(
+            fn.list_customers(
+                _request_permissions(request),
+                q=_qstr(request, "q"),
+                after_id=_qint(request, "after_id"),
+                limit=_qlimit(request),
+            )
+        )
     except Exception as exc:
         return _error_response(exc)
 
@@ -362,6 +387,8 @@ def orders_list(request):
                 employee_id=_qint(request, "employee_id"),
                 date_from=_qstr(request, "date_from"),
                 date_to=_qstr(request, "date_to"),
+                after_id=_qint(request, "after_id"),
+                limit=_qlimit(request),
             )
         )
     except Exception as exc:
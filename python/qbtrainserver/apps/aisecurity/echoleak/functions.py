@@ -1,8 +1,14 @@
 # apps/aisecurity/echoleak/functions.py
 from __future__ import annotations
 
+import hashlib
+import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 from pathlib import Path
 
 from qbtrain.agents.source_extraction_agent import SourceExtractionAgent
@@ -10,6 +16,7 @@ from qbtrain.agents.source_extraction_agent import SourceExtractionAgent
 # ============================================================
 # Constants
 # ============================================================
+# Defaults for ContextConfig; per-request overrides never modify these.
 MAX_TOKENS_PER_SOURCE = 3000
 MAX_COMBINED_TOKENS = 15000
 
@@ -163,110 +170,194 @@ class ConfigError(Exception):
 
 
 # ============================================================
-# Token Counter (simplified - counts words as rough token estimate)
+# Allowlist Validation
 # ============================================================
-def _estimate_tokens(text: str) -> int:
+ALLOW_ALL_SENTINEL = 'ALLOW.ALL.LINKS'
+
+
+# Bare host names ("example.com", ".example.com", "*.example.com") are matched
+# against the URL's host and its parent domains; any other entry (paths, schemes,
+# ports, bare words) keeps the substring match over the whole URL.
+_DOMAIN_RULE_RE = re.compile(r"^(?:\*\.|\.)?((?:[a-z0-9-]+\.)+[a-z0-9-]+)\.?$")
+# Host of "scheme://[user@]host[:port]/..." and of scheme-less "host[:port]/..." links.
+_URL_HOST_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:)?//(?:[^/?#@]*@)?([^:/?#]*)", re.IGNORECASE)
+_BARE_HOST_RE = re.compile(r"^(?:[^/?#@]*@)?([^:/?#]*)")
+
+
+class AllowlistMatcher:
     """
-    Estimate token count by counting words.
-    Rough estimate: 1 token ≈ 1 word (conservative).
+    Allowlist compiled once for repeated URL checks: a reversed-label trie of
+    allowed host suffixes plus a single case-insensitive regex alternation of
+    the substring (path) rules. Use :func:`compile_allowlist` to build one.
     """
-    if not text:
-        return 0
-    words = len(text.split())
-    return max(words, 1)
 
+    __slots__ = ("allow_all", "_hosts", "_substrings")
 
-# ============================================================
-# Allowlist Validation
-# ============================================================
-ALLOW_ALL_SENTINEL = 'ALLOW.ALL.LINKS'
+    def __init__(self, allowlist: Tuple[str, ...]):
+        self.allow_all = ALLOW_ALL_SENTINEL in allowlist
+        self._hosts: Dict[str, Any] = {}
+        substrings: List[str] = []
+        for entry in allowlist:
+            entry = entry.strip().lower() if isinstance(entry, str) else ""
+            if not entry:
+                continue
+            m = _DOMAIN_RULE_RE.match(entry)
+            if m is None:
+                substrings.append(entry)
+                continue
+            node = self._hosts
+            for label in reversed(m.group(1).split(".")):
+                node = node.setdefault(label, {})
+            node[""] = True  # end of an allowed domain
+        self._substrings = (
+            re.compile("|".join(re.escape(p) for p in sorted(set(substrings))), re.IGNORECASE)
+            if substrings
+            else None
+        )
+
+    def _host_allowed(self, host: str) -> bool:
+        node = self._hosts
+        for label in reversed(host.rstrip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if "" in node:
+                return True
+        return False
+
+    def allows(self, url: str) -> bool:
+        if not url:
+            return False
+        if self.allow_all:
+            return True
+        if self._hosts:
+            # Links extracted from a query may omit the scheme ("example.com/page").
+            m = (_URL_HOST_RE if "//" in url else _BARE_HOST_RE).match(url)
+            host = m.group(1).lower() if m else ""
+            if host and self._host_allowed(host):
+                return True
+        return self._substrings is not None and self._substrings.search(url) is not None
+
+
+@lru_cache(maxsize=64)
+def _compile_allowlist(allowlist: Tuple[str, ...]) -> AllowlistMatcher:
+    return AllowlistMatcher(allowlist)
+
+
+def compile_allowlist(allowlist: List[str]) -> AllowlistMatcher:
+    """Matcher for *allowlist*, built once per distinct allowlist and reused."""
+    return _compile_allowlist(tuple(allowlist))
 
 
 def _is_allowed(url: str, allowlist: List[str]) -> bool:
     """
     Check if a URL matches the allowlist.
-    Supports domain patterns and full URL matching.
+    Bare domains match the URL's host or any subdomain of it; other entries
+    match as case-insensitive substrings of the full URL.
     Returns True if the URL matches any allowlist pattern,
     or if ALLOW.ALL.LINKS is present in the allowlist.
     Returns False if the allowlist is empty (nothing is trusted).
     """
-    if not url:
+    if not url or not allowlist:
         return False
-    if not allowlist:
-        return False
-
-    # If sentinel value is present, allow everything
-    if ALLOW_ALL_SENTINEL in allowlist:
-        return True
-
-    url_lower = url.lower()
-    for allowed in allowlist:
-        if not allowed:
-            continue
-        allowed_lower = allowed.lower()
-        if allowed_lower in url_lower:
-            return True
-
-    return False
-
+    return compile_allowlist(allowlist).allows(url)
 
 
 # ============================================================
 # Context Building
 # ============================================================
+@dataclass(frozen=True)
+class ContextConfig:
+    """Per-request token budgets for build_context, in the LLM client's tokens."""
+    max_tokens_per_source: int = MAX_TOKENS_PER_SOURCE
+    max_combined_tokens: int = MAX_COMBINED_TOKENS
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "ContextConfig":
+        """Build from the request's "config" object; missing keys keep the defaults."""
+        values: Dict[str, int] = {}
+        for key in ("max_tokens_per_source", "max_combined_tokens"):
+            if not config or config.get(key) is None:
+                continue
+            try:
+                value = int(config[key])
+            except (TypeError, ValueError):
+                raise ValidationError(f"config.{key} must be an integer")
+            if value < 0:
+                raise ValidationError(f"config.{key} must be >= 0")
+            values[key] = value
+        return cls(**values)
+
+
 def build_context(
     query: str,
     files_list: Optional[List[Tuple[str, bytes]]],
     allowlist: List[str],
     client_config: Dict[str, Any],
     tracer=None,
+    context_config: Optional[ContextConfig] = None,
+    before_scrape: Optional[Callable[[], None]] = None,
 ) -> tuple[str, int, List[str]]:
     """
     Use the SourceExtractionAgent to extract links from the query and
     process uploaded files, then build a token-limited context string.
 
+    Budgets come from *context_config* (module defaults when None) and are
+    counted with the client's tokenizer (``client.token_counter()``), so
+    each source is cut to exactly the tokens that remain.
+
+    *before_scrape* is passed to the agent and runs right before any page is
+    loaded (see ``SourceExtractionAgent``).
+
     Returns:
         (context_string, total_tokens, warnings)
     """
+    budget = context_config or ContextConfig()
+    per_source = budget.max_tokens_per_source
+    combined = budget.max_combined_tokens
     client = _build_client(client_config)
-    agent = SourceExtractionAgent(llm_client=client)
-
-    result = agent.extract(query, files_list=files_list, tracer=tracer)
+    counter = client.token_counter()
+    # Disallowed links are dropped before any page load; the loop below still reports them.
+    matcher = compile_allowlist(allowlist)
+    agent = SourceExtractionAgent(llm_client=client, url_filter=matcher.allows, before_scrape=before_scrape)
+
+    # Files are read page by page only up to the token budgets, so most of a
+    # large PDF is never extracted.
+    result = agent.extract(
+        query,
+        files_list=files_list,
+        tracer=tracer,
+        max_tokens_per_file=per_source,
+        max_file_tokens=combined,
+        token_counter=counter,
+    )
 
     context_parts: List[str] = []
     total_tokens = 0
     warnings: List[str] = []
 
-    # Process extracted files
+    # Process extracted files (mostly within budget already; the cut below
+    # accounts for page separators exactly)
     for fc in result.files:
         content = fc.content
         if content.startswith("[error]"):
             warnings.append(f"Failed to extract file '{fc.file}': {content}")
             continue
 
-        token_count = _estimate_tokens(content)
-        if token_count > MAX_TOKENS_PER_SOURCE:
-            words = content.split()
-            content = " ".join(words[:MAX_TOKENS_PER_SOURCE])
-            token_count = MAX_TOKENS_PER_SOURCE
-
-        if total_tokens + token_count > MAX_COMBINED_TOKENS:
-            remaining = MAX_COMBINED_TOKENS - total_tokens
-            if remaining > 0:
-                words = content.split()
-                content = " ".join(words[:remaining])
-                token_count = remaining
-                warnings.append(f"File truncated to fit token limit: {fc.file}")
-            else:
-                warnings.append(f"File skipped (token limit reached): {fc.file}")
-                continue
+        remaining = combined - total_tokens
+        if remaining <= 0 and (fc.truncated or content.strip()):
+            warnings.append(f"File skipped (token limit reached): {fc.file}")
+            continue
+        content, token_count, cut = counter.truncate(content, min(per_source, remaining))
+        if (fc.truncated or cut) and remaining < per_source:
+            warnings.append(f"File truncated to fit token limit: {fc.file}")
 
         context_parts.append(f"[FILE: {fc.file}]\n{content}\n")
         total_tokens += token_count
 
     # Process extracted links (filter by allowlist)
     for lc in result.links:
-        if not _is_allowed(lc.link, allowlist):
+        if not matcher.allows(lc.link):
             warnings.append(f"Access denied (not in allowlist): {lc.link}")
             continue
 
@@ -275,22 +366,13 @@ def build_context(
             warnings.append(f"Failed to extract URL '{lc.link}': {content}")
             continue
 
-        token_count = _estimate_tokens(content)
-        if token_count > MAX_TOKENS_PER_SOURCE:
-            words = content.split()
-            content = " ".join(words[:MAX_TOKENS_PER_SOURCE])
-            token_count = MAX_TOKENS_PER_SOURCE
-
-        if total_tokens + token_count > MAX_COMBINED_TOKENS:
-            remaining = MAX_COMBINED_TOKENS - total_tokens
-            if remaining > 0:
-                words = content.split()
-                content = " ".join(words[:remaining])
-                token_count = remaining
-                warnings.append(f"URL content truncated to fit token limit: {lc.link}")
-            else:
-                warnings.append(f"URL skipped (token limit reached): {lc.link}")
-                continue
+        remaining = combined - total_tokens
+        if remaining <= 0 and content.strip():
+            warnings.append(f"URL skipped (token limit reached): {lc.link}")
+            continue
+        content, token_count, truncated = counter.truncate(content, min(per_source, remaining))
+        if truncated and remaining < per_source:
+            warnings.append(f"URL content truncated to fit token limit: {lc.link}")
 
         context_parts.append(f"[URL: {lc.link}]\n{content}\n")
         total_tokens += token_count
@@ -311,6 +393,17 @@ def _md_inline(text: str) -> str:
     return text
 
 
+_PDF_CONTENT_PATH = Path(__file__).resolve().parent / "assets" / "pdf_content.md"
+_PDF_FIGURE_PATH = Path(__file__).resolve().parents[3] / "common" / "exfil" / "assets" / "quantum_entanglement.png"
+
+
+def _exfil_instructions_text(exfil_url: str, level: int) -> str:
+    # Build full exfil get-image URL
+    exfil_get_image_url = f"{exfil_url.rstrip('/')}/ex/get-image"
+    instructions = EXFIL_INSTRUCTIONS.get(level, EXFIL_INSTRUCTIONS[1])
+    return instructions.format(url=exfil_get_image_url)
+
+
 def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
     """
     Generate a PDF from pdf_content.md with hidden exfil instructions.
@@ -325,6 +418,15 @@ def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
     Returns:
         PDF bytes
     """
+    return get_exfil_pdf(exfil_url, level=level).content
+
+
+def _render_exfil_pdf(instructions_text: Optional[str], slot: Any = None) -> bytes:
+    """
+    Full reportlab render of pdf_content.md. The hidden instructions are a
+    Paragraph of *instructions_text*, or the template *slot* flowable when
+    building the template (instructions_text None).
+    """
     try:
         from reportlab.lib.pagesizes import letter
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -334,15 +436,7 @@ def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
         from io import BytesIO
 
         # Read markdown content
-        md_path = Path(__file__).resolve().parent / "assets" / "pdf_content.md"
-        md_content = md_path.read_text(encoding="utf-8")
-
-        # Build full exfil get-image URL
-        exfil_get_image_url = f"{exfil_url.rstrip('/')}/ex/get-image"
-
-        # Build instructions text
-        instructions = EXFIL_INSTRUCTIONS.get(level, EXFIL_INSTRUCTIONS[1])
-        instructions_text = instructions.format(url=exfil_get_image_url)
+        md_content = _PDF_CONTENT_PATH.read_text(encoding="utf-8")
 
         # Set up PDF
         buffer = BytesIO()
@@ -456,6 +550,9 @@ def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
 
             # Placeholder → hidden instructions
             if "PLACEHODER_FOR_INSTRUCTIONS" in stripped:
+                if instructions_text is None:
+                    story.append(slot)
+                    continue
                 escaped = instructions_text.replace("&", "&amp;")
                 escaped = escaped.replace("<", "&lt;")
                 escaped = escaped.replace(">", "&gt;")
@@ -466,10 +563,7 @@ def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
             # and the embedded reference image in responses does not look out of place)
             if "FIGURE_PLACEHOLDER" in stripped:
                 try:
-                    fig_path = (
-                        Path(__file__).resolve().parents[3]
-                        / "common" / "exfil" / "assets" / "quantum_entanglement.png"
-                    )
+                    fig_path = _PDF_FIGURE_PATH
                     if fig_path.is_file():
                         max_w = 396  # points; fits within the letter page margins
                         iw, ih = ImageReader(str(fig_path)).getSize()
@@ -555,3 +649,251 @@ def generate_pdf_with_exfil_url(exfil_url: str, level: int = 1) -> bytes:
 
     except ImportError:
         raise ConfigError("PDF generation requires reportlab library")
+
+
+# ============================================================
+# PDF Cache / Template
+# ============================================================
+# The document is identical for every trainee except the hidden instructions
+# (a URL and level). The template is rendered once with a fixed-size slot in
+# place of that paragraph; each request only rewrites the slot's content
+# stream and the xref table. Finished PDFs are kept in a small LRU with an ETag.
+_EXFIL_SLOT_MARKER = "QBTRAINEXFILSLOT"
+_EXFIL_SLOT_FONT = ("Helvetica", 1, 1.2)  # name, size, leading (matches the hidden paragraph style)
+_EXFIL_SLOT_LINES = 8
+
+_XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([nf]) ?\r?\n")
+_STREAM_RE = re.compile(rb"(\d+) 0 obj\s*<<(.*?)>>\s*stream\r?\n(.*)endstream\s*endobj\s*$", re.DOTALL)
+
+
+class ExfilPdf(NamedTuple):
+    content: bytes
+    etag: str
+
+
+class _ExfilTemplate(NamedTuple):
+    head: bytes            # file bytes before the slot's content stream object
+    obj_num: int
+    stream_before: bytes   # decoded page content around the slot marker
+    stream_after: bytes
+    tail: bytes            # objects after the slot object, up to the xref table
+    offsets: List[int]     # xref offsets of objects 1..N-1 in the template
+    slot_offset: int
+    slot_obj_len: int
+    trailer: bytes         # "trailer ... >>" without startxref
+    width: float           # slot width in points
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = (os.getenv(name) or "").strip().lower()
+    if not raw:
+        return default
+    return raw not in ("0", "false", "no", "off")
+
+
+def _exfil_pdf_cache_size() -> int:
+    """Rendered PDFs kept in memory: ECHOLEAK_PDF_CACHE_SIZE (default 32; 0 disables)."""
+    raw = (os.getenv("ECHOLEAK_PDF_CACHE_SIZE") or "").strip()
+    try:
+        return max(0, int(raw)) if raw else 32
+    except ValueError:
+        return 32
+
+
+def _exfil_assets_signature() -> Tuple[int, int]:
+    """Changes when pdf_content.md or the figure is edited, invalidating cache and template."""
+    sig = []
+    for path in (_PDF_CONTENT_PATH, _PDF_FIGURE_PATH):
+        try:
+            sig.append(path.stat().st_mtime_ns)
+        except OSError:
+            sig.append(0)
+    return tuple(sig)
+
+
+def _exfil_slot_flowable():
+    from reportlab.lib.colors import white
+    from reportlab.platypus import Flowable
+
+    name, size, leading = _EXFIL_SLOT_FONT
+
+    class _ExfilSlot(Flowable):
+        """Fixed-height hidden text block holding the slot marker."""
+
+        def wrap(self, availWidth, availHeight):
+            self.width = availWidth
+            self.height = _EXFIL_SLOT_LINES * leading
+            return self.width, self.height
+
+        def draw(self):
+            canv = self.canv
+            canv.saveState()
+            canv.setFillColor(white)
+            text = canv.beginText(0, self.height - size)
+            text.setFont(name, size, leading)
+            text.textLine(_EXFIL_SLOT_MARKER)
+            canv.drawText(text)
+            canv.restoreState()
+
+    return _ExfilSlot()
+
+
+def _decode_stream(params: bytes, data: bytes) -> Optional[bytes]:
+    import base64
+    import zlib
+
+    if b"/Subtype" in params or b"/DecodeParms" in params:
+        return None  # images and other non-page streams
+    if b"/ASCII85Decode" in params:
+        data = base64.a85decode(data.strip().removesuffix(b"~>"))
+    if b"/FlateDecode" in params:
+        data = zlib.decompress(data)
+    return data
+
+
+def _build_exfil_template() -> Optional[_ExfilTemplate]:
+    """Render the template once and split it around the slot's content stream."""
+    slot = _exfil_slot_flowable()
+    pdf = _render_exfil_pdf(None, slot=slot)
+
+    xref_at = pdf.rfind(b"\nxref\n") + 1
+    trailer_at = pdf.find(b"trailer", xref_at)
+    startxref_at = pdf.find(b"startxref", trailer_at)
+    if xref_at <= 0 or trailer_at < 0 or startxref_at < 0:
+        return None
+    entries = _XREF_ENTRY_RE.findall(pdf, xref_at, trailer_at)
+    offsets = [int(off) for off, _gen, kind in entries[1:] if kind == b"n"]
+    if len(offsets) != len(entries) - 1 or offsets != sorted(offsets):
+        return None
+
+    marker = f"({_EXFIL_SLOT_MARKER}) Tj T*".encode("ascii")
+    bounds = offsets + [xref_at]
+    for i, start in enumerate(offsets):
+        m = _STREAM_RE.match(pdf, start, bounds[i + 1])
+        if m is None:
+            continue
+        content = _decode_stream(m.group(2), m.group(3))
+        if content is None or marker not in content:
+            continue
+        before, after = content.split(marker, 1)
+        return _ExfilTemplate(
+            head=pdf[:start],
+            obj_num=int(m.group(1)),
+            stream_before=before,
+            stream_after=after,
+            tail=pdf[bounds[i + 1]:xref_at],
+            offsets=offsets,
+            slot_offset=start,
+            slot_obj_len=bounds[i + 1] - start,
+            trailer=pdf[trailer_at:startxref_at],
+            width=slot.width,
+        )
+    return None
+
+
+def _pdf_escape(text: str) -> bytes:
+    return text.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _patch_exfil_template(template: _ExfilTemplate, instructions_text: str) -> Optional[bytes]:
+    """
+    Fill the slot with *instructions_text*, word-wrapped like the hidden
+    paragraph. None when the text needs more than the reserved lines or
+    the standard font encoding, so the caller falls back to a full render.
+    """
+    import zlib
+
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    name, size, _leading = _EXFIL_SLOT_FONT
+    space = stringWidth(" ", name, size)
+    lines: List[str] = []
+    line: List[str] = []
+    used = 0.0
+    for word in instructions_text.split():
+        w = stringWidth(word, name, size)
+        if line and used + space + w > template.width:
+            lines.append(" ".join(line))
+            line, used = [], 0.0
+        used += (space if line else 0.0) + w
+        line.append(word)
+    if line:
+        lines.append(" ".join(line))
+    if len(lines) > _EXFIL_SLOT_LINES:
+        return None
+    try:
+        text_ops = b" ".join(b"(" + _pdf_escape(ln) + b") Tj T*" for ln in lines)
+    except UnicodeEncodeError:
+        return None
+
+    data = zlib.compress(template.stream_before + text_ops + template.stream_after)
+    obj = (
+        f"{template.obj_num} 0 obj\n<<\n/Filter /FlateDecode /Length {len(data)}\n>>\nstream\n".encode("ascii")
+        + data
+        + b"\nendstream\nendobj\n"
+    )
+    delta = len(obj) - template.slot_obj_len
+    xref_at = len(template.head) + len(obj) + len(template.tail)
+    xref = [f"xref\n0 {len(template.offsets) + 1}\n0000000000 65535 f \n"]
+    xref.extend(
+        f"{off + delta if off > template.slot_offset else off:010d} 00000 n \n" for off in template.offsets
+    )
+    return b"".join((
+        template.head, obj, template.tail,
+        "".join(xref).encode("ascii"),
+        template.trailer,
+        f"startxref\n{xref_at}\n%%EOF\n".encode("ascii"),
+    ))
+
+
+_EXFIL_PDF_LOCK = threading.Lock()
+_EXFIL_PDF_CACHE: "OrderedDict[Tuple[Any, ...], ExfilPdf]" = OrderedDict()
+_EXFIL_TEMPLATE: Dict[Tuple[int, int], Optional[_ExfilTemplate]] = {}
+
+
+def _exfil_template(signature: Tuple[int, int]) -> Optional[_ExfilTemplate]:
+    with _EXFIL_PDF_LOCK:
+        if signature in _EXFIL_TEMPLATE:
+            return _EXFIL_TEMPLATE[signature]
+    template = _build_exfil_template()
+    with _EXFIL_PDF_LOCK:
+        _EXFIL_TEMPLATE.clear()
+        _EXFIL_TEMPLATE[signature] = template
+    return template
+
+
+def get_exfil_pdf(exfil_url: str, level: int = 1) -> ExfilPdf:
+    """
+    Exfil PDF for (exfil_url, level) with its ETag, served from the
+    in-memory cache when possible. Misses patch the pre-rendered template
+    (ECHOLEAK_PDF_TEMPLATE, default on) or fall back to a full render.
+    """
+    instructions_text = _exfil_instructions_text(exfil_url, level)
+    signature = _exfil_assets_signature()
+    key = (instructions_text, signature)
+    cache_size = _exfil_pdf_cache_size()
+    if cache_size:
+        with _EXFIL_PDF_LOCK:
+            hit = _EXFIL_PDF_CACHE.get(key)
+            if hit is not None:
+                _EXFIL_PDF_CACHE.move_to_end(key)
+                return hit
+
+    content = None
+    if _env_flag("ECHOLEAK_PDF_TEMPLATE", True):
+        try:
+            template = _exfil_template(signature)
+        except ImportError:
+            raise ConfigError("PDF generation requires reportlab library")
+        if template is not None:
+            content = _patch_exfil_template(template, instructions_text)
+    if content is None:
+        content = _render_exfil_pdf(instructions_text)
+
+    pdf = ExfilPdf(content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+    if cache_size:
+        with _EXFIL_PDF_LOCK:
+            _EXFIL_PDF_CACHE[key] = pdf
+            while len(_EXFIL_PDF_CACHE) > cache_size:
+                _EXFIL_PDF_CACHE.popitem(last=False)
+    return pdf
@@ -0,0 +1,93 @@
+"""
+Benchmark: compiled allowlist matcher (host-suffix trie + one combined regex
+for path rules) vs. the previous per-URL lowercase-and-substring scan of
+every allowlist entry.
+
+Uses a long allowlist (BENCH_ALLOWLIST entries, mostly domains with some
+path rules) and a stream of URLs, roughly half of them allowed. Also reports
+how many verdicts differ: bare domains now only match the URL's host (or a
+subdomain), so URLs that merely contain an allowed domain elsewhere are
+rejected.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.echoleak import functions as fn  # noqa: E402
+
+N_ENTRIES = int(os.environ.get("BENCH_ALLOWLIST", 2000))
+N_URLS = int(os.environ.get("BENCH_URLS", 20_000))
+
+
+def _legacy_is_allowed(url, allowlist):
+    if not url or not allowlist:
+        return False
+    if fn.ALLOW_ALL_SENTINEL in allowlist:
+        return True
+    url_lower = url.lower()
+    for allowed in allowlist:
+        if allowed and allowed.lower() in url_lower:
+            return True
+    return False
+
+
+def _data():
+    allowlist = [f"site{i}.example.org" for i in range(N_ENTRIES)]
+    allowlist += [f"docs{i}.example.net/public/" for i in range(N_ENTRIES // 10)]
+    urls = []
+    for i in range(N_URLS):
+        k = (i * 7919) % (N_ENTRIES * 2)
+        if i % 3 == 0:
+            urls.append(f"https://docs{k % (N_ENTRIES // 5 or 1)}.example.net/public/page-{i}")
+        elif i % 50 == 0:
+            urls.append(f"https://tracker.test/?ref=site{k}.example.org")
+        else:
+            urls.append(f"https://www.site{k}.example.org/article/{i}?utm=x")
+    return allowlist, urls
+
+
+def main():
+    allowlist, urls = _data()
+
+    t0 = time.perf_counter()
+    legacy = [_legacy_is_allowed(u, allowlist) for u in urls]
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    matcher = fn.AllowlistMatcher(tuple(allowlist))
+    compile_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    compiled = [matcher.allows(u) for u in urls]
+    compiled_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cached = [fn._is_allowed(u, allowlist) for u in urls]
+    cached_s = time.perf_counter() - t0
+
+    diff = sum(a != b for a, b in zip(legacy, compiled))
+    print(f"Echoleak allowlist matcher benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Allowlist entries: {len(allowlist)}, URLs: {len(urls)}, allowed (compiled): {sum(compiled)}")
+    print(f"{'matcher':36s} {'total ms':>10s} {'us/url':>8s} {'speedup':>8s}")
+    print(f"{'substring scan (previous)':36s} {legacy_s * 1000:10.1f} {legacy_s / len(urls) * 1e6:8.2f} {1.0:7.1f}x")
+    print(f"{'compiled matcher':36s} {compiled_s * 1000:10.1f} {compiled_s / len(urls) * 1e6:8.2f} "
+          f"{legacy_s / compiled_s:7.1f}x")
+    print(f"{'_is_allowed (cached compile)':36s} {cached_s * 1000:10.1f} {cached_s / len(urls) * 1e6:8.2f} "
+          f"{legacy_s / cached_s:7.1f}x")
+    print(f"Compile time: {compile_ms:.1f} ms; verdicts differing from substring scan: {diff} "
+          f"(allowed domain only in query string / not the host)")
+
+
+if __name__ == "__main__":
+    main()
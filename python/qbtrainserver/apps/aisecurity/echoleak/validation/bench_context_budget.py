@@ -0,0 +1,142 @@
+"""
+Benchmark: per-request context budgets and tokenizer-based packing.
+
+1. Isolation: THREADS concurrent build_context calls, each with its own
+   ContextConfig, against an in-process stand-in agent (no LLM, no network).
+   Every result must respect its own budgets; previously the view wrote the
+   budgets into module globals, so a concurrent request could overwrite them.
+2. Packing accuracy: sources packed to a token budget by word count (the
+   previous estimate) vs. the provider approximation vs. the exact tokenizer,
+   measured with the reference tokenizer (tiktoken for BENCH_MODEL when
+   installed). Reports mean fill of the budget and how often it is overshot.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.echoleak import functions as fn  # noqa: E402
+from qbtrain.agents import source_extraction_agent as sea  # noqa: E402
+from qbtrain.ai.llm.token_counter import approx_token_counter, tiktoken_counter  # noqa: E402
+
+THREADS = int(os.environ.get("BENCH_THREADS", 16))
+MODEL = os.environ.get("BENCH_MODEL", "gpt-4o")
+N_SOURCES = int(os.environ.get("BENCH_SOURCES", 200))
+
+_WORDS = ("revenue logistics normalised quarterly the a of and to in region growth cost margin "
+          "internationalization https://example.com/path?q=1 {\"key\": [1, 2, 3]} def f(x): return x**2 "
+          "naïve café 数据 résumé e-mail co-operate 3.14159 2026-10-19").split()
+
+
+def _text(rng, n_words):
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words))
+
+
+class _Client:
+    def __init__(self, counter):
+        self._counter = counter
+
+    def token_counter(self):
+        return self._counter
+
+
+class _Agent:
+    """Stand-in SourceExtractionAgent: a slow extract() so requests overlap."""
+
+    def __init__(self, llm_client=None, url_filter=None, **kwargs):
+        self.llm_client = llm_client
+
+    def extract(self, query, files_list=None, tracer=None, **kwargs):
+        time.sleep(0.01)
+        rng = random.Random(query)
+        links = [sea.LinkContent(link=f"https://site{i}.test/", content=_text(rng, 4000)) for i in range(6)]
+        return sea.SourceExtractionResult(links=links, files=[])
+
+
+def _isolation():
+    counter = approx_token_counter("openai")
+    fn._build_client = lambda cfg: _Client(counter)
+    fn.SourceExtractionAgent = _Agent
+    failures = []
+    lock = threading.Lock()
+
+    def request(n):
+        cfg = fn.ContextConfig(max_tokens_per_source=200 + 100 * n, max_combined_tokens=600 + 250 * n)
+        for i in range(10):
+            context, total, _ = fn.build_context(f"q{n}-{i}", None, ["ALLOW.ALL.LINKS"], {}, context_config=cfg)
+            bodies = context.split("[URL: ")[1:]
+            per_source = max(counter.count(b.split("]\n", 1)[1]) for b in bodies)
+            # Packing stops at a word boundary, so a source can end a few tokens short.
+            ok = cfg.max_combined_tokens - 8 <= total <= cfg.max_combined_tokens
+            ok = ok and per_source <= cfg.max_tokens_per_source
+            if not ok:
+                with lock:
+                    failures.append((n, total, per_source, cfg))
+
+    threads = [threading.Thread(target=request, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return failures
+
+
+def _pack_words(text, budget):
+    words = text.split()
+    return text if len(words) <= budget else " ".join(words[:budget])
+
+
+def _accuracy(reference):
+    rng = random.Random(7)
+    sources = [_text(rng, rng.randint(200, 6000)) for _ in range(N_SOURCES)]
+    budgets = [rng.choice((256, 1000, 3000)) for _ in sources]
+    approx = approx_token_counter("openai")
+    rows = []
+    for name, pack in (
+        ("word count (previous)", _pack_words),
+        ("provider approximation", lambda t, b: approx.truncate(t, b)[0]),
+        ("exact tokenizer", lambda t, b: reference.truncate(t, b)[0]),
+    ):
+        t0 = time.perf_counter()
+        packed = [pack(t, b) for t, b in zip(sources, budgets)]
+        elapsed = time.perf_counter() - t0
+        used = [reference.count(p) for p in packed]
+        full = [(u, b) for u, b, t in zip(used, budgets, sources) if reference.count(t) > b]
+        fill = sum(u / b for u, b in full) / len(full)
+        over = sum(u > b for u, b in full)
+        rows.append((name, elapsed * 1000 / len(sources), fill, over, len(full)))
+    return rows
+
+
+def main():
+    print(f"Echoleak context budget benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    failures = _isolation()
+    print(f"Isolation: {THREADS} concurrent requests x 10 with distinct budgets, failures: {len(failures)}")
+    for n, total, per_source, cfg in failures[:5]:
+        print(f"  request {n}: total {total}, largest source {per_source}, expected {cfg}")
+
+    reference = tiktoken_counter(MODEL)
+    if reference is None:
+        print("Packing accuracy: tiktoken not installed, no reference tokenizer; skipped.")
+        return
+    print(f"\nPacking accuracy vs {reference.name} ({MODEL}), {N_SOURCES} sources over budget 256/1000/3000")
+    print(f"{'packing':26s} {'ms/source':>10s} {'mean fill':>10s} {'overshoot':>10s}")
+    for name, ms, fill, over, n in _accuracy(reference):
+        print(f"{name:26s} {ms:10.2f} {fill * 100:9.1f}% {over:5d}/{n:<4d}")
+
+
+if __name__ == "__main__":
+    main()
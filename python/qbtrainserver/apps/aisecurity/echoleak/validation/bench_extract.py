@@ -0,0 +1,103 @@
+"""
+Benchmark: budget-aware streaming extraction of uploaded documents vs. the
+previous extract-everything-then-split path.
+
+Generates a large PDF (BENCH_PDF_PAGES pages) and DOCX in memory, then times
+full extraction followed by a word split and cut (previous build_context
+behaviour) against read_file_within_budget with the echoleak per-source
+budget. Also times full PDF extraction with SOURCE_PDF_WORKERS-style process
+workers (BENCH_PDF_WORKERS). Reports time, pages read and peak memory.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.echoleak import functions as fn  # noqa: E402
+from qbtrain.agents import source_extraction_agent as sea  # noqa: E402
+
+N_PAGES = int(os.environ.get("BENCH_PDF_PAGES", 500))
+N_WORKERS = int(os.environ.get("BENCH_PDF_WORKERS", 4))
+_LINE = "Quarterly revenue grew in every region while logistics costs normalised. "
+
+
+def _make_pdf() -> bytes:
+    import pymupdf
+
+    doc = pymupdf.open()
+    for n in range(N_PAGES):
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(40, 40, 560, 800), f"Page {n}. " + _LINE * 40, fontsize=8)
+    return doc.tobytes()
+
+
+def _make_docx() -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for n in range(N_PAGES * 10):
+        doc.add_paragraph(f"Paragraph {n}. " + _LINE * 4)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def _legacy(filename, data, limit):
+    content = "\n\n".join(sea.iter_file_pages(filename, data, workers=0))
+    words = content.split()
+    return " ".join(words[:limit]) if len(words) > limit else content
+
+
+def _measure(func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    limit = fn.MAX_TOKENS_PER_SOURCE
+    docs = (("large.pdf", _make_pdf()), ("large.docx", _make_docx()))
+
+    print(f"Document extraction benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"PDF pages: {N_PAGES}, per-source budget: {limit} words")
+    print(f"{'file':12s} {'mode':28s} {'time s':>8s} {'peak MB':>8s} {'pages':>7s} {'words':>7s}")
+    for filename, data in docs:
+        legacy, legacy_s, legacy_peak = _measure(lambda: _legacy(filename, data, limit))
+        budget, budget_s, budget_peak = _measure(lambda: sea.read_file_within_budget(filename, data, limit))
+        print(f"{filename:12s} {'full extract + split':28s} {legacy_s:8.3f} {legacy_peak / 2**20:8.1f} "
+              f"{'all':>7s} {len(legacy.split()):7d}")
+        print(f"{filename:12s} {'streamed within budget':28s} {budget_s:8.3f} {budget_peak / 2**20:8.1f} "
+              f"{budget.pages_read:7d} {budget.tokens:7d}  {legacy_s / budget_s:.1f}x")
+        same = budget.content.split() == legacy.split()
+        print(f"{'':12s} same words as previous path: {same}, truncated: {budget.truncated}")
+
+    pdf = docs[0][1]
+    t0 = time.perf_counter()
+    inline = list(sea.iter_file_pages("large.pdf", pdf, workers=0))
+    inline_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    parallel = list(sea.iter_file_pages("large.pdf", pdf, workers=N_WORKERS))
+    parallel_s = time.perf_counter() - t0
+    print(f"\nFull PDF extraction: inline {inline_s:.3f} s, {N_WORKERS} processes {parallel_s:.3f} s "
+          f"({inline_s / parallel_s:.1f}x), identical: {inline == parallel}")
+
+
+if __name__ == "__main__":
+    main()
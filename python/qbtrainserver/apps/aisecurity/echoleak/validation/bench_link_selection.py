@@ -0,0 +1,98 @@
+"""
+Benchmark: rule-based link selection fast path vs. always asking the LLM.
+
+Runs a labelled corpus of echoleak-style queries through
+SourceExtractionAgent link selection (no scraping) with a stand-in LLM that
+answers with the expected links after BENCH_LLM_MS of latency. Reports how
+many queries took the rule path, selection latency per path, total time
+saved, and whether the rule path picked exactly the expected links.
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents.source_selection import select_sources  # noqa: E402
+
+LLM_MS = int(os.environ.get("BENCH_LLM_MS", 800))
+FILES = ["Quarterly_Report.pdf", "meeting-notes.md"]
+
+# (query, links a careful reader would extract)
+CORPUS = [
+    ("What is prompt injection?", []),
+    ("Summarize the attached quarterly_report.pdf", []),
+    ("What do meeting notes.md say about hiring?", []),
+    ("Summarize https://news.lab.test.org/article-1", ["https://news.lab.test.org/article-1"]),
+    ("Compare https://a.org/x and https://b.org/y.", ["https://a.org/x", "https://b.org/y"]),
+    ("Read http://127.0.0.1:8000/page.html and the pdf", ["http://127.0.0.1:8000/page.html"]),
+    ("Check [docs](https://docs.python.org/3/library/re.html)", ["https://docs.python.org/3/library/re.html"]),
+    ("Read www.bbc.co.uk/news and summarise", ["www.bbc.co.uk/news"]),
+    ("A URL such as https://foo.org/x is just an example; what is a URL?", []),
+    ("Do not open https://evil.org, just read https://good.org", ["https://good.org"]),
+    ("Tell me about example.com", []),
+    ("Explain Node.js event loops", []),
+]
+
+
+class _StandInLLM:
+    """Answers link extraction with the corpus label after LLM_MS."""
+
+    def json_response(self, prompt, **kwargs):
+        time.sleep(LLM_MS / 1000.0)
+        for query, links in CORPUS:
+            if query in prompt:
+                return {"links": [{"url": u, "reason": "label"} for u in links]}
+        return {"links": []}
+
+
+def main():
+    from qbtrain.agents.source_extraction_agent import SourceExtractionAgent
+
+    agent = SourceExtractionAgent(llm_client=_StandInLLM())
+    rows = []
+    for query, expected in CORPUS:
+        t0 = time.perf_counter()
+        selection, reason = select_sources(query, FILES)
+        if selection is None:
+            links = [link.url for link in agent._extract_links(query)]
+            path = "llm"
+        else:
+            links = selection.urls
+            path = "rules"
+        rows.append((path, (time.perf_counter() - t0) * 1000, links == expected, reason, query))
+
+    t0 = time.perf_counter()
+    for query, _ in CORPUS:
+        agent._extract_links(query)
+    always_llm_s = time.perf_counter() - t0
+
+    rules = [r for r in rows if r[0] == "rules"]
+    llm = [r for r in rows if r[0] == "llm"]
+    print(f"Link selection fast path benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Queries: {len(CORPUS)}, stand-in LLM latency: {LLM_MS} ms")
+    print(f"{'path':6s} {'queries':>8s} {'p50 ms':>9s} {'correct':>8s}")
+    for name, group in (("rules", rules), ("llm", llm)):
+        if group:
+            p50 = statistics.median(r[1] for r in group)
+            print(f"{name:6s} {len(group):8d} {p50:9.3f} {sum(r[2] for r in group):5d}/{len(group)}")
+    with_fast_path_s = sum(r[1] for r in rows) / 1000
+    print(f"Total selection time: always LLM {always_llm_s:.2f} s, with fast path {with_fast_path_s:.2f} s "
+          f"(saved {always_llm_s - with_fast_path_s:.2f} s)")
+    for path, _ms, ok, reason, query in rows:
+        print(f"  [{path:5s}] {'ok ' if ok else 'BAD'} {reason:40.40s} {query}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: concurrent injection classification through the per-model
+micro-batching worker vs. every request thread calling the shared model
+directly (one forward pass per request), on CPU.
+
+N threads each classify a stream of short prompts, like parallel Django
+requests hitting crdlr/echoleak/the classify endpoint. Reports throughput,
+p50/p95 request latency and the worker's mean batch size. The verdict cache
+is disabled so every request reaches the model. Pass a model id as the first
+argument to pick one.
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.ai.classifiers import injection_classifier as ic  # noqa: E402
+from qbtrain.ai.classifiers.onnx_backend import PROBE_TEXTS  # noqa: E402
+
+CONCURRENCY = (1, 4, 16, 32)
+REQUESTS_PER_THREAD = int(os.environ.get("BENCH_REQUESTS", 20))
+
+
+class _Direct:
+    """Stand-in worker: run the caller's windows on the shared model in the caller's thread."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    def run(self, windows):
+        return ic._run_windows(self.pipe, windows)
+
+
+def _drive(model_id, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(n):
+        for i in range(REQUESTS_PER_THREAD):
+            text = PROBE_TEXTS[(n + i) % len(PROBE_TEXTS)]
+            t0 = time.perf_counter()
+            ic.classify(model_id, text)
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def main():
+    ic.set_classification_cache(None)
+    installed = [c["model_id"] for c in ic.list_classifiers() if c["installed"]]
+    model_id = sys.argv[1] if len(sys.argv) > 1 else (installed[0] if installed else None)
+    if model_id is None:
+        print("No injection classifier installed; download one first.")
+        return
+
+    pipe = ic._get_pipeline(model_id, ic.DEFAULT_MODELS_DIR)
+    batched_worker = ic._get_worker(model_id, ic.DEFAULT_MODELS_DIR)
+    direct_worker = _Direct(pipe)
+    ic.classify(model_id, PROBE_TEXTS[0])  # warm-up
+
+    print(f"Injection classifier micro-batching benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Model: {model_id}, requests/thread: {REQUESTS_PER_THREAD}, "
+          f"max_batch: {batched_worker.max_batch}, max_wait_ms: {batched_worker.max_wait_ms:g}")
+    print(f"{'threads':>7s} {'mode':10s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'mean batch':>11s}")
+    for threads in CONCURRENCY:
+        for mode, worker in (("direct", direct_worker), ("batched", batched_worker)):
+            ic._get_worker = lambda m, d, w=worker: w
+            before = batched_worker.stats()
+            rps, p50, p95 = _drive(model_id, threads)
+            after = batched_worker.stats()
+            batches = after["batches"] - before["batches"]
+            mean_batch = f"{(after['items'] - before['items']) / batches:.1f}" if batches else "1.0"
+            print(f"{threads:7d} {mode:10s} {rps:8.1f} {p50:8.1f} {p95:8.1f} {mean_batch:>11s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: echoleak exfil PDF generation — full reportlab render per call
+(previous behaviour) vs. template patching vs. the in-memory cache.
+
+Each mode generates PDFs for BENCH_TRAINEES distinct exfil URLs over all
+three levels, sequentially and from BENCH_THREADS threads. Reports latency,
+throughput, and checks that the template output has the same extracted text
+as a full render (requires pymupdf for the check).
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from apps.aisecurity.echoleak import functions as fn  # noqa: E402
+
+N_TRAINEES = int(os.environ.get("BENCH_TRAINEES", 8))
+THREADS = int(os.environ.get("BENCH_THREADS", 4))
+
+
+def _requests():
+    return [(f"http://trainee{n}.lab.test:8000", level) for n in range(N_TRAINEES) for level in (1, 2, 3)]
+
+
+def _full(url, level):
+    return fn._render_exfil_pdf(fn._exfil_instructions_text(url, level))
+
+
+def _template(url, level):
+    fn._EXFIL_PDF_CACHE.clear()
+    return fn.get_exfil_pdf(url, level).content
+
+
+def _cached(url, level):
+    return fn.get_exfil_pdf(url, level).content
+
+
+def _run(func, reqs, threads):
+    def timed(req):
+        t0 = time.perf_counter()
+        func(*req)
+        return (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if threads == 1:
+        samples = [timed(r) for r in reqs]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(timed, reqs))
+    return len(reqs) / (time.perf_counter() - t0), statistics.median(samples), max(samples)
+
+
+def _same_text(a, b):
+    try:
+        import pymupdf
+    except ImportError:
+        return "n/a (pymupdf missing)"
+    with pymupdf.open(stream=a, filetype="pdf") as da, pymupdf.open(stream=b, filetype="pdf") as db:
+        return [p.get_text().split() for p in da] == [p.get_text().split() for p in db]
+
+
+def main():
+    reqs = _requests()
+    t0 = time.perf_counter()
+    fn._exfil_template(fn._exfil_assets_signature())
+    template_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"Echoleak exfil PDF benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+    print(f"Requests: {len(reqs)} ({N_TRAINEES} URLs x 3 levels), template build: {template_ms:.0f} ms")
+    print(f"{'mode':24s} {'threads':>7s} {'PDF/s':>8s} {'p50 ms':>8s} {'max ms':>8s}")
+    for name, func in (("full render (previous)", _full), ("template patch", _template), ("cache hit", _cached)):
+        if func is _cached:
+            for req in reqs:
+                fn.get_exfil_pdf(*req)
+        for threads in (1, THREADS):
+            rate, p50, worst = _run(func, reqs, threads)
+            print(f"{name:24s} {threads:7d} {rate:8.1f} {p50:8.2f} {worst:8.2f}")
+
+    url, level = reqs[-1]
+    full = _full(url, level)
+    patched = _template(url, level)
+    print(f"Sizes: full {len(full)} B, template {len(patched)} B; same extracted text: {_same_text(full, patched)}")
+
+
+if __name__ == "__main__":
+    main()
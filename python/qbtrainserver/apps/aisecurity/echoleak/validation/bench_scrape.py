@@ -0,0 +1,202 @@
+"""
+Benchmark: SourceExtractionAgent link scraping with the persistent browser
+pool vs. the previous launch-a-browser-per-URL scraper.
+
+Serves generated article pages (nav/header/footer/sidebar/ads plus images,
+a web font and a video) from a local static HTTP server in a temp directory,
+so no external network is needed. Reports per-URL latency of both scrapers,
+checks that they extract the same text and prints the pool's stats. A second
+pass adds an artificial server delay (BENCH_DELAY_MS) and compares
+SourceExtractionAgent._scrape_links run one link at a time vs. concurrently
+with its per-host limit, across two host names for the same server. A third
+pass times the scrape cache: cold (render), warm (hit, no browser) and stale
+(conditional request answered 304 by the static server).
+Requires Playwright with Chromium installed (``playwright install chromium``).
+"""
+import http.server
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Bootstrap Django
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "..", ".."))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "qbtrainserver.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from qbtrain.agents import source_extraction_agent as sea  # noqa: E402
+from qbtrain.agents import scrape_cache as sc  # noqa: E402
+from qbtrain.tracers.agent_tracer import AgentTracer  # noqa: E402
+
+N_PAGES = int(os.environ.get("BENCH_PAGES", 20))
+DELAY_MS = int(os.environ.get("BENCH_DELAY_MS", 500))
+
+_PAGE = """<!doctype html>
+<html><head>
+<title>Article {n}</title>
+<style>@font-face {{ font-family: Bench; src: url("/font.woff2"); }} body {{ font-family: Bench; }}</style>
+<script>window.analytics = {{ page: {n} }};</script>
+</head><body>
+<header class="header"><img src="/logo.png"><h1>Bench site</h1></header>
+<nav class="navbar"><a href="/">Home</a> <a href="/about">About</a></nav>
+<aside class="sidebar">Related: <a href="/page-1.html">one</a></aside>
+<div class="cookie-banner">We use cookies.</div>
+<main>
+<article>
+<h2>Quarterly update {n}</h2>
+{paragraphs}
+<img src="/chart-{n}.png">
+<video src="/clip.mp4"></video>
+</article>
+</main>
+<div class="ads">Buy now!</div>
+<footer id="footer">Copyright</footer>
+</body></html>
+"""
+
+
+def _legacy_scrape(url: str, timeout_ms: int = 30_000) -> str:
+    """The previous scraper: fresh Chromium per URL, one evaluate per noise selector."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch(headless=True)
+        page = browser.new_page()
+        try:
+            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+            for sel in sea._NOISE_SELECTORS:
+                page.evaluate("(sel) => document.querySelectorAll(sel).forEach(el => el.remove())", sel)
+            main_el = (
+                page.query_selector("main")
+                or page.query_selector("article")
+                or page.query_selector("[role='main']")
+                or page.query_selector("body")
+            )
+            raw_text = main_el.inner_text() if main_el else ""
+        finally:
+            browser.close()
+    return sea._clean_text(raw_text)
+
+
+def _write_fixture(root: Path) -> None:
+    para = "<p>Revenue grew in every region while logistics costs normalised. </p>\n"
+    for n in range(N_PAGES):
+        (root / f"page-{n}.html").write_text(_PAGE.format(n=n, paragraphs=para * (5 + n % 20)), encoding="utf-8")
+        (root / f"chart-{n}.png").write_bytes(os.urandom(200_000))
+    (root / "logo.png").write_bytes(os.urandom(50_000))
+    (root / "font.woff2").write_bytes(os.urandom(100_000))
+    (root / "clip.mp4").write_bytes(os.urandom(1_000_000))
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    delay_s = 0.0
+
+    def do_GET(self):
+        if self.path.endswith(".html") and self.delay_s:
+            time.sleep(self.delay_s)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class _NoLLM:
+    def json_response(self, **kwargs):
+        raise RuntimeError("not used")
+
+
+def _time_agent(urls, **limits):
+    limits.setdefault("use_cache", False)
+    agent = sea.SourceExtractionAgent(llm_client=_NoLLM(), **limits)
+    links = [sea.ExtractedLink(url=u) for u in urls]
+    t0 = time.perf_counter()
+    results = agent._scrape_links(links)
+    return time.perf_counter() - t0, sum(not r.content.startswith("[error]") for r in results)
+
+
+def _time_cached(urls, cache):
+    tracer = AgentTracer()
+    agent = sea.SourceExtractionAgent(llm_client=_NoLLM())
+    t0 = time.perf_counter()
+    agent._scrape_links([sea.ExtractedLink(url=u) for u in urls], tracer=tracer)
+    elapsed = time.perf_counter() - t0
+    statuses = sorted({t.get("cache") for t in tracer.get_traces()})
+    return elapsed, ",".join(statuses)
+
+
+def _time_each(func, urls):
+    samples, texts = [], []
+    for url in urls:
+        t0 = time.perf_counter()
+        texts.append(func(url))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, texts
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="scrape_bench_") as tmp:
+        root = Path(tmp)
+        _write_fixture(root)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=tmp))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/page-{n}.html" for n in range(N_PAGES)]
+        try:
+            legacy_ms, legacy_texts = _time_each(_legacy_scrape, urls)
+            pool = sea.get_browser_pool()
+            pool_ms, pool_texts = _time_each(sea._scrape_main_content, urls)
+            warm_ms, _ = _time_each(sea._scrape_main_content, urls)
+
+            _QuietHandler.delay_s = DELAY_MS / 1000.0
+            port = server.server_address[1]
+            mixed = [
+                f"http://{'127.0.0.1' if n % 2 else 'localhost'}:{port}/page-{n}.html" for n in range(min(N_PAGES, 8))
+            ]
+            serial_s, serial_ok = _time_agent(mixed, max_concurrency=1)
+            conc_s, conc_ok = _time_agent(mixed)
+
+            _QuietHandler.delay_s = 0.0
+            cache = sc.ScrapeCache((root / "scrape_cache.db").as_posix(), ttl_s=3600)
+            sc.set_scrape_cache(cache)
+            cache_rows = [("cold (render)", *_time_cached(urls, cache)), ("warm (hit)", *_time_cached(urls, cache))]
+            cache.ttl_s = 0.0
+            cache_rows.append(("stale (304 revalidation)", *_time_cached(urls, cache)))
+            sc.set_scrape_cache(None)
+        finally:
+            server.shutdown()
+
+        print(f"SourceExtraction scrape benchmark — {datetime.now():%Y-%m-%d %H:%M:%S}")
+        print(f"Pages: {N_PAGES} served from {base}, browsers: {pool.size}")
+        print(f"{'scraper':28s} {'total s':>8s} {'p50 ms':>8s} {'max ms':>8s}")
+        for name, samples in (
+            ("fresh browser per URL", legacy_ms),
+            ("pool (first pass)", pool_ms),
+            ("pool (warm)", warm_ms),
+        ):
+            print(f"{name:28s} {sum(samples) / 1000:8.2f} {statistics.median(samples):8.1f} {max(samples):8.1f}")
+        same = sum(a == b for a, b in zip(legacy_texts, pool_texts))
+        print(f"Identical extracted text: {same}/{N_PAGES}")
+        print(f"\nDelayed server ({DELAY_MS} ms/page), {len(mixed)} links over 2 hosts, "
+              f"per-host limit {sea.SourceExtractionAgent(llm_client=_NoLLM()).per_host_limit}")
+        print(f"{'one link at a time':28s} {serial_s:8.2f} s  ok {serial_ok}/{len(mixed)}")
+        print(f"{'concurrent':28s} {conc_s:8.2f} s  ok {conc_ok}/{len(mixed)}  {serial_s / conc_s:.1f}x")
+        print(f"\nScrape cache, {N_PAGES} links")
+        for name, secs, statuses in cache_rows:
+            print(f"{name:28s} {secs:8.2f} s  cache={statuses}")
+        print(f"Cache stats: {cache.stats()}")
+        print(f"Pool stats: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,14 @@ from __future__ import annotations
 
 import json
 import time
-from typing import Any, Dict, List, Generator
+from typing import Any, Callable, Dict, List, Generator, Optional, Tuple
 
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.http import HttpResponse, StreamingHttpResponse
 
+from qbtrain.exceptions import ExecutionCancelledError
 from qbtrain.tracers.agent_tracer import AgentTracer
 from . import functions as fn
 
@@ -48,11 +49,13 @@ def _ndjson_generator(gen: Generator) -> Generator[str, None, None]:
         yield json.dumps(event) + "\n"
 
 
-def _run_classifier(model_id: str, text: str, label: str) -> Dict[str, Any]:
+def _run_classifier(
+    model_id: str, text: str, label: str, cache_info: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Run injection classifier on text, return result dict."""
     from qbtrain.ai.classifiers.injection_classifier import classify as run_classify
 
-    is_injection, confidence = run_classify(model_id, text)
+    is_injection, confidence = run_classify(model_id, text, cache_info=cache_info)
     return {
         "label": label,
         "model": model_id,
@@ -62,6 +65,88 @@ def _run_classifier(model_id: str, text: str, label: str) -> Dict[str, Any]:
     }
 
 
+def _run_classifier_many(
+    model_id: str, labelled_texts: List[Tuple[str, str]], cache_info: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Run the injection classifier over several (label, text) pairs in one batched pass."""
+    from qbtrain.ai.classifiers.injection_classifier import classify_many
+
+    if not labelled_texts:
+        return []
+    verdicts = classify_many(model_id, [text for _, text in labelled_texts], cache_info=cache_info)
+    return [
+        {
+            "label": label,
+            "model": model_id,
+            "is_injection": is_injection,
+            "confidence": round(confidence, 4),
+            "input_preview": text[:200],
+        }
+        for (label, text), (is_injection, confidence) in zip(labelled_texts, verdicts)
+    ]
+
+
+def _blocked_query_events(tracer: AgentTracer, pipeline_start: float, model_config: Dict[str, Any], config: Dict[str, Any]):
+    """Events emitted when the query is flagged by the injection classifier."""
+    yield {
+        "type": "message",
+        "content": "Your query has been flagged as a potential prompt injection attack and has been blocked."
+    }
+    total_latency = round((time.time() - pipeline_start) * 1000)
+    yield {
+        "type": "trace_summary",
+        "content": {
+            "calls": tracer.get_traces(),
+            "model": model_config.get("model") or config.get("model", "unknown"),
+            "total_latency_ms": total_latency,
+        },
+    }
+    yield {"type": "done"}
+
+
+def _resolve_speculation(spec, question: str, tracer: AgentTracer) -> Generator[Dict[str, Any], None, bool]:
+    """
+    Wait for a speculative query classification, trace it together with the
+    overlap it saved, and return whether the query was flagged.
+    """
+    is_injection, confidence = spec.result()
+    timing = spec.timing()
+    tracer.trace(
+        "InjectionClassifier", "classification",
+        operation="classify_query",
+        latency_ms=timing["classifier_ms"],
+        model=spec.model_id,
+        input_preview=question[:200],
+        input_length=len(question),
+        speculative=True,
+        cache=spec.cache_info,
+        output={
+            "label": "query",
+            "model": spec.model_id,
+            "is_injection": is_injection,
+            "confidence": round(confidence, 4),
+            "input_preview": question[:200],
+        },
+    )
+    yield {"type": "trace", "content": tracer.get_traces()[-1]}
+    tracer.trace("InjectionClassifier", "speculation", operation="speculative_classification", **timing)
+    yield {"type": "trace", "content": tracer.get_traces()[-1]}
+    return is_injection
+
+
+def _speculation_gate(spec) -> Callable[[], None]:
+    """SourceExtractionAgent.before_scrape hook: block on the classifier and abort if it flags the query."""
+    def _gate() -> None:
+        try:
+            flagged = spec.flagged()
+        except Exception as e:
+            # Surfaced again (unwrapped) by spec.result() in the handler below.
+            raise ExecutionCancelledError(f"Injection classifier failed: {e}") from e
+        if flagged:
+            raise ExecutionCancelledError("Query flagged by the injection classifier.")
+    return _gate
+
+
 def _parse_json_field(value, default=None):
     """Parse a field that may be a JSON string (from FormData) or already parsed."""
     if default is None:
@@ -91,6 +176,7 @@ def _process_query_stream(body: Dict[str, Any], files=None) -> Generator[Dict[st
             "model": <str>,
             "run_on_query": <bool>,
             "run_on_sources": <bool>,
+            "speculative": <bool>,  # classify the query while links are selected and files parsed
         },  # optional
         "memory": <str>,  # optional, user information
         "config": {
@@ -135,19 +221,24 @@ def _process_query_stream(body: Dict[str, Any], files=None) -> Generator[Dict[st
     run_on_query = classifier_cfg.get("run_on_query", False)
     run_on_sources = classifier_cfg.get("run_on_sources", False)
 
-    # Update constants if config provided
-    if config:
-        if "max_tokens_per_source" in config:
-            fn.MAX_TOKENS_PER_SOURCE = config["max_tokens_per_source"]
-        if "max_combined_tokens" in config:
-            fn.MAX_COMBINED_TOKENS = config["max_combined_tokens"]
+    # Per-request budgets; concurrent requests never share them
+    context_config = fn.ContextConfig.from_dict(config if isinstance(config, dict) else None)
 
     # --- Injection classifier: run on query ---
-    if classifier_enabled and classifier_model and run_on_query:
+    # Speculative mode overlaps the query classification with link selection and
+    # file parsing. Pages are only fetched (and cached) once the verdict clears,
+    # and nothing is sent to the response LLM before it.
+    spec = None
+    if classifier_enabled and classifier_model and run_on_query and classifier_cfg.get("speculative", False):
+        from qbtrain.ai.classifiers.injection_classifier import SpeculativeClassification
+
+        spec = SpeculativeClassification(classifier_model, question)
+    elif classifier_enabled and classifier_model and run_on_query:
         yield {"type": "status", "message": "Running injection classifier on query..."}
 
         t0 = time.time()
-        result = _run_classifier(classifier_model, question, "query")
+        cache_info: Dict[str, Any] = {}
+        result = _run_classifier(classifier_model, question, "query", cache_info=cache_info)
         tracer.trace(
             "InjectionClassifier", "classification",
             operation="classify_query",
@@ -155,25 +246,13 @@ def _process_query_stream(body: Dict[str, Any], files=None) -> Generator[Dict[st
             model=classifier_model,
             input_preview=question[:200],
             input_length=len(question),
+            cache=cache_info,
             output=result,
         )
         yield {"type": "trace", "content": tracer.get_traces()[-1]}
 
         if result["is_injection"]:
-            yield {
-                "type": "message",
-                "content": "Your query has been flagged as a potential prompt injection attack and has been blocked."
-            }
-            total_latency = round((time.time() - pipeline_start) * 1000)
-            yield {
-                "type": "trace_summary",
-                "content": {
-                    "calls": tracer.get_traces(),
-                    "model": model_config.get("model") or config.get("model", "unknown"),
-                    "total_latency_ms": total_latency,
-                },
-            }
-            yield {"type": "done"}
+            yield from _blocked_query_events(tracer, pipeline_start, model_config, config)
             return
 
     # Step 1: Extract sources (links from query + uploaded files) and build context
@@ -188,11 +267,20 @@ def _process_query_stream(body: Dict[str, Any], files=None) -> Generator[Dict[st
             allowlist=allowlist,
             client_config=model_config,
             tracer=tracer,
+            context_config=context_config,
+            before_scrape=_speculation_gate(spec) if spec is not None else None,
         )
+        build_ms = round((time.time() - t0) * 1000)
+        if spec is not None:
+            # Detach first so the except handlers below never resolve it twice.
+            pending_spec, spec = spec, None
+            if (yield from _resolve_speculation(pending_spec, question, tracer)):
+                yield from _blocked_query_events(tracer, pipeline_start, model_config, config)
+                return
         tracer.trace(
             "echoleak", "agent",
             operation="build_context",
-            latency_ms=round((time.time() - t0) * 1000),
+            latency_ms=build_ms,
             output={
                 "total_tokens": total_tokens,
                 "context_length": len(context),
@@ -213,48 +301,64 @@ def _process_query_stream(body: Dict[str, Any], files=None) -> Generator[Dict[st
             import re
             source_blocks = re.split(r'(\[(?:FILE|URL): [^\]]+\]\n)', context)
             rebuilt_parts = []
+            # (index into rebuilt_parts, label, source text) for every source body
+            sources = []
             current_label = None
 
             for block in source_blocks:
                 header_match = re.match(r'\[(FILE|URL): ([^\]]+)\]\n', block)
                 if header_match:
                     current_label = block.strip()
-                    rebuilt_parts.append(block)
                 elif current_label and block.strip():
-                    source_text = block.strip()
-                    t0 = time.time()
-                    result = _run_classifier(classifier_model, source_text, current_label)
-                    tracer.trace(
-                        "InjectionClassifier", "classification",
-                        operation="classify_source",
-                        latency_ms=round((time.time() - t0) * 1000),
-                        model=classifier_model,
-                        source_label=current_label,
-                        input_preview=source_text[:200],
-                        input_length=len(source_text),
-                        output=result,
-                    )
-                    yield {"type": "trace", "content": tracer.get_traces()[-1]}
-
-                    if result["is_injection"]:
-                        rebuilt_parts.append("The source contained malicious information and was not read.\n")
-                        malicious_sources.append(current_label)
-                    else:
-                        rebuilt_parts.append(block)
+                    sources.append((len(rebuilt_parts), current_label, block.strip()))
                     current_label = None
                 else:
-                    rebuilt_parts.append(block)
                     current_label = None
+                rebuilt_parts.append(block)
+
+            # One batched pass over all sources instead of one pipeline run per chunk.
+            t0 = time.time()
+            cache_info: Dict[str, Any] = {}
+            results = _run_classifier_many(
+                classifier_model, [(label, text) for _, label, text in sources], cache_info=cache_info
+            )
+            batch_latency_ms = round((time.time() - t0) * 1000)
+
+            for (part_idx, label, source_text), result in zip(sources, results):
+                tracer.trace(
+                    "InjectionClassifier", "classification",
+                    operation="classify_source",
+                    latency_ms=round(batch_latency_ms / len(sources)),
+                    batch_latency_ms=batch_latency_ms,
+                    batch_sources=len(sources),
+                    cache=cache_info,
+                    model=classifier_model,
+                    source_label=label,
+                    input_preview=source_text[:200],
+                    input_length=len(source_text),
+                    output=result,
+                )
+                yield {"type": "trace", "content": tracer.get_traces()[-1]}
+
+                if result["is_injection"]:
+                    rebuilt_parts[part_idx] = "The source contained malicious information and was not read.\n"
+                    malicious_sources.append(label)
 
             context = "".join(rebuilt_parts)
 
         yield {"type": "context", "tokens": total_tokens, "content": context}
     except fn.ExtractionError as e:
+        if spec is not None and (yield from _resolve_speculation(spec, question, tracer)):
+            yield from _blocked_query_events(tracer, pipeline_start, model_config, config)
+            return
         tracer.trace("echoleak", "error", operation="build_context", output=str(e))
         yield {"type": "trace", "content": tracer.get_traces()[-1]}
         yield {"type": "error", "message": f"Extraction failed: {str(e)}"}
         return
     except Exception as e:
+        if spec is not None and (yield from _resolve_speculation(spec, question, tracer)):
+            yield from _blocked_query_events(tracer, pipeline_start, model_config, config)
+            return
         tracer.trace("echoleak", "error", operation="build_context", output=str(e))
         yield {"type": "trace", "content": tracer.get_traces()[-1]}
         yield {"type": "error", "message": f"Source extraction failed: {str(e)}"}
@@ -486,7 +590,7 @@ def pdf_exfil(request):
     - exfilURL: URL to embed (required)
     - level: complexity level 1, 2, or 3 (optional, default 1)
 
-    Response: PDF file as binary data
+    Response: PDF file as binary data, with an ETag (304 on If-None-Match)
     """
     try:
         exfil_url = request.query_params.get("exfilURL")
@@ -503,14 +607,20 @@ def pdf_exfil(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        pdf_bytes = fn.generate_pdf_with_exfil_url(exfil_url, level=level)
+        pdf = fn.get_exfil_pdf(exfil_url, level=level)
+
+        if pdf.etag in (request.META.get("HTTP_IF_NONE_MATCH") or ""):
+            response = HttpResponse(status=304)
+            response["ETag"] = pdf.etag
+            return response
 
         response = HttpResponse(
-            pdf_bytes,
+            pdf.content,
             content_type="application/pdf",
             status=200,
         )
         response["Content-Disposition"] = f"attachment; filename=quantum_entanglement.pdf"
+        response["ETag"] = pdf.etag
         return response
     except fn.ConfigError as e:
         return Response(
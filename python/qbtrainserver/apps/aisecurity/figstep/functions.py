@@ -484,7 +484,8 @@ def run_ocr_injection_defense(
         }
 
     from qbtrain.ai.classifiers.injection_classifier import classify as run_classify
-    is_injection, confidence = run_classify(classifier_model, ocr_text)
+    cache_info: Dict[str, Any] = {}
+    is_injection, confidence = run_classify(classifier_model, ocr_text, cache_info=cache_info)
 
     return {
         "defense": "ocr_injection_classifier",
@@ -492,4 +493,5 @@ def run_ocr_injection_defense(
         "is_injection": is_injection,
         "confidence": round(confidence, 4),
         "input_preview": ocr_text[:200],
+        "cache": cache_info,
     }
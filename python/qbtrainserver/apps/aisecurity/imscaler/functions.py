@@ -8,7 +8,7 @@ anti-aliasing). The full-resolution image looks innocent; the hidden text only
 appears once that preprocessor downscales it 4:1.
 
 Three modes:
-  nearest  - Sets pixel (2,2) per 4x4 block. Verified working; left unchanged.
+  nearest  - Sets pixel (2,2) per 4x4 block. Verified working; vectorized, same output.
   bicubic  - cv2 INTER_CUBIC, mean-preserving + clip-aware solver (test3).
   bilinear - cv2 INTER_LINEAR, mean-preserving + clip-aware solver (test2).
 
@@ -136,25 +136,26 @@ def lin2srgb(y: ImageF32) -> ImageF32:
 # ============================================================
 # OpenCV weight extraction
 # ============================================================
-_weight_cache: Dict[int, np.ndarray] = {}
+_weight_cache: Dict[Tuple[int, int], np.ndarray] = {}
 
 
-def _extract_opencv_weights(method: int) -> np.ndarray:
+def _extract_opencv_weights(method: int, scale: int = SCALE) -> np.ndarray:
     """Probe cv2.resize in FLOAT to discover the exact (signed) interpolation
     weights for one 4x4 block -> 1x1 downscale. Float probing is required for
     bicubic: a uint8 probe clips the negative cubic lobes and the weights no
-    longer sum to 1. Returns the (SCALE, SCALE) weight grid."""
-    if method in _weight_cache:
-        return _weight_cache[method]
-    w = np.zeros((SCALE, SCALE), dtype=np.float32)
-    for dy in range(SCALE):
-        for dx in range(SCALE):
-            probe = np.zeros((SCALE, SCALE), dtype=np.float32)
+    longer sum to 1. Returns the (scale, scale) weight grid."""
+    key = (method, scale)
+    if key in _weight_cache:
+        return _weight_cache[key]
+    w = np.zeros((scale, scale), dtype=np.float32)
+    for dy in range(scale):
+        for dx in range(scale):
+            probe = np.zeros((scale, scale), dtype=np.float32)
             probe[dy, dx] = 1.0
             out = cv2.resize(probe, (1, 1), interpolation=method)
             w[dy, dx] = float(out[0, 0])
-    _weight_cache[method] = w
-    return _weight_cache[method]
+    _weight_cache[key] = w
+    return _weight_cache[key]
 
 
 def _region_px(region: Optional[Tuple[float, float, float, float]], size: int) -> Tuple[int, int, int, int]:
@@ -228,33 +229,30 @@ def _nearest_attack(
     target: ImageF32,
     lam: float = 0.25,
     offset: int = 2,
+    scale: int = SCALE,
 ) -> ImageF32:
     """
     Sets pixel (offset, offset) in each 4x4 block to the target value.
     Distributes compensating energy to the other 15 pixels.
+
+    Every block and channel at once: the image is viewed as
+    (H_t, s, W_t, s, 3) blocks, so the sampled pixels are one strided slice.
     """
-    s = SCALE
+    s = scale
     n = s * s
     adv = decoy.copy()
     H_t, W_t, _ = target.shape
+    blocks = adv.reshape(H_t, s, W_t, s, 3)  # reshape view shares memory
+
+    cur = blocks[:, offset, :, offset, :].astype(np.float64)
+    diff = target - cur
+    if lam > 0.0:
+        denom = 1.0 + (n - 1) * (lam ** 2)
+        delta_other = (-diff * (lam ** 2) / denom).astype(np.float32)
+        blocks += delta_other[:, None, :, None, :]
+    blocks[:, offset, :, offset, :] = cur + diff
 
-    for j in range(H_t):
-        for i in range(W_t):
-            y0, x0 = j * s, i * s
-            blk = adv[y0:y0 + s, x0:x0 + s]
-            for c in range(3):
-                cur = float(blk[offset, offset, c])
-                diff = float(target[j, i, c] - cur)
-                if lam <= 0.0:
-                    blk[offset, offset, c] = cur + diff
-                else:
-                    denom = 1.0 + (n - 1) * (lam ** 2)
-                    delta_other = -diff * (lam ** 2) / denom
-                    blk[..., c] = blk[..., c] + delta_other
-                    blk[offset, offset, c] = cur + diff
-            adv[y0:y0 + s, x0:x0 + s] = blk
-
-    return adv.astype(np.float32)
+    return adv
 
 
 # ============================================================
@@ -265,6 +263,7 @@ def _dc_preserving_attack(
     method: int,
     text_block: Image.Image,
     region_px: Tuple[int, int, int, int],
+    scale: int = SCALE,
 ) -> ImageF32:
     """
     Mean-preserving, clip-aware image-scaling attack in sRGB space.
@@ -277,7 +276,7 @@ def _dc_preserving_attack(
     so the full-res cover stays a clean decoy and the text appears only on the
     downscale, with the colorful ragged edges characteristic of the attack.
     """
-    s = SCALE
+    s = scale
     down_h = decoy_srgb.shape[0] // s
     down_w = decoy_srgb.shape[1] // s
 
@@ -286,7 +285,7 @@ def _dc_preserving_attack(
 
     # Mean-preserving per-pixel coefficients: sum(coeff)=0, so any multiple of it
     # leaves the block mean (=> the visible cover) unchanged.
-    w2 = _extract_opencv_weights(method)            # (s, s)
+    w2 = _extract_opencv_weights(method, s)         # (s, s)
     w = w2.reshape(-1)
     n = float(w.size); q = float(w.sum()); p = float(w @ w)
     ddenom = n * p - q * q
@@ -295,10 +294,7 @@ def _dc_preserving_attack(
     coeff2 = ((n * w - q) / ddenom).reshape(s, s)
 
     # What the downscaler samples from the untouched decoy, per block.
-    y_cur = np.zeros((down_h, down_w, 3), np.float32)
-    for a in range(s):
-        for b in range(s):
-            y_cur += w2[a, b] * blocks[:, a, :, b, :]
+    y_cur = np.tensordot(blocks, w2, axes=([1, 3], [0, 1])).astype(np.float32)  # (down_h, down_w, 3)
 
     # Target = decoy's own downscale, with the region replaced by the text block.
     target = y_cur.copy()
@@ -311,15 +307,20 @@ def _dc_preserving_attack(
 
     # Clip-aware step: largest t in [0,1] keeping every pixel in [0,255]. Because
     # the correction sums to zero across the block, scaling it preserves the mean.
+    # One pass per in-block offset over every block at once, with preallocated
+    # (down_h, down_w, 3) buffers: np.divide(where=) instead of boolean-mask
+    # gathers, and peak memory stays at 1/(s*s) of the image per buffer.
     t_block = np.full((down_h, down_w, 3), np.inf, np.float32)
+    d = np.empty_like(t_block)
+    room = np.empty_like(t_block)
+    tm = np.empty_like(t_block)
     for a in range(s):
         for b in range(s):
             c = blocks[:, a, :, b, :]
-            d = diff * coeff2[a, b]
-            tm = np.full_like(d, np.inf)
-            pos = d > 1e-9; neg = d < -1e-9
-            tm[pos] = (255.0 - c[pos]) / d[pos]
-            tm[neg] = (0.0 - c[neg]) / d[neg]
+            np.multiply(diff, coeff2[a, b], out=d)
+            np.subtract(np.where(d > 0, np.float32(255.0), np.float32(0.0)), c, out=room)
+            tm.fill(np.inf)
+            np.divide(room, d, out=tm, where=np.abs(d) > 1e-9)
             np.minimum(t_block, tm, out=t_block)
     np.clip(t_block, 0.0, 1.0, out=t_block)
 
@@ -327,7 +328,7 @@ def _dc_preserving_attack(
         for b in range(s):
             blocks[:, a, :, b, :] += t_block * (diff * coeff2[a, b])
 
-    return adv.astype(np.float32)
+    return adv
 
 
 # ============================================================
@@ -507,10 +508,11 @@ def run_ocr_injection_defense(image_bytes: bytes, classifier_model: str) -> Dict
                 "is_injection": False, "confidence": 0.0,
                 "note": "OCR extraction failed or unavailable"}
     from qbtrain.ai.classifiers.injection_classifier import classify as run_classify
-    is_injection, confidence = run_classify(classifier_model, ocr_text)
+    cache_info: Dict[str, Any] = {}
+    is_injection, confidence = run_classify(classifier_model, ocr_text, cache_info=cache_info)
     return {"defense": "ocr_injection_classifier", "ocr_text": ocr_text,
             "is_injection": is_injection, "confidence": round(confidence, 4),
-            "input_preview": ocr_text[:200]}
+            "input_preview": ocr_text[:200], "cache": cache_info}
 
 
 def run_perceptual_hash_defense(image_bytes: bytes) -> Dict[str, Any]:
@@ -25,6 +25,7 @@ urlpatterns = [
     path("classifiers/", views.classifiers_list, name="classifiers_list"),
     path("classifiers/download/", views.classifiers_download, name="classifiers_download"),
     path("classifiers/classify/", views.classifiers_classify, name="classifiers_classify"),
+    path("classifiers/stats/", views.classifiers_stats, name="classifiers_stats"),
 
     # Datasets (HF + Kaggle) — used by the shared DatasetSelector
     path("datasets/", views.dataset_list, name="dataset_list"),
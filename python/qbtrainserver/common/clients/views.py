@@ -291,6 +291,7 @@ from qbtrain.ai.classifiers.injection_classifier import (
     INJECTION_CLASSIFIERS,
     list_classifiers,
     classify as run_classify,
+    inference_stats,
 )
 
 
@@ -329,6 +330,14 @@ def classifiers_classify(request):
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["GET"])
+def classifiers_stats(request):
+    try:
+        return Response(inference_stats(), status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 # ============================
 # Client specs: list classes & their __init__ parameters
 # ============================